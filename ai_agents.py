@@ -6,6 +6,7 @@ from openai import OpenAI
 import prompts
 from chat_history_db import save_message, get_client_history, save_query, get_query_history
 from files_finder import find_files
+from health import llm_latency
 
 load_dotenv()
 
@@ -61,7 +62,8 @@ def generate_query(question, client_number):
     
     messages = _prepare_query_messages(question, client_number)
     save_query(client_number, "user", question)
-    response = client.chat.completions.create(
+    response = llm_latency.timed(
+        client.chat.completions.create,
         model=MODEL,
         messages=messages
     )
@@ -103,7 +105,8 @@ def generate_response(question, csv, client_number, negative_response):
         
         messages = _prepare_messages(question, csv, client_number)
         
-        response = client.chat.completions.create(
+        response = llm_latency.timed(
+            client.chat.completions.create,
             model=MODEL,
             messages=messages,
             stream=False
@@ -142,7 +145,8 @@ def _prepare_get_parsed_list_messages(text):
 def get_parsed_list(text_list):
 
     messages = _prepare_get_parsed_list_messages(text_list)
-    response = client.chat.completions.create(
+    response = llm_latency.timed(
+        client.chat.completions.create,
         model=MODEL,
         messages=messages,
         stream=False
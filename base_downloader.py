@@ -6,13 +6,34 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 from pathlib import Path
-from pdf_utils import is_valid_pdf
+from pdf_cache import PdfValidationCache
+from pdf_utils import FAST
 from policy_driver import PolicyDriver
+from retry_policy import (
+    PORTAL_ERROR,
+    TIMEOUT,
+    DownloadTimeout,
+    RetryPolicy,
+    RetryStats,
+    circuit_breaker,
+)
+from session_pool import SessionPool, SessionTimings
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Go back to the search results through the browser history instead of
+# searching the policy again for every endorsement
+RESULT_GRID_CACHE = os.getenv("RESULT_GRID_CACHE", "true").lower() == "true"
+# Restoring the grid often fails, so it's checked briefly before searching again
+RESULT_GRID_RESTORE_TIMEOUT = float(os.getenv("RESULT_GRID_RESTORE_TIMEOUT", "2"))
+
+DOWNLOAD_TIMEOUT = int(os.getenv("DOWNLOAD_TIMEOUT", "120"))
+# The download folder is polled often at first, then every DOWNLOAD_POLL_MAX seconds
+DOWNLOAD_POLL_MIN = 0.25
+DOWNLOAD_POLL_MAX = 3
+
 
 class CompanyPolicyException(Exception):
     def __init__(self, company, reason):
@@ -94,9 +115,19 @@ class ScriptDownloadStarter(DownloadStarter):
 class BaseDownloader(ABC):
     """Abstract base class for insurance policy downloaders."""
 
-    def __init__(self, driver: PolicyDriver):
+    def __init__(self, driver: PolicyDriver = None, session_pool: SessionPool = None):
+        if driver is None:
+            driver = session_pool.get_driver(self.name())
         self.driver = driver
+        self.session_pool = session_pool
+        self.timings = (
+            session_pool.timings(self.name()) if session_pool else SessionTimings()
+        )
         self.logged_in = False
+        self.login_time = None
+        self.checkpoint = None
+        self.manifest = None
+        self._result_grid_key = None
 
         # Load company-specific configuration from environment
         self.login_url = os.getenv(f"{self.name()}_LOGIN_URL")
@@ -106,6 +137,16 @@ class BaseDownloader(ABC):
         self.password = os.getenv(f"{self.name()}_PASSWORD")
         self.login_timeout = int(os.getenv(f"{self.name()}_LOGIN_TIMEOUT"))
         self.download_folder = os.getenv(f"DOWNLOAD_FOLDER")
+        self.pdf_cache = PdfValidationCache()
+        self.pdf_validation_mode = os.getenv("PDF_VALIDATION_MODE", FAST)
+        self.retry_policy = self.build_retry_policy()
+        self.retry_stats = RetryStats()
+        self.circuit = circuit_breaker(self.name())
+
+    def build_retry_policy(self) -> RetryPolicy:
+        """Retry policy for certificate downloads; companies can override it."""
+        # A CompanyPolicyException during a download is the portal refusing the file
+        return RetryPolicy(error_classes=[(CompanyPolicyException, PORTAL_ERROR)])
 
     @abstractmethod
     def name(self) -> str:
@@ -195,6 +236,16 @@ class BaseDownloader(ABC):
         """Check on the website if the policy is valid"""
         raise NotImplementedError()
 
+    def is_result_grid_ready(self, policy) -> bool:
+        """
+        Check that the search results for the policy are on screen and usable.
+
+        Used to validate a grid restored from the browser history, it should
+        wait at most RESULT_GRID_RESTORE_TIMEOUT. Companies that don't
+        implement it always repeat the search.
+        """
+        return False
+
     @abstractmethod
     def prepare_next_vehicle_search(self):
         raise NotImplementedError()
@@ -205,9 +256,40 @@ class BaseDownloader(ABC):
     ) -> list[dict]:
         raise NotImplementedError()
 
+    def open_session(self):
+        """Create the remote browser session unless a warm one is available."""
+        if self.driver.has_live_session():
+            logger.debug(f"Reusing live {self.name()} browser session")
+            return
+        if self.driver.driver is not None:
+            logger.info(f"{self.name()} browser session lost, starting a new one")
+            self.driver.close()
+        # A new browser is not logged in, whatever the login window says
+        self.logged_in = False
+        self.login_time = None
+        start = time.monotonic()
+        with self.driver.metrics.step("session"):
+            self.driver.init_driver()
+            self.driver.apply_blocking_profile(self.name())
+        self.timings.sessions_created += 1
+        self.timings.session_seconds += time.monotonic() - start
+
     def login(self):
         """Template method for the login process."""
-        self.driver.init_driver()
+        self.open_session()
+        if self.logged_in and not self.login_session_expired():
+            logger.info(f"Reusing warm {self.name()} login")
+            return
+
+        start = time.monotonic()
+        try:
+            with self.driver.metrics.step("login"):
+                self._authenticate()
+        finally:
+            self.timings.logins += 1
+            self.timings.login_seconds += time.monotonic() - start
+
+    def _authenticate(self):
         logger.info(f"Logging in to {self.name()} at {self.login_url}")
         self.driver.navigate(self.login_url)
         self.wait_login_page()
@@ -223,7 +305,32 @@ class BaseDownloader(ABC):
             logger.error(error_message)
             raise CompanyPolicyException(company=self.name(), reason=error_message)
 
+    def relogin(self):
+        """Re-authenticate on the same browser session after the login ages out."""
+        try:
+            self.logout()
+        except Exception as e:
+            logger.warning(f"Logout before re-login failed: {str(e)}")
+            self.logged_in = False
+        self.login()
+
+    def renew_login(self):
+        """
+        Log in again when the login ages out, in a new browser session if the
+        re-login fails. Raises only if the new session can't log in either.
+        """
+        try:
+            self.relogin()
+        except Exception as e:
+            logger.warning(
+                f"Re-login to {self.name()} failed, starting a new session: {str(e)}"
+            )
+            self.driver.close()
+            self.login()
+
     def login_session_expired(self):
+        if self.login_time is None:
+            return True
         current_time = datetime.now().replace(second=0, microsecond=0)
 
         time_diff = current_time - self.login_time
@@ -244,8 +351,13 @@ class BaseDownloader(ABC):
         """Download multiple policies using the provided policy data."""
         for policy in policies:
             if self.login_session_expired():
-                logger.info(f"Login time has expired")
-                return
+                logger.info(f"Login time has expired, logging in again")
+                self.renew_login()
+            start = time.monotonic()
+            self.driver.metrics.start_policy(policy.get("number"))
+            # Only the policies with a final result go to the checkpoint, the
+            # failed ones are tried again when the run is resumed
+            completed = False
             try:
                 if not policy.get("number"):
                     logger.error(f"Policy number is required for policy: {policy}")
@@ -259,14 +371,17 @@ class BaseDownloader(ABC):
                         f"Policy year {policy['year']} is in the past for policy: {policy}"
                     )
                     policy["obs"] = "Vencida"
+                    completed = True
                     continue
                 if policy["expired"]:
                     logger.debug(f"The expiration date has passed for policy: {policy}")
                     policy["obs"] = "Vencida"
+                    completed = True
                     continue
                 if not policy["contains_cars"]:
                     logger.debug(f"Policy: {policy} is not a car policy")
                     policy["obs"] = "No es automovil"
+                    completed = True
                     continue
 
                 if not policy["downloaded"]:
@@ -283,14 +398,24 @@ class BaseDownloader(ABC):
                         else:
                             logger.warning(f"Policy {policy['number']} NOT downloaded")
                             logger.warning(str(policy))
+                    # Downloaded, or every vehicle is missing from the web
+                    completed = policy["downloaded"]
                 else:
                     logger.info(f"Policy {policy['number']} already downloaded")
+                    completed = True
             except CompanyPolicyException as e:
                 logger.error(f"Failed to download policy {str(policy)}: {e.reason}")
             except Exception as e:
                 logger.error(
                     f"Unexpected error downloading policy {policy['number']}: {str(e)}"
                 )
+            finally:
+                self.driver.metrics.end_policy()
+                elapsed = time.monotonic() - start
+                self.timings.policies += 1
+                self.timings.download_seconds += elapsed
+                if self.checkpoint and completed:
+                    self.checkpoint.record(self.name(), policy, elapsed)
 
     def download_policy(self, policy: Dict[str, str]) -> bool:
         """Template method for the complete policy download process."""
@@ -308,7 +433,8 @@ class BaseDownloader(ABC):
                 logger.debug(
                     f"Downloading files, policy: {policy['number']} endorsement: {i}"
                 )
-                validation_data = self.validate_policy(policy, i)
+                with self.driver.metrics.step("endorsement"):
+                    validation_data = self.validate_policy(policy, i)
                 if validation_data["valid"]:
 
                     self.download_policy_files(policy, validation_data)
@@ -330,7 +456,7 @@ class BaseDownloader(ABC):
                         break
 
                 if i < count - 1:
-                    self._search_for_policy(policy)
+                    self._return_to_result_grid(policy)
 
             for v in policy["vehicles"]:
                 v.pop("files_are_valid")
@@ -363,13 +489,31 @@ class BaseDownloader(ABC):
 
     def _search_for_policy(self, policy: Dict[str, str]) -> None:
         """Helper method to search for a policy."""
-        self.driver.navigate(self.search_url)
-        policy_input = self.find_policy_input()
-        logger.debug(f"Found policy input field")
-        policy_input.clear()
-        logger.debug(f"Entering policy number: {policy['number']}")
-        policy_input.send_keys(policy["number"])
-        self.search_policy()
+        with self.driver.metrics.step("search"):
+            self.driver.navigate(self.search_url)
+            policy_input = self.find_policy_input()
+            logger.debug(f"Found policy input field")
+            policy_input.clear()
+            logger.debug(f"Entering policy number: {policy['number']}")
+            policy_input.send_keys(policy["number"])
+            self.search_policy()
+        self.timings.searches += 1
+        self._result_grid_key = self.driver.history_key() if RESULT_GRID_CACHE else None
+
+    def _return_to_result_grid(self, policy: Dict[str, str]) -> None:
+        """Go back to the search results of the policy, searching again only if needed."""
+        if self._result_grid_key:
+            with self.driver.metrics.step("search"):
+                restored = self.driver.traverse_to(
+                    self._result_grid_key, timeout=RESULT_GRID_RESTORE_TIMEOUT
+                ) and self.is_result_grid_ready(policy)
+            if restored:
+                self.timings.searches_avoided += 1
+                logger.debug(f"Result grid of policy {policy['number']} restored from history")
+                return
+            self.timings.grid_restore_failures += 1
+            logger.debug(f"Could not restore result grid of policy {policy['number']}, searching again")
+        self._search_for_policy(policy)
 
     def is_downloaded(self, policy):
         # exp_date = datetime.strptime(policy["expiration_date"], "%d/%m/%Y").date()
@@ -389,14 +533,18 @@ class BaseDownloader(ABC):
             license_plate = vehicle.get("license_plate")
             rel_path = self.get_relative_path(policy, license_plate)
             folder = self.get_folder_path(rel_path)
-            soa_file_is_valid, _ = is_valid_pdf(folder, "soa.pdf")
+            soa_file_is_valid = self.is_valid_certificate(
+                policy, license_plate, folder, "soa.pdf"
+            )
             if soa_file_is_valid:
                 vehicle["folder"] = folder
                 vehicle["soa"] = f"{rel_path}/soa.pdf"
             if soa_only:
                 vehicle["files_are_valid"] = soa_file_is_valid
             else:
-                mercosur_file_is_valid, _ = is_valid_pdf(folder, "mercosur.pdf")
+                mercosur_file_is_valid = self.is_valid_certificate(
+                    policy, license_plate, folder, "mercosur.pdf"
+                )
                 if mercosur_file_is_valid:
                     vehicle["mercosur"] = f"{rel_path}/mercosur.pdf"
                 vehicle["files_are_valid"] = (
@@ -410,6 +558,17 @@ class BaseDownloader(ABC):
         if not policy["downloaded"]:
             logger.info(f"{policy["number"]} is not downloaded")
 
+    def is_valid_certificate(self, policy, license_plate, folder, filename) -> bool:
+        """Answer from the audit manifest when it has the file as valid, else validate it."""
+        if self.manifest and self.manifest.is_valid(
+            self.name(), policy["number"], policy["year"], license_plate, filename
+        ):
+            return True
+        is_valid, _ = self.pdf_cache.is_valid_pdf(
+            folder, filename, self.pdf_validation_mode
+        )
+        return is_valid
+
     def is_soa_only(self, policy):
         soa_only = policy.get("soa_only", False)
         return soa_only
@@ -423,6 +582,7 @@ class BaseDownloader(ABC):
     def check_if_all_downloaded(self, policies) -> bool:
         """Check if all policies in the list have been downloaded successfully."""
         self.mark_downloaded_policies(policies)
+        logger.info(f"PDF validation cache: {self.pdf_cache.stats.summary()}")
         all_downloaded = all(policy.get("downloaded", False) for policy in policies)
         if not all_downloaded:
             logger.warning("Not all policies were downloaded successfully.")
@@ -458,6 +618,7 @@ class BaseDownloader(ABC):
         end_time = time.time() + timeout
         tmp_path = self.driver.folder
         download_started = False
+        poll_interval = DOWNLOAD_POLL_MIN
         while time.time() < end_time:
             try:
                 file_list = [
@@ -514,45 +675,74 @@ class BaseDownloader(ABC):
                     return new_file_path, True
             else:
                 logger.debug("La descarga no inicio aun, se espera")
-            time.sleep(3)
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, DOWNLOAD_POLL_MAX)
         # Sale por timeout
         return None, False
 
     def download_file_from_starter(
-        self, starter, rename_strategy, timeout=120, max_attempts=2
+        self, starter, rename_strategy, timeout=DOWNLOAD_TIMEOUT, max_attempts=None
     ):
-        attempts = 1
-        downloaded_ok = False
-        MAX_ATTEMPTS = max_attempts
-
-        while attempts < MAX_ATTEMPTS and not downloaded_ok:
-            self.clean_tmp_folder()
-            starter.start_download()
-            starter.verify_download_in_progress(str(rename_strategy))
-
-            logger.debug(f"Renombrando archivo {self.name()} a {str(rename_strategy)}")
+        """Run a download starter until the file arrives, following the retry policy."""
+        policy = self.retry_policy
+        max_attempts = max_attempts or policy.max_attempts
+        if not self.circuit.allow():
+            self.retry_stats.circuit_rejections += 1
+            raise CompanyPolicyException(
+                self.name(),
+                f"Portal degradado, descargas pausadas: {str(rename_strategy)}",
+            )
 
+        attempt = 0
+        while True:
+            attempt += 1
+            self.retry_stats.attempts += 1
+            start = time.monotonic()
             try:
+                self.clean_tmp_folder()
+                starter.start_download()
+                starter.verify_download_in_progress(str(rename_strategy))
+
+                logger.debug(f"Renombrando archivo {self.name()} a {str(rename_strategy)}")
                 full_path, downloaded_ok = self._wait_download_and_rename_file(
                     rename_strategy, timeout
                 )
+                if not downloaded_ok:
+                    raise DownloadTimeout(f"{str(rename_strategy)} no descargado en {timeout}s")
 
-                if downloaded_ok:
-                    logger.info(f"Renombrado correcto. FullPath: {full_path}")
-
-                else:
-                    attempts += 1
-                    logger.info(f"Fallo la descarga. Se reintenta por {attempts} vez ")
+                logger.info(f"Renombrado correcto. FullPath: {full_path}")
+                self.circuit.record_success()
+                self.retry_stats.downloads += 1
+                return full_path
             except Exception as e:
+                error_class = policy.classify(e)
+                self.retry_stats.failures[error_class] += 1
+                self.retry_stats.seconds_lost += time.monotonic() - start
+                if policy.rule(error_class).trips_circuit:
+                    self.circuit.record_failure()
                 error_msg = e.msg if hasattr(e, "msg") else str(e)
-                error_message = f"ERROR Renombrando archivo {self.name()} a {str(rename_strategy)}. {type(e).__name__}: {error_msg}"
-                logger.error(error_message)
-                raise Exception(error_message)
+                logger.warning(
+                    f"Fallo la descarga de {str(rename_strategy)} ({error_class}), "
+                    f"intento {attempt}/{max_attempts}. {type(e).__name__}: {error_msg}"
+                )
+
+                if not policy.should_retry(error_class, attempt, max_attempts):
+                    if error_class == TIMEOUT:
+                        error_message = f"Maxima cantidad de intentos superada para descargar: {str(rename_strategy)}. Empresa: {self.name()}"
+                        raise CompanyPolicyException(self.name(), error_message)
+                    raise
+                if not self.circuit.allow():
+                    self.retry_stats.circuit_rejections += 1
+                    raise CompanyPolicyException(
+                        self.name(),
+                        f"Portal degradado, descargas pausadas: {str(rename_strategy)}",
+                    )
 
-        if attempts >= MAX_ATTEMPTS and not downloaded_ok:
-            error_message = f"Maxima cantidad de intentos superada para descargar: {str(rename_strategy)}. Empresa: {self.name()}"
-            raise CompanyPolicyException(self.name(), error_message)
-        return full_path
+                delay = policy.delay(error_class, attempt)
+                logger.info(f"Se reintenta la descarga en {delay:.1f}s")
+                self.retry_stats.retries += 1
+                self.retry_stats.seconds_lost += delay
+                time.sleep(delay)
 
     def process_policies(self, policies):
         try:
@@ -573,8 +763,18 @@ class BaseDownloader(ABC):
             logger.exception("Detailed error:")
             logger.error(f"Error during policy download: {str(e)}")
         finally:
-            self.logout()
-            logger.info("Logout completed")
+            if self.session_pool is None:
+                self.logout()
+                logger.info("Logout completed")
+            else:
+                logger.info(f"Keeping {self.name()} session warm in the pool")
+            logger.info(f"{self.name()} timings: {self.timings.summary()}")
+            self.driver.metrics.log_summary()
+            self.driver.metrics.reset()
+            logger.info(f"{self.name()} waits: {self.driver.waits.summary()}")
+            logger.info(f"{self.name()} page loads: {self.driver.page_stats.summary()}")
+            logger.info(f"{self.name()} download retries: {self.retry_stats.summary()}")
+            self.driver.waits.save()
 
     def execute_download_starters(self, policy, vehicle, vehicle_plate):
         logger.debug("execute_download_starters 1")
@@ -621,7 +821,8 @@ class BaseDownloader(ABC):
         """Handle the policy file download."""
         try:
             logger.debug(f"Validation data: {str(validation_data)}")
-            page_vehicles = self.get_vehicles_data()
+            with self.driver.metrics.step("vehicle"):
+                page_vehicles = self.get_vehicles_data()
             policy_vehicles = policy["vehicles"]
             logger.debug(f"Page vehicles: {page_vehicles}")
             logger.debug(f"Policy vehicles: {policy_vehicles}")
@@ -646,7 +847,8 @@ class BaseDownloader(ABC):
 
                 try:
                     logger.debug("download_policy_files 2")
-                    self.go_to_vehicle_download_page(vehicle, validation_data)
+                    with self.driver.metrics.step("vehicle"):
+                        self.go_to_vehicle_download_page(vehicle, validation_data)
                     # Check the expiration date
                     if policy_expired:
                         # Surely the expiration date in the web is correct
@@ -660,10 +862,12 @@ class BaseDownloader(ABC):
                             logger.debug(f"Set new expiration date to {policy["expiration_date"]}")
                             
                     logger.debug("download_policy_files 3")
-                    self.execute_download_starters(policy, vehicle, vehicle_plate)
+                    with self.driver.metrics.step("download"):
+                        self.execute_download_starters(policy, vehicle, vehicle_plate)
                     logger.debug("download_policy_files 4")
                     if index < len(reconciled_vehicles) - 1:
-                        self.prepare_next_vehicle_search()
+                        with self.driver.metrics.step("vehicle"):
+                            self.prepare_next_vehicle_search()
                 except Exception as e:
                     logger.error(f"Error processing vehicle {vehicle_plate}: ({type(e).__name__}) {str(e)}")
                     vehicle["status"] = "Error"
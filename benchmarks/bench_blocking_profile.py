@@ -0,0 +1,76 @@
+"""
+Measure page-load time and bytes transferred per blocking profile.
+
+Opens a fresh browser session per profile through DriverCreator (the same
+Selenium grid the downloaders use) and loads each company's login and search
+pages, reading the Performance API after every load. Only pages reachable
+without logging in are measured, so the search pages usually redirect to the
+login page; this still covers the portal's fonts, CSS and analytics.
+
+Usage:
+    python benchmarks/bench_blocking_profile.py [--companies SURA BSE] [--repeat 3]
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from blocking_profile import DEFAULT, OFF, STRICT, PageStats
+from driver_creator import DriverCreator
+from policy_driver import PolicyDriver
+
+PROFILES = (OFF, DEFAULT, STRICT)
+
+
+def company_urls(company):
+    urls = [os.getenv(f"{company}_LOGIN_URL"), os.getenv(f"{company}_SEARCH_URL")]
+    return [url for url in urls if url]
+
+
+def measure(company, profile, repeat):
+    driver = PolicyDriver(DriverCreator(), headless=True)
+    driver.init_driver()
+    try:
+        driver.apply_blocking_profile(company, profile)
+        stats = PageStats()
+        for _ in range(repeat):
+            for url in company_urls(company):
+                # Bypass the HTTP cache so every repetition pays the full load
+                driver.execute_cdp("Network.setCacheDisabled", {"cacheDisabled": True})
+                driver.navigate(url)
+                page = driver.measure_page_load()
+                if page:
+                    stats.add(page)
+        return stats
+    finally:
+        driver.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", nargs="+", default=["SURA", "BSE"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for company in args.companies:
+        if not company_urls(company):
+            print(f"{company}: no {company}_LOGIN_URL / {company}_SEARCH_URL configured")
+            continue
+        baseline = None
+        for profile in PROFILES:
+            stats = measure(company, profile, args.repeat)
+            line = f"{company:>7} {profile:>8}: {stats.summary()}"
+            if baseline is None:
+                baseline = stats
+            elif baseline.pages and stats.pages:
+                load_saved = (baseline.load_seconds - stats.load_seconds) / stats.pages
+                kb_saved = (baseline.bytes - stats.bytes) / stats.pages / 1024
+                line += f" | saved {load_saved:.2f}s and {kb_saved:.0f} KB per page"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
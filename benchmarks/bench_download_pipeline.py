@@ -0,0 +1,113 @@
+"""
+End-to-end throughput of the downloaders against the local mock portal.
+
+Starts mock_portal.MockPortal with synthetic policies, points the SURA, BSE and
+SANCOR downloaders to it and runs process_policies for each company through a
+local headless Chrome (chromedriver must be installed). It reports policies per
+minute and checks that every expected certificate was downloaded and is a
+valid PDF. The exit code is 1 if any is missing, so the script also works as
+a regression test of the download flows.
+
+Usage:
+    python benchmarks/bench_download_pipeline.py [--policies 10] [--vehicles 3]
+        [--endorsements 1] [--latency-ms 150] [--companies SURA BSE SANCOR] [--shared]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mock_portal import COMPANIES, MockPortal, build_fixtures, downloader_policies
+
+
+def configure_environment(portal, work_folder):
+    """The downloaders read their configuration from the environment."""
+    os.environ.update(portal.env())
+    os.environ["DOWNLOAD_FOLDER"] = os.path.join(work_folder, "store")
+    os.environ["TMP_DOWNLOAD_FOLDER"] = os.path.join(work_folder, "tmp")
+    os.environ["PDF_CACHE_FILE"] = os.path.join(work_folder, "pdf_cache.db")
+    os.environ.pop("CHECKPOINT_FILE", None)
+    os.environ.pop("WAIT_STATS_FILE", None)
+
+
+def count_certificates(downloader, policies):
+    """(expected, valid) certificate files on disk for the processed policies."""
+    from pdf_utils import FULL, is_valid_pdf
+
+    expected = valid = 0
+    for policy in policies:
+        filenames = ["soa.pdf"] if policy["soa_only"] else ["soa.pdf", "mercosur.pdf"]
+        for vehicle in policy["vehicles"]:
+            rel_path = downloader.get_relative_path(policy, vehicle["license_plate"])
+            folder = downloader.get_folder_path(rel_path)
+            for filename in filenames:
+                expected += 1
+                valid += is_valid_pdf(folder, filename, FULL)[0]
+    return expected, valid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--policies", type=int, default=10)
+    parser.add_argument("--vehicles", type=int, default=3)
+    parser.add_argument("--endorsements", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--ajax-latency-ms", type=float, default=80)
+    parser.add_argument("--pdf-latency-ms", type=float, default=300)
+    parser.add_argument("--companies", nargs="+", default=list(COMPANIES))
+    parser.add_argument("--shared", action="store_true", help="one browser, a context per company")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    fixtures = build_fixtures(args.policies, args.vehicles, args.endorsements)
+    portal = MockPortal(
+        fixtures,
+        latency_ms=args.latency_ms,
+        ajax_latency_ms=args.ajax_latency_ms,
+        pdf_latency_ms=args.pdf_latency_ms,
+    )
+    work_folder = tempfile.mkdtemp(prefix="bench_pipeline_")
+    failed = False
+    with portal:
+        configure_environment(portal, work_folder)
+        # Imported after the environment is set: some modules read it at import
+        from bse_downloader import BseDownloader
+        from driver_creator import LocalDriverCreator
+        from sancor_downloader import SancorDownloader
+        from session_pool import SessionPool
+        from sura_downloader import SuraDownloader
+
+        downloader_classes = {"SURA": SuraDownloader, "BSE": BseDownloader, "SANCOR": SancorDownloader}
+        session_pool = SessionPool(LocalDriverCreator(), headless=True, shared=args.shared)
+        print(f"{'company':>7} {'policies':>8} {'certs ok':>9} {'seconds':>8} {'policies/min':>12}")
+        try:
+            for company in args.companies:
+                downloader = downloader_classes[company](session_pool=session_pool)
+                policies = downloader_policies(fixtures, company)
+                start = time.monotonic()
+                downloader.process_policies(policies)
+                elapsed = time.monotonic() - start
+                expected, valid = count_certificates(downloader, policies)
+                failed = failed or valid < expected
+                print(
+                    f"{company:>7} {len(policies):>8} {f'{valid}/{expected}':>9} "
+                    f"{elapsed:>8.1f} {len(policies) / elapsed * 60:>12.1f}"
+                )
+                print(f"        {downloader.timings.summary()}")
+        finally:
+            session_pool.close_all()
+        print(f"Mock portal: {portal.summary()}")
+    print(f"Downloads left in {work_folder}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Compare policy_data.get_grouped_policy_data with the previous implementation.
+
+Builds a synthetic policy sheet (companies, multi-vehicle policies, pending
+policies, bicycles, missing dates and fuel), groups it with both
+implementations and checks that the output is identical, including the
+order of companies, policies and vehicles.
+
+Usage:
+    python benchmarks/bench_grouped_policy_data.py [--rows 50000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+COMPANIES = ("SURA", "BSE", "SANCOR", "MAPFRE", "PORTO")
+BRANDS = ("VOLKSWAGEN", "FIAT", "CHEVROLET", "TOYOTA", "RAVE", "TREK", "OTRAS MARCAS")
+COVERAGES = ("TOTAL", "SOA", "RC BASICO", "BASICO", " TERCEROS ", None)
+COLUMNS = [
+    "Cliente",
+    "Compañia",
+    "Poliza",
+    "Vencimiento",
+    "Cobertura",
+    "Matricula",
+    "Marca",
+    "Modelo",
+    "Año",
+    "Combustible",
+]
+
+
+def build_sheet(rows, seed=1):
+    """Synthetic sheet rows with the columns used by get_grouped_policy_data."""
+    rng = random.Random(seed)
+    data = []
+    policy = 1900000
+    while len(data) < rows:
+        policy += rng.randint(1, 20)
+        company = rng.choice(COMPANIES)
+        pending = rng.random() < 0.02
+        expiration = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 700))
+        # The very first policy keeps a date: the previous implementation needs it
+        no_date = data and rng.random() < 0.01
+        coverage = rng.choice(COVERAGES)
+        client = f"CLIENTE{policy % 997}, NOMBRE"
+        for _ in range(rng.choice((1, 1, 1, 2, 3, 8))):
+            brand = rng.choice(BRANDS)
+            model = "E-BIKE" if rng.random() < 0.03 else f"MODELO {rng.randint(1, 40)}"
+            data.append(
+                [
+                    client,
+                    company,
+                    "Pendiente" if pending else str(policy),
+                    "" if no_date else expiration.strftime("%d/%m/%Y"),
+                    coverage,
+                    "" if rng.random() < 0.02 else f"S{rng.choice('ABCD')}{rng.randint(1000, 9999)}",
+                    brand,
+                    model,
+                    rng.randint(2005, 2025),
+                    None if rng.random() < 0.1 else "NAFTA",
+                ]
+            )
+    return data[:rows]
+
+
+def configure_environment(work_folder, rows):
+    """Point policy_data to the synthetic sheet."""
+    csv_file_path = os.path.join(work_folder, "sheet.csv")
+    pd.DataFrame(build_sheet(rows), columns=COLUMNS).to_csv(csv_file_path, index=False)
+    interval_file = os.path.join(work_folder, "last_update")
+    with open(interval_file, "w") as f:
+        f.write(datetime.now().replace(second=0, microsecond=0).strftime("%Y-%m-%d %H:%M:%S"))
+    os.environ["CSV_FILE_PATH"] = csv_file_path
+    os.environ["UPDATE_INTERVAL_FILE"] = interval_file
+    os.environ["UPDATE_INTERVAL"] = "1000000"
+    os.environ["DATABASE_FILE"] = os.path.join(work_folder, "chat_history.db")
+
+
+def legacy_grouped_policy_data(df):
+    """get_grouped_policy_data before the single groupby pass, for comparison."""
+    string_columns = ["Matricula", "Marca", "Modelo"]
+    df[string_columns] = df[string_columns].fillna("")
+    if not pd.api.types.is_datetime64_any_dtype(df["Vencimiento"]):
+        df["Vencimiento"] = pd.to_datetime(df["Vencimiento"], format="%d/%m/%Y", errors="coerce")
+    df = df.dropna(subset=["Compañia", "Poliza"])
+    df = df[df["Poliza"] != "Pendiente"]
+
+    result = {}
+    bicycle_brands = ["OTRAS MARCAS", "RAVE", "GYROOR", "BIANCHI", "TREK"]
+    cancelled_policies = ["1938091", "1940520", "1961256", "2123126", "2138316",
+                          "2160105", "2172904", "9801834", "9279761", "9280934"]
+    for company in df["Compañia"].unique():
+        company_df = df[df["Compañia"] == company]
+        policies = []
+        for policy_num in company_df["Poliza"].unique():
+            cancelled = policy_num in cancelled_policies
+            policy_df = company_df[company_df["Poliza"] == policy_num]
+            if len(policy_df) == 0:
+                continue
+            policy_expiration = policy_df["Vencimiento"].iloc[0]
+            expiration_str = None
+            if not pd.isna(policy_expiration):
+                expiration_str = policy_expiration.strftime("%d/%m/%Y")
+                policy_year = str(policy_expiration.year)
+            policy_coverage = policy_df["Cobertura"].iloc[0]
+            soa_only = False
+            if not pd.isna(policy_coverage):
+                policy_coverage = policy_coverage.strip()
+                soa_only = policy_coverage in ["SOA", "RC BASICO", "BASICO"]
+            else:
+                policy_coverage = ""
+            vehicles = []
+            contains_cars = False
+            empty_license_plate = 0
+            for _, row in policy_df.iterrows():
+                brand = row["Marca"]
+                license_plate = row["Matricula"]
+                if pd.isna(license_plate):
+                    license_plate = str(empty_license_plate)
+                    empty_license_plate += 1
+                fuel = row["Combustible"]
+                if pd.isna(fuel):
+                    fuel = None
+                model = row["Modelo"]
+                if pd.isna(model):
+                    model = ""
+                is_car = not ("BIKE" in model or (fuel is None and brand in bicycle_brands))
+                contains_cars = contains_cars or is_car
+                vehicles.append(
+                    {"license_plate": license_plate, "brand": brand, "model": row["Modelo"], "year": row["Año"]}
+                )
+            policies.append(
+                {
+                    "number": policy_num,
+                    "year": policy_year,
+                    "expiration_date": expiration_str,
+                    "contains_cars": contains_cars,
+                    "vehicles": vehicles,
+                    "soa_only": soa_only,
+                    "obs": "",
+                    "coverage": policy_coverage,
+                    "cancelled": cancelled,
+                }
+            )
+        if policies:
+            result[company] = policies
+    return result
+
+
+def same_output(expected, actual):
+    """Equal values, types and order (dict equality alone ignores key order)."""
+    if list(expected) != list(actual):
+        return False
+    for company in expected:
+        for old, new in zip(expected[company], actual[company]):
+            if old != new or type(old["number"]) is not type(new["number"]):
+                return False
+            for old_vehicle, new_vehicle in zip(old["vehicles"], new["vehicles"]):
+                if [type(v) for v in old_vehicle.values()] != [type(v) for v in new_vehicle.values()]:
+                    return False
+        if len(expected[company]) != len(actual[company]):
+            return False
+    return True
+
+
+def timed(function, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        configure_environment(work_folder, args.rows)
+        # Imported after the environment is set: it reads it at import
+        import policy_data
+        from chat_history_db import init_db
+
+        init_db()
+        policy_data.load_policy_data()
+        sheet = policy_data.df.copy()
+
+        def current():
+            policy_data.df = sheet.copy()
+            return policy_data.get_grouped_policy_data()
+
+        expected, legacy_seconds = timed(lambda: legacy_grouped_policy_data(sheet.copy()), args.repeat)
+        actual, seconds = timed(current, args.repeat)
+
+    policies = sum(len(p) for p in actual.values())
+    print(f"{args.rows} rows, {len(actual)} companies, {policies} policies")
+    print(f"{'implementation':>14} {'seconds':>8}")
+    print(f"{'nested masks':>14} {legacy_seconds:>8.3f}")
+    print(f"{'groupby':>14} {seconds:>8.3f}")
+    print(f"speedup {legacy_seconds / seconds:.1f}x, identical output: {same_output(expected, actual)}")
+    sys.exit(0 if same_output(expected, actual) else 1)
+
+
+if __name__ == "__main__":
+    main()
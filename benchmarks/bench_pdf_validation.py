@@ -0,0 +1,77 @@
+"""
+Compare the FULL and FAST modes of pdf_utils.is_valid_pdf.
+
+Every PDF found under the corpus folder is validated as is, and a few
+truncated copies of each are generated to check that damaged certificates
+are still rejected. The FULL mode result is used as ground truth.
+
+Usage:
+    python benchmarks/bench_pdf_validation.py /srv/shared_files [--limit 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pdf_utils import FAST, FULL, is_valid_pdf
+
+# Fractions of the original size kept in the truncated copies
+TRUNCATIONS = (0.5, 0.9, 0.999)
+
+
+def build_corpus(corpus_folder, limit, tmp_folder):
+    originals = sorted(Path(corpus_folder).glob("**/*.pdf"))[:limit]
+    corpus = [(str(p), "original") for p in originals]
+    for index, path in enumerate(originals):
+        data = path.read_bytes()
+        for fraction in TRUNCATIONS:
+            truncated = Path(tmp_folder) / f"{index}_{fraction}.pdf"
+            truncated.write_bytes(data[: max(1, int(len(data) * fraction))])
+            corpus.append((str(truncated), f"truncated {fraction}"))
+    return corpus
+
+
+def run(corpus, mode):
+    results = []
+    start = time.perf_counter()
+    for path, _ in corpus:
+        valid, _ = is_valid_pdf(os.path.dirname(path), os.path.basename(path), mode)
+        results.append(valid)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus_folder")
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_folder:
+        corpus = build_corpus(args.corpus_folder, args.limit, tmp_folder)
+        if not corpus:
+            print(f"No PDF files found in {args.corpus_folder}")
+            return
+
+        full_results, full_seconds = run(corpus, FULL)
+        fast_results, fast_seconds = run(corpus, FAST)
+
+    false_negatives = sum(1 for f, q in zip(full_results, fast_results) if f and not q)
+    false_positives = sum(1 for f, q in zip(full_results, fast_results) if q and not f)
+    files = len(corpus)
+    valid = sum(full_results)
+
+    print(f"Files: {files} ({valid} valid according to full parse)")
+    print(f"full: {full_seconds:.2f}s, {files / full_seconds:.1f} files/s")
+    print(f"fast: {fast_seconds:.2f}s, {files / fast_seconds:.1f} files/s")
+    print(f"Speedup: {full_seconds / fast_seconds:.1f}x")
+    print(f"False negatives (valid rejected by fast): {false_negatives}"
+          f" ({false_negatives / max(valid, 1):.2%})")
+    print(f"False positives (invalid accepted by fast): {false_positives}")
+
+
+if __name__ == "__main__":
+    main()
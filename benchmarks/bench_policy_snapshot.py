@@ -0,0 +1,60 @@
+"""
+Load time of the policy data: CSV parsed by pandas vs the Arrow snapshot.
+
+Writes a synthetic sheet (see bench_grouped_policy_data) both as the CSV the
+sync used to publish and as the memory-mapped snapshot, and times loading
+each one the way policy_data does.
+
+Usage:
+    python benchmarks/bench_policy_snapshot.py [--rows 50000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_grouped_policy_data import COLUMNS, build_sheet
+from policy_snapshot import read_snapshot, write_snapshot
+
+
+def median_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [[str(value) if value is not None else "" for value in row] for row in build_sheet(args.rows)]
+    with tempfile.TemporaryDirectory() as work_folder:
+        csv_path = os.path.join(work_folder, "policies.csv")
+        snapshot_path = os.path.join(work_folder, "policies.arrow")
+        pd.DataFrame(rows, columns=COLUMNS).to_csv(csv_path, index=False)
+        write_seconds = median_ms(lambda: write_snapshot(COLUMNS, rows, snapshot_path), 1)
+
+        print(f"{args.rows} rows, snapshot written in {write_seconds:.0f}ms")
+        print(f"{'format':>22} {'size KB':>8} {'load ms':>8}")
+        for name, path, load in (
+            ("csv (read_csv)", csv_path, lambda: pd.read_csv(csv_path)),
+            ("snapshot", snapshot_path, lambda: read_snapshot(snapshot_path)),
+            ("snapshot parsed dates", snapshot_path, lambda: read_snapshot(snapshot_path, True)),
+        ):
+            size = os.path.getsize(path) / 1024
+            print(f"{name:>22} {size:>8.0f} {median_ms(load, args.repeat):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
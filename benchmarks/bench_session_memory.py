@@ -0,0 +1,138 @@
+"""
+Memory per concurrent browser session in each browser mode.
+
+Opens N sessions with a local Chrome (chromedriver must be installed), loads
+the SURA search page of the mock portal in each one and reads the memory of
+the Chrome process tree from /proc:
+
+    headed    one headed Chrome per session (needs a display)
+    headless  one headless Chrome per session
+    shared    one headless Chrome with an isolated browser context per session
+
+RSS double counts the memory shared between Chrome processes, so PSS (from
+smaps_rollup) is reported as well. "per extra session" is the marginal cost
+used to size the number of parallel workers.
+
+Usage:
+    python benchmarks/bench_session_memory.py [--sessions 1 4] [--modes headless shared]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mock_portal import MockPortal, build_fixtures
+
+MODES = ("headed", "headless", "shared")
+
+
+def children(pid):
+    """All descendants of a process."""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name may contain spaces: ppid comes after ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+    found, pending = [], [pid]
+    while pending:
+        for child in parents.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def memory_kb(pid):
+    """(rss, pss) in KB of one process, zero if it is gone."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            values = dict(
+                (line.split()[0].rstrip(":"), int(line.split()[1]))
+                for line in f
+                if line.split()[0] in ("Rss:", "Pss:")
+            )
+        return values.get("Rss", 0), values.get("Pss", 0)
+    except (OSError, ValueError):
+        return 0, 0
+
+
+def browser_memory_kb(webdrivers):
+    """Total (rss, pss) of the Chrome processes started by the given chromedrivers."""
+    rss = pss = 0
+    for driver in webdrivers:
+        for pid in children(driver.service.process.pid):
+            process_rss, process_pss = memory_kb(pid)
+            rss += process_rss
+            pss += process_pss
+    return rss, pss
+
+
+def open_sessions(mode, count, url):
+    """Open count sessions in the given mode; returns (webdrivers to measure, closer)."""
+    from driver_creator import LocalDriverCreator
+    from policy_driver import PolicyDriver
+    from shared_browser import ContextDriver, SharedBrowser
+
+    if mode == "shared":
+        browser = SharedBrowser(LocalDriverCreator(), headless=True)
+        drivers = [ContextDriver(browser, f"worker{i}") for i in range(count)]
+    else:
+        browser = None
+        drivers = [
+            PolicyDriver(LocalDriverCreator(), headless=mode == "headless")
+            for _ in range(count)
+        ]
+    for driver in drivers:
+        driver.init_driver()
+        driver.navigate(url)
+
+    def close():
+        for driver in drivers:
+            driver.close()
+        if browser:
+            browser.quit()
+
+    measured = [browser.webdriver] if browser else [d.driver for d in drivers]
+    return measured, close
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--modes", nargs="+", default=["headless", "shared"], choices=MODES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("TMP_DOWNLOAD_FOLDER", tempfile.mkdtemp(prefix="bench_memory_"))
+
+    with MockPortal(build_fixtures(policies=1), latency_ms=0) as portal:
+        url = f"{portal.base_url}/sura/search"
+        print(f"{'mode':>8} {'sessions':>8} {'RSS MB':>8} {'PSS MB':>8} {'PSS/session':>11} {'per extra session':>17}")
+        for mode in args.modes:
+            first = None
+            for count in sorted(args.sessions):
+                webdrivers, close = open_sessions(mode, count, url)
+                try:
+                    rss, pss = browser_memory_kb(webdrivers)
+                finally:
+                    close()
+                marginal = ""
+                if first is None:
+                    first = (count, pss)
+                elif count > first[0]:
+                    marginal = f"{(pss - first[1]) / (count - first[0]) / 1024:.0f} MB"
+                print(
+                    f"{mode:>8} {count:>8} {rss / 1024:>8.0f} {pss / 1024:>8.0f} "
+                    f"{pss / count / 1024:>10.0f}M {marginal:>17}"
+                )
+
+
+if __name__ == "__main__":
+    main()
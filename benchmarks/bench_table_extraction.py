@@ -0,0 +1,123 @@
+"""
+Count WebDriver round-trips needed by PolicyDriver.extract_table_data.
+
+Uses an in-memory fake of the remote WebDriver that counts every command it
+would have sent to the Selenium grid, for fleets of increasing size, comparing
+the per-cell element walk with the single execute_script extraction.
+
+Usage:
+    python benchmarks/bench_table_extraction.py [--columns 8] [--latency-ms 40]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from policy_driver import PolicyDriver
+from wait_strategy import WaitStrategy
+
+FLEET_SIZES = (1, 5, 20, 50, 150)
+COLUMNS_NEEDED = ["Matrícula", "Estado", "Nro."]
+
+
+class Counter:
+    commands = 0
+
+
+class FakeElement:
+    def __init__(self, text="", children=None):
+        self._text = text
+        self.children = children or {}
+
+    @property
+    def text(self):
+        Counter.commands += 1
+        return self._text
+
+    def is_displayed(self):
+        Counter.commands += 1
+        return True
+
+    def find_elements(self, by, value):
+        Counter.commands += 1
+        return self.children.get(value, [])
+
+    def find_element(self, by, value):
+        Counter.commands += 1
+        return self.children[value][0]
+
+
+class FakeTableDriver:
+    def __init__(self, headers, rows):
+        self.headers = headers
+        self.rows = rows
+        row_elements = [FakeElement(children={"td": [FakeElement(c) for c in r]}) for r in rows]
+        self.table = FakeElement(
+            children={
+                "thead tr th": [FakeElement(h) for h in headers],
+                "tbody tr": row_elements,
+            }
+        )
+
+    def find_element(self, by, value):
+        Counter.commands += 1
+        return self.table
+
+    def execute_script(self, script, *args):
+        Counter.commands += 1
+        return json.dumps({"headers": self.headers, "rows": self.rows})
+
+
+class BrokenScriptDriver(FakeTableDriver):
+    def execute_script(self, script, *args):
+        Counter.commands += 1
+        raise ValueError("script extraction disabled")
+
+
+def build_table(vehicles, columns):
+    headers = COLUMNS_NEEDED + [f"Col{i}" for i in range(columns - len(COLUMNS_NEEDED))]
+    rows = [
+        [f"SDA{i:04d}", "Incluido", str(i + 1)] + ["x"] * (columns - len(COLUMNS_NEEDED))
+        for i in range(vehicles)
+    ]
+    return headers, rows
+
+
+def count_commands(driver_class, headers, rows):
+    policy_driver = PolicyDriver.__new__(PolicyDriver)
+    policy_driver.driver = driver_class(headers, rows)
+    policy_driver.waits = WaitStrategy(stats_file=None)
+    Counter.commands = 0
+    data = policy_driver.extract_table_data("GrdItems", COLUMNS_NEEDED)
+    assert len(data) == len(rows)
+    return Counter.commands, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+    # The fallback warning is expected for the per-cell baseline
+    logging.disable(logging.WARNING)
+
+    print(f"{'vehicles':>8} {'per-cell':>9} {'script':>7} {'saved':>6} {'time saved':>11}")
+    for vehicles in FLEET_SIZES:
+        headers, rows = build_table(vehicles, args.columns)
+        element_commands, element_data = count_commands(BrokenScriptDriver, headers, rows)
+        script_commands, script_data = count_commands(FakeTableDriver, headers, rows)
+        assert element_data == script_data
+        # The broken script call itself is not part of the original element walk
+        element_commands -= 1
+        saved = element_commands - script_commands
+        print(
+            f"{vehicles:>8} {element_commands:>9} {script_commands:>7} {saved:>6} "
+            f"{saved * args.latency_ms / 1000:>10.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
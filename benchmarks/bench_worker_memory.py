@@ -0,0 +1,92 @@
+"""
+Memory used by the policy data across worker processes: every worker parsing
+the CSV vs every worker mapping the same published snapshot version.
+
+Starts N worker processes that load the synthetic sheet (see
+bench_grouped_policy_data) and run a query over it, then adds up the PSS
+(shared pages split among the processes that map them) each one grew by
+while loading. Workers first load a tiny sheet so the libraries' own
+memory is not counted.
+
+Usage:
+    python benchmarks/bench_worker_memory.py [--rows 200000] [--workers 1 2 4 8]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_grouped_policy_data import COLUMNS, build_sheet
+from bench_session_memory import memory_kb
+from policy_snapshot import read_snapshot, write_snapshot
+
+
+def sheet_rows(rows):
+    return [["" if v is None else str(v) for v in row] for row in build_sheet(rows)]
+
+
+def load(kind, path):
+    df = pd.read_csv(path) if kind == "csv" else read_snapshot(path)
+    df["Cliente"].str.len().sum()
+    return df
+
+
+def worker(kind, path, warm_path, loaded, results, done):
+    warm = load(kind, warm_path)
+    _, base = memory_kb(os.getpid())
+    df = load(kind, path)
+    # Measured once every worker has loaded, so the shared pages are split
+    loaded.wait()
+    _, pss = memory_kb(os.getpid())
+    results.put(pss - base)
+    done.wait()
+    del warm, df
+
+
+def measure(kind, path, warm_path, workers):
+    """Total PSS growth in KB of workers loading path at the same time."""
+    context = multiprocessing.get_context("spawn")
+    loaded, results, done = context.Barrier(workers), context.Queue(), context.Event()
+    processes = [
+        context.Process(target=worker, args=(kind, path, warm_path, loaded, results, done))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    growth = sum(results.get() for _ in processes)
+    done.set()
+    for process in processes:
+        process.join()
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        paths = {}
+        for name, rows in (("warm", sheet_rows(100)), ("policies", sheet_rows(args.rows))):
+            csv_path = os.path.join(work_folder, f"{name}.csv")
+            pd.DataFrame(rows, columns=COLUMNS).to_csv(csv_path, index=False)
+            arrow_path = os.path.join(work_folder, f"{name}.arrow")
+            write_snapshot(COLUMNS, rows, arrow_path)
+            paths[name] = {"csv": csv_path, "snapshot": arrow_path}
+
+        print(f"{args.rows} rows, PSS in MB")
+        print(f"{'data':>8} {'workers':>7} {'total':>8} {'per worker':>10}")
+        for kind in ("csv", "snapshot"):
+            for workers in args.workers:
+                growth = measure(kind, paths["policies"][kind], paths["warm"][kind], workers) / 1024
+                print(f"{kind:>8} {workers:>7} {growth:>8.1f} {growth / workers:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
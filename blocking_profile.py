@@ -0,0 +1,91 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+DEFAULT = "default"
+STRICT = "strict"
+
+# off | default | strict
+BLOCKING_PROFILE = os.getenv("BLOCKING_PROFILE", DEFAULT).lower()
+# Log load time and bytes of every page navigated to
+BLOCKING_MEASURE = os.getenv("BLOCKING_MEASURE", "false").lower() == "true"
+
+FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+ANALYTICS_PATTERNS = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*hotjar.com*",
+    "*clarity.ms*",
+    "*connect.facebook.net*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+]
+# Images are not listed: the Chrome prefs in PolicyDriver already disable them.
+# Visibility checks depend on stylesheets (overlays, hidden rows), so CSS is
+# only blocked by the strict profile
+CSS_PATTERNS = ["*.css"]
+
+PROFILES = {
+    OFF: [],
+    DEFAULT: FONT_PATTERNS + ANALYTICS_PATTERNS,
+    STRICT: FONT_PATTERNS + ANALYTICS_PATTERNS + CSS_PATTERNS,
+}
+
+# Performance timeline of the page just loaded, read in a single round-trip
+PAGE_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of resources) { bytes += r.transferSize || 0; }
+return {
+    load_ms: nav ? (nav.loadEventEnd || nav.domContentLoadedEventEnd) - nav.startTime : 0,
+    bytes: bytes,
+    requests: resources.length + 1
+};
+"""
+
+
+def blocked_patterns(company: str, profile: str = None) -> List[str]:
+    """
+    URL patterns to block for a company.
+
+    BLOCKING_ALLOWLIST_<COMPANY> is a comma-separated list of patterns removed
+    from the profile, e.g. BLOCKING_ALLOWLIST_BSE="*.woff,*.woff2".
+    """
+    profile = (profile or BLOCKING_PROFILE).lower()
+    if profile not in PROFILES:
+        logger.warning(f"Unknown blocking profile {profile}, using {OFF}")
+        profile = OFF
+    allowlist = os.getenv(f"BLOCKING_ALLOWLIST_{company.upper()}", "")
+    allowed = {p.strip() for p in allowlist.split(",") if p.strip()}
+    return [p for p in PROFILES[profile] if p not in allowed]
+
+
+@dataclass
+class PageStats:
+    """Page loads measured through the Performance API."""
+
+    pages: int = 0
+    load_seconds: float = 0.0
+    bytes: int = 0
+    requests: int = 0
+
+    def add(self, stats: Dict):
+        self.pages += 1
+        self.load_seconds += (stats.get("load_ms") or 0) / 1000
+        self.bytes += int(stats.get("bytes") or 0)
+        self.requests += int(stats.get("requests") or 0)
+
+    def summary(self) -> str:
+        if not self.pages:
+            return "no pages measured"
+        return (
+            f"{self.pages} pages, avg load {self.load_seconds / self.pages:.2f}s, "
+            f"avg {self.bytes / self.pages / 1024:.0f} KB, "
+            f"avg {self.requests / self.pages:.0f} requests"
+        )
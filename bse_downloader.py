@@ -1,6 +1,7 @@
 import logging
 from typing import Dict, Any
 from policy_driver import ElementNotFoundException, Locator, LocatorType, DriverException, TimeoutError
+from wait_strategy import LEGACY_IMPLICIT_WAIT
 from base_downloader import (
     BaseDownloader,
     ClickDownloadStarter,
@@ -173,6 +174,13 @@ class BseDownloader(BaseDownloader):
                 Locator(LocatorType.CSS, "div.column.second-col"),
                 context=expanded_content_el
             )
+            # The details are filled after the row expands; once a value is
+            # there, the missing labels are looked up without waiting
+            self.driver.find_elements(
+                Locator(LocatorType.CSS, "div.desc"),
+                context=second_col_el,
+                timeout=LEGACY_IMPLICIT_WAIT,
+            )
             brand_el = self.driver.find_elements(
                 Locator(LocatorType.XPATH, ".//div[./label[contains(text(), 'Marca')]]/div[@class='desc']"),
                 context=second_col_el
@@ -402,7 +410,8 @@ class BseDownloader(BaseDownloader):
 
             current_lctor = policy_row_status_lctor
             try:
-                status_el = self.driver.find_element(current_lctor, context=row_el)
+                # The row is already rendered: a missing status cell is an answer, not a delay
+                status_el = self.driver.find_element(current_lctor, context=row_el, timeout=0)
                 status = status_el.text.strip()
             except ElementNotFoundException:
                 status = "INEXISTENTE"
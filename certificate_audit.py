@@ -0,0 +1,176 @@
+"""
+Bulk audit of the certificate store.
+
+Walks DOWNLOAD_FOLDER ({company}/{policy}/{year}[/{plate}]/{soa,mercosur}.pdf),
+validates the PDFs with a process pool and writes a manifest that
+BaseDownloader.is_downloaded can answer from without touching the files.
+
+Usage:
+    python certificate_audit.py [--workers 4] [--mode fast]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+from pdf_cache import PdfValidationCache
+from pdf_utils import FAST, is_valid_pdf
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_FOLDER = os.getenv("DOWNLOAD_FOLDER")
+CERT_MANIFEST_FILE = os.getenv("CERT_MANIFEST_FILE")
+CERTIFICATE_FILES = ("soa.pdf", "mercosur.pdf")
+
+ManifestKey = Tuple[str, str, str, str]
+
+
+class CertificateManifest:
+    """
+    Status of every certificate in the store keyed by (company, policy, year, plate).
+
+    Each entry maps a certificate filename to True (valid) or False (invalid).
+    """
+
+    def __init__(self, entries: Dict[ManifestKey, Dict[str, bool]] = None, generated_at=None):
+        self.entries = entries or {}
+        self.generated_at = generated_at or datetime.now().isoformat()
+
+    @staticmethod
+    def key(company, policy_number, year, license_plate) -> ManifestKey:
+        return (str(company), str(policy_number), str(year), license_plate or "")
+
+    def is_valid(self, company, policy_number, year, license_plate, filename) -> bool:
+        files = self.entries.get(self.key(company, policy_number, year, license_plate))
+        return bool(files and files.get(filename))
+
+    def mark(self, company, policy_number, year, license_plate, filename, valid: bool):
+        key = self.key(company, policy_number, year, license_plate)
+        self.entries.setdefault(key, {})[filename] = valid
+
+    def counts(self) -> Dict[str, int]:
+        statuses = [v for files in self.entries.values() for v in files.values()]
+        return {
+            "vehicles": len(self.entries),
+            "valid": sum(1 for v in statuses if v),
+            "invalid": sum(1 for v in statuses if not v),
+        }
+
+    def save(self, path: str):
+        data = {
+            "generated_at": self.generated_at,
+            "entries": {"|".join(key): files for key, files in self.entries.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CertificateManifest"]:
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = {
+            tuple(key.split("|", 3)): files for key, files in data["entries"].items()
+        }
+        return cls(entries, data.get("generated_at"))
+
+
+def find_certificates(download_folder: str):
+    """Yield (key, folder, filename) for every certificate file in the store."""
+    for folder, _, files in os.walk(download_folder):
+        found = [f for f in files if f in CERTIFICATE_FILES]
+        if not found:
+            continue
+        parts = os.path.relpath(folder, download_folder).split(os.sep)
+        if len(parts) == 3:
+            parts.append("")
+        if len(parts) != 4:
+            logger.warning(f"Unexpected certificate folder layout: {folder}")
+            continue
+        for filename in found:
+            yield CertificateManifest.key(*parts), folder, filename
+
+
+def _validate(args):
+    folder, filename, mode = args
+    start = time.monotonic()
+    valid, message = is_valid_pdf(folder, filename, mode)
+    return valid, message, time.monotonic() - start
+
+
+def audit_store(
+    download_folder: str = DOWNLOAD_FOLDER,
+    workers: int = None,
+    mode: str = FAST,
+    cache: PdfValidationCache = None,
+) -> CertificateManifest:
+    """
+    Validate every certificate in the store in parallel and build the manifest.
+
+    Files already validated with the same size and mtime are answered from the
+    validation cache; only new or changed files are sent to the process pool.
+    """
+    start = time.monotonic()
+    cache = cache or PdfValidationCache()
+    manifest = CertificateManifest()
+    pending = []
+    for key, folder, filename in find_certificates(download_folder):
+        file_path = os.path.join(folder, filename)
+        stat = os.stat(file_path)
+        cached = cache.lookup(file_path, stat, mode)
+        if cached is not None:
+            manifest.mark(*key, filename, cached[0])
+        else:
+            pending.append((key, folder, filename, file_path, stat))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                _validate,
+                [(folder, filename, mode) for _, folder, filename, _, _ in pending],
+                chunksize=16,
+            )
+            for (key, _, filename, file_path, stat), (valid, message, seconds) in zip(
+                pending, results
+            ):
+                manifest.mark(*key, filename, valid)
+                cache.store(file_path, stat, mode, valid, message, seconds, commit=False)
+        cache.conn.commit()
+
+    logger.info(
+        f"Certificate audit finished in {time.monotonic() - start:.1f}s: "
+        f"{manifest.counts()}, {len(pending)} files parsed. {cache.stats.summary()}"
+    )
+    return manifest
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+    parser = argparse.ArgumentParser(description="Audit the certificate store")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mode", default=FAST)
+    parser.add_argument("--output", default=CERT_MANIFEST_FILE)
+    args = parser.parse_args()
+
+    manifest = audit_store(DOWNLOAD_FOLDER, workers=args.workers, mode=args.mode)
+    if args.output:
+        manifest.save(args.output)
+        logger.info(f"Manifest saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,17 @@ import sqlite3, os
 import logging
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 from datetime import datetime, timedelta, date
-from models import Policy, Car
+from models import (
+    CANCELLED_POLICY,
+    REMOVE_VEHICLE,
+    SET_EXPIRATION,
+    SET_LICENSE_PLATE,
+    Car,
+    Policy,
+    SheetOverride,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +20,33 @@ load_dotenv()
 
 DATABASE_NAME = os.getenv("DATABASE_FILE")
 
+# Fixes of the policy sheet, loaded when the sheet_override table is created
+DEFAULT_SHEET_OVERRIDES = [
+    SheetOverride(SET_LICENSE_PLATE, "1968422", value="SDG1586"),
+    SheetOverride(SET_LICENSE_PLATE, "2107841", value="SDH5834"),
+    SheetOverride(SET_LICENSE_PLATE, "1957105", value="SDF6464"),
+    SheetOverride(SET_LICENSE_PLATE, "1968824", value="SDH3532"),
+    SheetOverride(SET_LICENSE_PLATE, "1972525", value="BED4626"),
+    SheetOverride(SET_EXPIRATION, "6498386", value="05/09/2026", obs="Renovada"),
+    SheetOverride(REMOVE_VEHICLE, "8170039", license_plate="SCJ3994"),
+    SheetOverride(REMOVE_VEHICLE, "8466824", license_plate="SDE5032"),
+    SheetOverride(REMOVE_VEHICLE, "9235631", license_plate="AAY1121"),
+    SheetOverride(REMOVE_VEHICLE, "9250984", license_plate="SCV6690"),
+    SheetOverride(REMOVE_VEHICLE, "9250985", license_plate="SBL1616"),
+    SheetOverride(REMOVE_VEHICLE, "9586003", license_plate="B580319"),
+    SheetOverride(REMOVE_VEHICLE, "9220158", license_plate="SAC9491"),
+    SheetOverride(CANCELLED_POLICY, "1938091", obs="SURA"),
+    SheetOverride(CANCELLED_POLICY, "1940520"),
+    SheetOverride(CANCELLED_POLICY, "1961256"),
+    SheetOverride(CANCELLED_POLICY, "2123126"),
+    SheetOverride(CANCELLED_POLICY, "2138316"),
+    SheetOverride(CANCELLED_POLICY, "2160105"),
+    SheetOverride(CANCELLED_POLICY, "2172904"),
+    SheetOverride(CANCELLED_POLICY, "9801834"),
+    SheetOverride(CANCELLED_POLICY, "9279761", obs="BSE"),
+    SheetOverride(CANCELLED_POLICY, "9280934", obs="BSE"),
+]
+
 
 def init_db():
     """Initialize the database and create tables if they don't exist"""
@@ -100,6 +135,28 @@ def init_db():
         )
         """
         )
+        # Sheet override table
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sheet_override'"
+        )
+        seed_overrides = cursor.fetchone() is None
+        cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS sheet_override (
+            kind TEXT,
+            company TEXT,
+            policy_number TEXT,
+            license_plate TEXT,
+            value TEXT,
+            obs TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (kind, company, policy_number, license_plate)
+        )
+        """
+        )
+        if seed_overrides:
+            for override in DEFAULT_SHEET_OVERRIDES:
+                _upsert_sheet_override(cursor, override)
         conn.commit()
 
 
@@ -406,25 +463,27 @@ def get_policy(company: str, policy_number: str) -> Optional[Policy]:
         )
         row = cursor.fetchone()
         if row:
-            return Policy(
-                company=row["company"],
-                policy_number=row["policy_number"],
-                year=row["year"],
-                expiration_date=date.fromisoformat(row["expiration_date"]),
-                downloaded=bool(row["downloaded"]),
-                contains_cars=bool(row["contains_cars"]),
-                soa_only=bool(row["soa_only"]),
-                cancelled=bool(row["cancelled"]),
-                obs=row["obs"],
-                timestamp=(
-                    datetime.fromisoformat(row["timestamp"])
-                    if row["timestamp"]
-                    else None
-                ),
-            )
+            return _policy_from_row(row)
         return None
 
 
+def _policy_from_row(row: sqlite3.Row) -> Policy:
+    return Policy(
+        company=row["company"],
+        policy_number=row["policy_number"],
+        year=row["year"],
+        expiration_date=date.fromisoformat(row["expiration_date"]),
+        downloaded=bool(row["downloaded"]),
+        contains_cars=bool(row["contains_cars"]),
+        soa_only=bool(row["soa_only"]),
+        cancelled=bool(row["cancelled"]),
+        obs=row["obs"],
+        timestamp=(
+            datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
+        ),
+    )
+
+
 def insert_car(car: Car) -> None:
     """Insert a new car into the database"""
     with sqlite3.connect(DATABASE_NAME) as conn:
@@ -468,34 +527,156 @@ def get_cars_by_policy(company: str, policy_number: str) -> List[Car]:
             """,
             (company, policy_number),
         )
+        return [_car_from_row(row) for row in cursor.fetchall()]
+
+
+def _car_from_row(row: sqlite3.Row) -> Car:
+    return Car(
+        company=row["company"],
+        policy_number=row["policy_number"],
+        license_plate=row["license_plate"],
+        brand=row["brand"],
+        model=row["model"],
+        year=row["year"],
+        soa_file_path=row["soa_file_path"],
+        mercosur_file_path=row["mercosur_file_path"],
+        obs=row["obs"],
+        timestamp=(
+            datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
+        ),
+    )
+
+
+def get_policy_with_cars(company: str, policy_number: str) -> Optional[Policy]:
+    """Get a policy with its cars in one query"""
+    policy = get_policy(company, policy_number)
+    if policy and policy.contains_cars:
+        policy.cars = get_cars_by_policy(company, policy_number)
+    return policy
+
+
+def _upsert_sheet_override(cursor: sqlite3.Cursor, override: SheetOverride) -> None:
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO sheet_override (
+            kind, company, policy_number, license_plate, value, obs
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            override.kind,
+            override.company,
+            override.policy_number,
+            override.license_plate,
+            override.value,
+            override.obs,
+        ),
+    )
+
+
+def add_sheet_override(override: SheetOverride) -> None:
+    """Add a sheet override, replacing the one with the same kind and keys"""
+    with sqlite3.connect(DATABASE_NAME) as conn:
+        _upsert_sheet_override(conn.cursor(), override)
+        conn.commit()
+
+
+def delete_sheet_override(
+    kind: str, company: str, policy_number: str, license_plate: str
+) -> bool:
+    """Delete a sheet override. Returns False if it didn't exist"""
+    with sqlite3.connect(DATABASE_NAME) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM sheet_override
+            WHERE kind = ? AND company = ? AND policy_number = ? AND license_plate = ?
+            """,
+            (kind, company, policy_number, license_plate),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+
+def get_sheet_overrides() -> List[SheetOverride]:
+    """Retrieve all sheet overrides"""
+    with sqlite3.connect(DATABASE_NAME) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT kind, company, policy_number, license_plate, value, obs, timestamp
+            FROM sheet_override
+            ORDER BY kind, company, policy_number, license_plate
+            """
+        )
         return [
-            Car(
+            SheetOverride(
+                kind=row["kind"],
                 company=row["company"],
                 policy_number=row["policy_number"],
                 license_plate=row["license_plate"],
-                brand=row["brand"],
-                model=row["model"],
-                year=row["year"],
-                soa_file_path=row["soa_file_path"],
-                mercosur_file_path=row["mercosur_file_path"],
+                value=row["value"],
                 obs=row["obs"],
                 timestamp=(
-                    datetime.fromisoformat(row["timestamp"])
-                    if row["timestamp"]
-                    else None
+                    datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
                 ),
             )
             for row in cursor.fetchall()
         ]
 
 
-def get_policy_with_cars(company: str, policy_number: str) -> Optional[Policy]:
-    """Get a policy with its cars in one query"""
-    policy = get_policy(company, policy_number)
-    if policy and policy.contains_cars:
-        policy.cars = get_cars_by_policy(company, policy_number)
-    return policy
+# (company, policy_number) pairs per query, below the SQLite variable limit
+_BULK_CHUNK_SIZE = 400
 
 
-# Initialize the database when this module is imported
-init_db()
+def get_policies_with_cars(
+    keys: Iterable[Tuple[str, str]],
+) -> Dict[Tuple[str, str], Policy]:
+    """
+    Get the policies with their cars for many (company, policy_number) pairs
+    in a few queries. Pairs not in the database are left out of the result.
+    """
+    keys = list(dict.fromkeys(keys))
+    policies = {}
+    with sqlite3.connect(DATABASE_NAME) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        for start in range(0, len(keys), _BULK_CHUNK_SIZE):
+            chunk = keys[start : start + _BULK_CHUNK_SIZE]
+            values = ", ".join(["(?, ?)"] * len(chunk))
+            params = [value for key in chunk for value in key]
+            cursor.execute(
+                f"""
+                SELECT
+                    company, policy_number, year, expiration_date,
+                    downloaded, contains_cars, soa_only, cancelled, obs, timestamp
+                FROM policy
+                WHERE (company, policy_number) IN (VALUES {values})
+                """,
+                params,
+            )
+            for row in cursor.fetchall():
+                policy = _policy_from_row(row)
+                policies[(policy.company, policy.policy_number)] = policy
+
+        with_cars = [key for key, policy in policies.items() if policy.contains_cars]
+        for start in range(0, len(with_cars), _BULK_CHUNK_SIZE):
+            chunk = with_cars[start : start + _BULK_CHUNK_SIZE]
+            values = ", ".join(["(?, ?)"] * len(chunk))
+            params = [value for key in chunk for value in key]
+            cursor.execute(
+                f"""
+                SELECT
+                    company, policy_number, license_plate,
+                    brand, model, year,
+                    soa_file_path, mercosur_file_path, obs, timestamp
+                FROM car
+                WHERE (company, policy_number) IN (VALUES {values})
+                """,
+                params,
+            )
+            for row in cursor.fetchall():
+                car = _car_from_row(row)
+                policies[(car.company, car.policy_number)].cars.append(car)
+    return policies
+
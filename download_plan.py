@@ -0,0 +1,99 @@
+import csv
+import io
+import logging
+import re
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+COMPANY_COLUMN = "Compañia"
+POLICY_COLUMN = "Poliza"
+LICENSE_PLATE_COLUMN = "Matricula"
+
+# Plate-shaped words of the response: letters and digits, optionally
+# separated by a hyphen or a space (SDB4050, SDB-4050, SDB 4050)
+PLATE_TOKEN_PATTERN = re.compile(r"(?<!\w)([A-Za-z]+)[\s-]?(\d+)(?!\w)")
+
+
+def _normalize_plate(license_plate: str) -> str:
+    return re.sub(r"[^0-9A-Z]", "", license_plate.upper())
+
+
+def _response_plates(response: str) -> Set[str]:
+    return {
+        f"{letters}{digits}".upper()
+        for letters, digits in PLATE_TOKEN_PATTERN.findall(response)
+    }
+
+
+def _vehicle_description(row: Dict[str, str]) -> str:
+    description = " ".join(
+        value for value in (row.get("Marca", "").strip(), row.get("Modelo", "").strip()) if value
+    )
+    year = row.get("Año", "").strip()
+    if year:
+        year = year[:-2] if year.endswith(".0") else year
+        description = f"{description} ({year})" if description else year
+    return description
+
+
+def build_download_plan(
+    filtered_data: str, response: str, download_soa: bool, download_mer: bool
+) -> Optional[Dict[str, List[dict]]]:
+    """
+    The certificates to download, in the format of ai_agents.get_parsed_list,
+    built from the filtered rows (CSV) the response was generated from.
+
+    Only the policies the response mentions are kept and, if it mentions
+    license plates of a policy, only those vehicles. Returns None when the
+    rows can't be used (no company or policy column, or no policy of the
+    rows is in the response), then the response has to be parsed instead.
+    """
+    if not filtered_data:
+        return None
+    rows = list(csv.DictReader(io.StringIO(filtered_data)))
+    if not rows or not {COMPANY_COLUMN, POLICY_COLUMN} <= set(rows[0]):
+        return None
+
+    response_plates = _response_plates(response)
+    plan: Dict[str, List[dict]] = {}
+    policies: Dict[tuple, dict] = {}
+    for row in rows:
+        company = (row[COMPANY_COLUMN] or "").strip()
+        policy_number = (row[POLICY_COLUMN] or "").strip()
+        if not company or not policy_number:
+            continue
+        if not re.search(rf"(?<!\d){re.escape(policy_number)}(?!\d)", response):
+            continue
+        policy = policies.get((company, policy_number))
+        if policy is None:
+            policy = {
+                "policy_number": policy_number,
+                "download_soa": download_soa,
+                "download_mer": download_mer,
+                "vehicles": [],
+            }
+            client = (row.get("Cliente") or "").strip()
+            if client:
+                policy["client"] = client
+            policies[(company, policy_number)] = policy
+            plan.setdefault(company, []).append(policy)
+        vehicle = {}
+        license_plate = (row.get(LICENSE_PLATE_COLUMN) or "").strip()
+        if license_plate:
+            vehicle["license_plate"] = license_plate
+            vehicle["mentioned"] = _normalize_plate(license_plate) in response_plates
+        description = _vehicle_description(row)
+        if description:
+            vehicle["desc"] = description
+        policy["vehicles"].append(vehicle)
+
+    if not plan:
+        return None
+    for company_policies in plan.values():
+        for policy in company_policies:
+            if any(v.get("mentioned") for v in policy["vehicles"]):
+                policy["vehicles"] = [v for v in policy["vehicles"] if v.get("mentioned")]
+            for vehicle in policy["vehicles"]:
+                vehicle.pop("mentioned", None)
+    return plan
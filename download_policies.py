@@ -15,11 +15,13 @@ logging.basicConfig(
 
 import chat_history_db as db
 from models import Policy, Car
-from policy_data import get_grouped_policy_data, load_csv_data
+from policy_data import get_grouped_policy_data, load_policy_data
 from sura_downloader import SuraDownloader
 from bse_downloader import BseDownloader
-from policy_driver import PolicyDriver
 from driver_creator import DriverCreator
+from session_pool import SessionPool
+from run_checkpoint import RunCheckpoint, CHECKPOINT_FILE
+from certificate_audit import audit_store, CERT_MANIFEST_FILE
 
 logger = logging.getLogger(__name__)
 
@@ -114,7 +116,8 @@ def insert_processed_policies(company: str, policies: List[Dict]) -> None:
             logger.error(f"Database error with policy {policy_data.get('number')}: {e}")
 
 
-load_csv_data()
+db.init_db()
+load_policy_data(parsed_dates=True)
 
 policy_data = get_grouped_policy_data()
 
@@ -127,11 +130,30 @@ for company, policies in policy_data.items():
         new_policy_data[company] = kept_policies
 
 
-sura_downloader = SuraDownloader(PolicyDriver(DriverCreator(), headless=False))
-
-for company, policies in new_policy_data.items():
-    if company != "SURA":
-        continue
-
-    sura_downloader.process_policies(policies)
-    insert_processed_policies(company, policies)
+checkpoint = RunCheckpoint(CHECKPOINT_FILE)
+session_pool = SessionPool(DriverCreator())
+sura_downloader = SuraDownloader(session_pool=session_pool)
+sura_downloader.checkpoint = checkpoint
+sura_downloader.manifest = audit_store(
+    sura_downloader.download_folder,
+    mode=sura_downloader.pdf_validation_mode,
+    cache=sura_downloader.pdf_cache,
+)
+if CERT_MANIFEST_FILE:
+    sura_downloader.manifest.save(CERT_MANIFEST_FILE)
+
+try:
+    for company, policies in new_policy_data.items():
+        if company != "SURA":
+            continue
+
+        pending_policies = [p for p in policies if not checkpoint.restore(company, p)]
+        if pending_policies:
+            sura_downloader.process_policies(pending_policies)
+        insert_processed_policies(company, policies)
+    logger.info(f"Resume summary: {checkpoint.summary()}")
+    checkpoint.clear()
+finally:
+    sura_downloader.logout()
+    session_pool.log_summary()
+    session_pool.close_all()
@@ -14,4 +14,12 @@ class DriverCreator:
         return webdriver.Remote(
             command_executor=f"http://{selenium_host}:4444/wd/hub",
             options=chrome_options,
-        )
\ No newline at end of file
+        )
+
+
+class LocalDriverCreator:
+    """Starts Chrome on this machine through chromedriver, e.g. against the mock portal."""
+
+    def create(self, chrome_options):
+        chrome_options.page_load_strategy = 'eager'
+        return webdriver.Chrome(options=chrome_options)
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+DRIVER_METRICS_FILE = os.getenv("DRIVER_METRICS_FILE")
+
+NO_POLICY = "-"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class DriverMetrics:
+    """
+    Times every remote WebDriver command and tags it with the downloader step
+    (login, search, endorsement, vehicle, download) and policy being processed.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._steps: List[str] = []
+        self._policy = NO_POLICY
+        # policy -> "step;nested_step;command" -> [count, seconds]
+        self._stacks: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(lambda: [0, 0.0])
+        )
+        self._command_seconds: Dict[str, List[float]] = defaultdict(list)
+        self._step_seconds: Dict[str, List[float]] = defaultdict(list)
+        self._policy_seconds: List[float] = []
+        self._policy_start = None
+
+    def instrument(self, webdriver):
+        """Wrap webdriver.execute, the single entry point for remote commands."""
+        execute = webdriver.execute
+
+        def timed_execute(driver_command, params=None):
+            start = time.monotonic()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.record_command(driver_command, time.monotonic() - start)
+
+        webdriver.execute = timed_execute
+        return webdriver
+
+    def record_command(self, command: str, seconds: float):
+        stack = ";".join(self._steps + [command]) if self._steps else f"other;{command}"
+        entry = self._stacks[self._policy][stack]
+        entry[0] += 1
+        entry[1] += seconds
+        self._command_seconds[command].append(seconds)
+
+    @contextmanager
+    def step(self, name: str):
+        """Tag the remote commands issued inside the block with a step name."""
+        self._steps.append(name)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._step_seconds[name].append(time.monotonic() - start)
+            self._steps.pop()
+
+    def start_policy(self, policy_number):
+        self._policy = str(policy_number)
+        self._policy_start = time.monotonic()
+
+    def end_policy(self):
+        if self._policy_start is not None:
+            self._policy_seconds.append(time.monotonic() - self._policy_start)
+        breakdown = self.policy_breakdown(self._policy)
+        if breakdown:
+            logger.info(f"Driver time breakdown for policy {self._policy}:\n{breakdown}")
+        self._policy = NO_POLICY
+        self._policy_start = None
+
+    def folded_stacks(self, policy_number=None) -> List[str]:
+        """
+        Lines in the folded stack format ("policy;step;command milliseconds")
+        accepted by flame graph tools.
+        """
+        policies = [str(policy_number)] if policy_number is not None else self._stacks
+        lines = []
+        for policy in policies:
+            for stack, (_, seconds) in self._stacks.get(policy, {}).items():
+                lines.append(f"{policy};{stack} {int(seconds * 1000)}")
+        return lines
+
+    def policy_breakdown(self, policy_number) -> str:
+        stacks = self._stacks.get(str(policy_number), {})
+        total = sum(seconds for _, seconds in stacks.values()) or 1.0
+        rows = sorted(stacks.items(), key=lambda item: item[1][1], reverse=True)
+        return "\n".join(
+            f"  {stack}: {int(count)} cmds, {seconds:.2f}s ({seconds / total:.0%})"
+            for stack, (count, seconds) in rows
+        )
+
+    def summary(self) -> str:
+        commands = sum(len(v) for v in self._command_seconds.values())
+        lines = [f"Remote commands: {commands}"]
+        for name, values in sorted(self._step_seconds.items()):
+            lines.append(self._percentiles_line(f"step {name}", values))
+        for name, values in sorted(
+            self._command_seconds.items(), key=lambda item: -sum(item[1])
+        ):
+            lines.append(self._percentiles_line(f"command {name}", values))
+        if self._policy_seconds:
+            lines.append(self._percentiles_line("policy", self._policy_seconds))
+        return "\n".join(lines)
+
+    def _percentiles_line(self, label, values) -> str:
+        return (
+            f"  {label}: n={len(values)} total={sum(values):.1f}s "
+            f"p50={percentile(values, 50):.3f}s p90={percentile(values, 90):.3f}s "
+            f"p99={percentile(values, 99):.3f}s"
+        )
+
+    def log_summary(self):
+        logger.info(f"WebDriver metrics:\n{self.summary()}")
+        if DRIVER_METRICS_FILE:
+            with open(DRIVER_METRICS_FILE, "a", encoding="utf-8") as f:
+                f.write("\n".join(self.folded_stacks()) + "\n")
@@ -350,11 +350,11 @@ def weighted_fuzzy_search(df, target_column, target_string, top_n=10):
             total_score += score * weight
         return round(total_score, 1)
 
-    # Calculate scores for all rows
-    df["match_score"] = df[target_column].fillna("").apply(calculate_weighted_score)
+    # Calculate scores for all rows (on a copy: df is the shared policy data)
+    scores = df[target_column].fillna("").apply(calculate_weighted_score)
 
     # Sort by score descending
-    df_sorted = df.sort_values("match_score", ascending=False)
+    df_sorted = df.assign(match_score=scores).sort_values("match_score", ascending=False)
 
     # Get all rows with score >= Nth score
     if len(df_sorted) > top_n:
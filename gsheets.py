@@ -1,41 +1,225 @@
 import csv, io, os
 import gspread
 import logging
+import threading
+import time
+import google.auth.transport.requests
+import requests
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from google.oauth2 import service_account
 
 load_dotenv()
 
 GOOGLE_API_CREDENTIALS_PATH = os.getenv("GOOGLE_API_CREDENTIALS_PATH")
+# Seconds before expiry at which the access token is refreshed
+TOKEN_REFRESH_MARGIN = int(os.getenv("GSHEETS_TOKEN_REFRESH_MARGIN", "300"))
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
 
 logger = logging.getLogger(__name__)
 
 
-def get_sheet_data(spreadsheet_url, sheet_name):
+@dataclass
+class SheetTimings:
+    """Seconds spent in each part of a sheet read."""
+
+    auth: float = 0.0
+    metadata: float = 0.0
+    data: float = 0.0
+    rows: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows} rows: auth {self.auth:.3f}s, metadata {self.metadata:.3f}s, "
+            f"data {self.data:.3f}s"
+        )
+
+
+class SheetClient:
     """
-    Retrieves all values from a Google Sheet, optionally removing the 'Plantilla HTML' column.
+    Long-lived gspread client. The credentials, the authorized client (and
+    its pooled HTTPS connections) and the worksheet handles are created once
+    and reused by every sync. The access token is refreshed some minutes
+    before it expires, so a sync never waits for a refresh after a 401.
+    """
+
+    def __init__(self, credentials_path=GOOGLE_API_CREDENTIALS_PATH):
+        self.credentials_path = credentials_path
+        self._credentials = None
+        self._client = None
+        # Token refreshes go through their own session, not the authorized one
+        self._token_request = None
+        self._worksheets = {}
+        # Header row of each worksheet, to resolve the column positions once
+        self._headers = {}
+        self._lock = threading.Lock()
+        self.last_timings = None
+
+    def _authorize(self):
+        if self._client is None:
+            self._credentials = service_account.Credentials.from_service_account_file(
+                self.credentials_path, scopes=SCOPES
+            )
+            self._client = gspread.authorize(self._credentials)
+            self._token_request = google.auth.transport.requests.Request(
+                requests.Session()
+            )
+        expiry = self._credentials.expiry
+        if (
+            not self._credentials.token
+            or expiry is None
+            or expiry - datetime.now(timezone.utc).replace(tzinfo=None)
+            < timedelta(seconds=TOKEN_REFRESH_MARGIN)
+        ):
+            self._credentials.refresh(self._token_request)
+            logger.info("Google API token refreshed")
+
+    def _worksheet(self, spreadsheet_url, sheet_name):
+        key = (spreadsheet_url, sheet_name)
+        if key not in self._worksheets:
+            spreadsheet = self._client.open_by_url(spreadsheet_url)
+            self._worksheets[key] = spreadsheet.worksheet(sheet_name)
+        return self._worksheets[key]
+
+    def reset(self):
+        """Drop the client and the handles; the next read starts from scratch."""
+        self._credentials = None
+        self._client = None
+        self._worksheets = {}
+        self._headers = {}
+
+    def worksheet(self, spreadsheet_url, sheet_name):
+        with self._lock:
+            self._authorize()
+            return self._worksheet(spreadsheet_url, sheet_name)
+
+    def _read(self, spreadsheet_url, sheet_name, fetch):
+        """Run fetch(worksheet, timings) with a fresh token, timing each part."""
+        with self._lock:
+            timings = SheetTimings()
+            for attempt in (1, 2):
+                start = time.perf_counter()
+                self._authorize()
+                timings.auth += time.perf_counter() - start
+
+                start = time.perf_counter()
+                sheet = self._worksheet(spreadsheet_url, sheet_name)
+                timings.metadata += time.perf_counter() - start
+
+                try:
+                    data = fetch(sheet, timings)
+                    break
+                except gspread.exceptions.APIError as e:
+                    if attempt == 2:
+                        raise
+                    # The cached handle may be stale (sheet renamed, revoked access)
+                    logger.info(f"Error reading the sheet, reconnecting: {str(e)}")
+                    self.reset()
+            timings.rows = len(data)
+            self.last_timings = timings
+            logger.info(f"get_sheet_data: {timings.summary()}")
+            return data
+
+    def get_all_values(self, spreadsheet_url, sheet_name):
+        def fetch(sheet, timings):
+            start = time.perf_counter()
+            data = sheet.get_all_values()
+            timings.data += time.perf_counter() - start
+            return data
+
+        return self._read(spreadsheet_url, sheet_name, fetch)
+
+    def _column_positions(self, key, sheet, columns, refresh=False):
+        """Sheet positions (0 based, in sheet order) of the columns found in the header."""
+        if refresh or key not in self._headers:
+            self._headers[key] = sheet.row_values(1)
+        header = self._headers[key]
+        missing = [c for c in columns if c not in header]
+        if missing:
+            logger.info(f"Columns not found in the sheet: {', '.join(missing)}")
+        return sorted(header.index(c) for c in columns if c in header)
+
+    def get_columns(self, spreadsheet_url, sheet_name, columns):
+        """
+        Only the given columns of the sheet (header included), in sheet order.
+        Contiguous columns are requested as one range, all in a single batch_get.
+        """
+        key = (spreadsheet_url, sheet_name)
+
+        def fetch(sheet, timings):
+            for refresh in (False, True):
+                start = time.perf_counter()
+                positions = self._column_positions(key, sheet, columns, refresh)
+                timings.metadata += time.perf_counter() - start
+
+                ranges = []
+                for position in positions:
+                    if ranges and ranges[-1][1] == position - 1:
+                        ranges[-1][1] = position
+                    else:
+                        ranges.append([position, position])
+                start = time.perf_counter()
+                value_ranges = sheet.batch_get(
+                    [f"{column_letter(first)}:{column_letter(last)}" for first, last in ranges],
+                    major_dimension="COLUMNS",
+                )
+                timings.data += time.perf_counter() - start
+
+                # Empty columns at the end of a range and empty cells at the end
+                # of a column are not returned
+                data_columns = []
+                for (first, last), value_range in zip(ranges, value_ranges):
+                    data_columns.extend(value_range)
+                    data_columns.extend([] for _ in range(last - first + 1 - len(value_range)))
+                header = self._headers[key]
+                if all(
+                    (column[0] if column else "") == header[position]
+                    for position, column in zip(positions, data_columns)
+                ):
+                    break
+                # Columns moved since the header was read
+                logger.info("Sheet header changed, reading it again")
+            row_count = max((len(column) for column in data_columns), default=0)
+            return [
+                list(row)
+                for row in zip(*(column + [""] * (row_count - len(column)) for column in data_columns))
+            ]
+
+        return self._read(spreadsheet_url, sheet_name, fetch)
+
+
+def column_letter(position):
+    """A1 notation letter of a 0 based column position."""
+    return gspread.utils.rowcol_to_a1(1, position + 1)[:-1]
+
+
+sheet_client = SheetClient()
+
+
+def get_sheet_data(spreadsheet_url, sheet_name, columns=None):
+    """
+    Retrieves all values from a Google Sheet, or only some of its columns.
 
     Parameters:
         spreadsheet_url (str): The URL of the Google Sheet.
         sheet_name (str): The name of the worksheet.
-        remove_plantilla_html (bool): If True, removes the 'Plantilla HTML' column.
+        columns (list): Header names of the columns to retrieve, all if None.
 
     Returns:
         list: Sheet data as a list of rows, or None if failed.
     """
     try:
-
-        sheet, success = get_google_sheet(spreadsheet_url, sheet_name)
-        if not success or sheet is None:
-            logger.info("Failed to obtain the sheet using get_google_sheet")
-            return None
-
-        data = sheet.get_all_values()
-
-        return data
+        if columns:
+            return sheet_client.get_columns(spreadsheet_url, sheet_name, columns)
+        return sheet_client.get_all_values(spreadsheet_url, sheet_name)
     except Exception as e:
         error_message = f"Error getting google sheet: {str(e)}"
         logger.info(error_message)
+        sheet_client.reset()
         return None
 
 
@@ -43,20 +227,7 @@ def get_google_sheet(spreadsheet_url, sheet_name):
     logger.info(f"Inicia get_google_sheet. Sheet: {sheet_name}")
 
     try:
-        # Load credentials and create a client
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_API_CREDENTIALS_PATH, scopes=scope
-        )
-
-        client = gspread.authorize(credentials)
-
-        # Open the spreadsheet and select the sheet
-        spreadsheet = client.open_by_url(spreadsheet_url)
-        sheet = spreadsheet.worksheet(sheet_name)
+        sheet = sheet_client.worksheet(spreadsheet_url, sheet_name)
 
         logger.info("OK. Fin get_google_sheet")
 
@@ -65,6 +236,7 @@ def get_google_sheet(spreadsheet_url, sheet_name):
     except Exception as e:
         error_message = f"Error al obtener la hoja de Google Sheets: {str(e)}"
         logger.info(error_message)
+        sheet_client.reset()
         return None, False
 
 
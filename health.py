@@ -0,0 +1,169 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Thresholds past which an instance reports itself degraded (503), so the
+# load balancer sends the traffic to other instances. Only conditions of the
+# instance itself: a slow LLM or an old dataset affect every instance alike
+HEALTH_MAX_SQLITE_MS = float(os.getenv("HEALTH_MAX_SQLITE_MS", "250"))
+HEALTH_MAX_OUTBOUND_QUEUE = int(os.getenv("HEALTH_MAX_OUTBOUND_QUEUE", "50"))
+HEALTH_MAX_POOL_SATURATION = float(os.getenv("HEALTH_MAX_POOL_SATURATION", "0.9"))
+# Thresholds of the conditions only reported as warnings
+HEALTH_MAX_DATASET_AGE = float(os.getenv("HEALTH_MAX_DATASET_AGE", "1440"))  # minutes
+HEALTH_MAX_LLM_P95 = float(os.getenv("HEALTH_MAX_LLM_P95", "30"))  # seconds
+# The LLM latency percentiles are computed from the last HEALTH_LATENCY_WINDOW
+# calls made in the last HEALTH_LATENCY_MAX_AGE minutes
+HEALTH_LATENCY_WINDOW = int(os.getenv("HEALTH_LATENCY_WINDOW", "200"))
+HEALTH_LATENCY_MAX_AGE = float(os.getenv("HEALTH_LATENCY_MAX_AGE", "15"))
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class LatencyWindow:
+    """
+    Durations of the last size calls made in the last max_age minutes, and
+    how many of them failed. Old calls age out even if no new ones are made.
+    """
+
+    def __init__(
+        self,
+        size: int = HEALTH_LATENCY_WINDOW,
+        max_age: float = HEALTH_LATENCY_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._calls = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.max_age = max_age
+        self._clock = clock
+
+    def record(self, seconds: float, ok: bool = True):
+        with self._lock:
+            self._calls.append((self._clock(), seconds, ok))
+
+    def timed(self, function: Callable, *args, **kwargs):
+        """Call function and record how long it took."""
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = function(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            self.record(time.perf_counter() - start, ok)
+
+    def stats(self) -> dict:
+        oldest = self._clock() - self.max_age * 60
+        with self._lock:
+            while self._calls and self._calls[0][0] < oldest:
+                self._calls.popleft()
+            calls = [(seconds, ok) for _, seconds, ok in self._calls]
+        durations = sorted(seconds for seconds, _ in calls)
+        p50, p95 = percentile(durations, 0.5), percentile(durations, 0.95)
+        return {
+            "calls": len(calls),
+            "errors": sum(1 for _, ok in calls if not ok),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class Gauge:
+    """A thread-safe count of things in progress."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self._value += 1
+
+    def dec(self):
+        with self._lock:
+            self._value -= 1
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+# Recorded by ai_agents
+llm_latency = LatencyWindow()
+# Replies scheduled to be sent through Twilio and not sent yet
+outbound_queue = Gauge()
+
+
+def probe(function: Callable) -> dict:
+    """Milliseconds function takes, or the error it raised."""
+    start = time.perf_counter()
+    try:
+        function()
+    except Exception as e:
+        return {"ms": None, "error": str(e)}
+    return {"ms": round((time.perf_counter() - start) * 1000, 2), "error": None}
+
+
+def dataset_status(path: Optional[str], last_sync: Optional[dict]) -> dict:
+    """
+    Version (file name) of the loaded policy data and its age in minutes:
+    since the last successful sync, or since the file was written if that
+    is more recent (a sync that finds no changes does not write it).
+    """
+    if not path:
+        return {"version": None, "age_minutes": None, "last_sync": last_sync}
+    updated = []
+    try:
+        updated.append(os.path.getmtime(path))
+    except OSError:
+        pass
+    if last_sync:
+        updated.append(datetime.fromisoformat(last_sync["timestamp"]).timestamp())
+    age = (time.time() - max(updated)) / 60 if updated else None
+    return {
+        "version": os.path.basename(path),
+        "age_minutes": round(age, 1) if age is not None else None,
+        "last_sync": last_sync,
+    }
+
+
+def degraded_reasons(report: Dict) -> List[str]:
+    """Why the instance should not get traffic, empty if it's healthy."""
+    reasons = []
+    if report["startup"]["status"] != "ready":
+        reasons.append(f"startup {report['startup']['status']}")
+    sqlite = report["sqlite"]
+    if sqlite["error"] or sqlite["ms"] > HEALTH_MAX_SQLITE_MS:
+        reasons.append(f"sqlite {sqlite['error'] or str(sqlite['ms']) + 'ms'}")
+    if report["outbound_queue"] > HEALTH_MAX_OUTBOUND_QUEUE:
+        reasons.append(f"outbound queue {report['outbound_queue']}")
+    pool = report["worker_pool"]
+    if pool["saturation"] >= HEALTH_MAX_POOL_SATURATION:
+        reasons.append(f"worker pool {pool['busy']}/{pool['size']}")
+    return reasons
+
+
+def health_warnings(report: Dict) -> List[str]:
+    """Problems shared by every instance: reported, but the instance stays up."""
+    found = []
+    age = report["dataset"]["age_minutes"]
+    if report["startup"]["status"] == "ready" and age is None:
+        found.append("no dataset loaded")
+    elif age is not None and age > HEALTH_MAX_DATASET_AGE:
+        found.append(f"dataset age {age} minutes")
+    p95 = report["llm"]["p95"]
+    if p95 is not None and p95 > HEALTH_MAX_LLM_P95:
+        found.append(f"llm p95 {p95}s")
+    return found
@@ -0,0 +1,119 @@
+import logging
+import re
+from collections import Counter
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+PLATE = "plate"
+POLICY = "policy"
+
+# Uruguayan plates (SDB4050, SDB-4050, OBO587). Letters that are keywords
+# or words ("soa 1234", "con 1234", "ano 2017") are not a plate, the
+# filler words are excluded too
+PLATE_PATTERN = re.compile(r"\b([a-z]{3})[\s-]?(\d{3,4})\b")
+NOT_PLATE_LETTERS = {
+    "soa", "mer", "pol", "nro", "mat", "ano", "mes", "dia", "hoy", "uno",
+    "una", "dos", "ese", "que", "sin", "mas", "son", "era", "fue", "hay",
+}
+# Policy numbers have 7 or 8 digits. Phones (099123456) and cédulas have
+# the same shape, so a number is a policy only if the message says so
+POLICY_PATTERN = re.compile(r"\b[1-9]\d{6,7}\b")
+POLICY_WORDS = {"poliza", "polizas", "pol"}
+
+SOA_WORDS = {"soa"}
+MERCOSUR_WORDS = {"mercosur", "mer", "verde"}
+# Words that don't change the query. A message with any other word goes to
+# the LLM: it may be a name, a reference to previous results, etc.
+FILLER_WORDS = {
+    "pasame", "pasa", "pasas", "dame", "mandame", "manda", "mandas", "enviame",
+    "envia", "envias", "quiero", "necesito", "me", "el", "la", "los", "las",
+    "de", "del", "y", "e", "con", "por", "favor", "porfa", "para", "al", "a",
+    "certificado", "certificados", "carta", "tarjeta", "poliza", "polizas",
+    "pol", "nro", "numero", "n", "matricula", "matriculas", "mat", "auto",
+    "vehiculo", "datos", "info", "informacion", "sobre", "todo", "todos",
+}
+
+COLUMNS = ["Cliente", "Compañia", "Poliza", "Matricula", "Marca", "Modelo", "Año", "Cobertura", "Vencimiento"]
+
+
+class IntentRouter:
+    """
+    Builds the filter of generate_query locally for the messages that are
+    only license plates and/or policy numbers, optionally asking for the
+    SOA or Mercosur certificates ("soa SDB4050", "poliza 1968422").
+    Counts how many messages it answers and how many go to the LLM.
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = 0
+
+    def route(self, message: str) -> Optional[dict]:
+        """The filter for message (lowercase, without accents), None if it's not a lookup."""
+        plates: List[str] = []
+
+        def take_plate(match):
+            if match.group(1) in NOT_PLATE_LETTERS or match.group(1) in FILLER_WORDS:
+                return match.group(0)
+            plates.append(f"{match.group(1)}{match.group(2)}".upper())
+            return " "
+
+        rest = PLATE_PATTERN.sub(take_plate, message)
+        policies = POLICY_PATTERN.findall(rest)
+        rest = POLICY_PATTERN.sub(" ", rest)
+        words = set(re.findall(r"\w+", rest))
+        if (
+            (not plates and not policies)
+            or (policies and not words & POLICY_WORDS)
+            or words - FILLER_WORDS - SOA_WORDS - MERCOSUR_WORDS
+        ):
+            self.misses += 1
+            return None
+
+        soa = bool(words & SOA_WORDS)
+        mer = bool(words & MERCOSUR_WORDS)
+        conditions, subjects = [], []
+        if plates:
+            conditions.append(f"Matricula.str.contains('{'|'.join(plates)}', case=False, na=False)")
+            subjects.append(f"{'las matrículas' if len(plates) > 1 else 'la matrícula'} {', '.join(plates)}")
+        if policies:
+            # Before the first snapshot the data comes from the CSV, where
+            # Poliza can be a number column (1968422 or 1968422.0)
+            conditions.append(f"Poliza.astype('str').str.strip().str.removesuffix('.0').isin({policies})")
+            subjects.append(f"{'las pólizas' if len(policies) > 1 else 'la póliza'} {', '.join(policies)}")
+        subject = " y ".join(subjects)
+
+        certificates = " y ".join(
+            name for name, wanted in (("SOA", soa), ("Mercosur", mer)) if wanted
+        )
+        filter = {
+            "qs": " | ".join(f"({c})" for c in conditions) if len(conditions) > 1 else conditions[0],
+            "c": COLUMNS,
+            "p": False,
+            "n": f"No se encontró {subject} en los datos disponibles.",
+            "r": (
+                f"Pasame el certificado {certificates} de {subject}"
+                if certificates
+                else f"Datos de {subject}"
+            ),
+            "soa": soa,
+            "mer": mer,
+        }
+        if len(plates) == 1:
+            filter["lp"] = plates[0]
+        self.hits[PLATE if plates else POLICY] += 1
+        return filter
+
+    def stats(self) -> dict:
+        routed = sum(self.hits.values())
+        total = routed + self.misses
+        return {
+            "messages": total,
+            "routed": dict(self.hits),
+            "llm": self.misses,
+            "hit_rate": round(routed / total, 3) if total else None,
+        }
+
+
+intent_router = IntentRouter()
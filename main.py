@@ -1,11 +1,13 @@
+import anyio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Response, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from twilio.rest import Client
 from pydantic import BaseModel
 from auth import verify_admin
-from message_processor import get_response_to_message
 from chat_history_db import (
+    init_db,
     get_client_history,
     get_query_history,
     cleanup_old_messages,
@@ -14,14 +16,90 @@ from chat_history_db import (
     get_user,
     get_all_users,
     get_policy_with_cars,
+    add_sheet_override,
+    delete_sheet_override,
+    get_sheet_overrides,
 )
+from health import (
+    dataset_status,
+    degraded_reasons,
+    health_warnings,
+    llm_latency,
+    outbound_queue,
+    probe,
+)
+from models import SHEET_OVERRIDE_KINDS, SheetOverride
 from split_messages import split_long_message
 from files_finder import find_files
 
 import os
+import threading
 import time
-
-app = FastAPI()
+from dataclasses import asdict
+
+# The message pipeline (pandas, OpenAI, the sheet data) and Twilio are
+# imported when first needed: the warm-up thread started at startup imports
+# them and loads the policy data while the server is already answering.
+# Until it finishes /health reports "starting"
+
+# Startup state reported by /health
+startup = {"status": "starting", "seconds": None, "error": None}
+# Seconds between checks of UPDATE_INTERVAL, so the sheet is synced even
+# when no messages arrive
+SHEET_SYNC_CHECK_INTERVAL = float(os.getenv("SHEET_SYNC_CHECK_INTERVAL", "60"))
+# A failed warm-up is retried after WARM_UP_RETRY_DELAY seconds, doubling
+# the delay up to WARM_UP_RETRY_MAX_DELAY
+WARM_UP_RETRY_DELAY = float(os.getenv("WARM_UP_RETRY_DELAY", "5"))
+WARM_UP_RETRY_MAX_DELAY = float(os.getenv("WARM_UP_RETRY_MAX_DELAY", "300"))
+
+
+def sheet_sync_loop():
+    """Sync the sheet when it's due and load the new version, if any."""
+    from policy_data import load_policy_data
+
+    while True:
+        time.sleep(SHEET_SYNC_CHECK_INTERVAL)
+        try:
+            load_policy_data()
+        except Exception as e:
+            print(f"Error in the periodic sheet sync: {e}", flush=True)
+
+
+def warm_up():
+    """
+    Import the message pipeline and load the policy data, retrying with
+    backoff until it works (e.g. the sheet may be briefly unavailable).
+    """
+    start = time.perf_counter()
+    delay = WARM_UP_RETRY_DELAY
+    while True:
+        try:
+            from policy_data import load_policy_data
+            import message_processor  # noqa: F401
+
+            load_policy_data()
+            break
+        except Exception as e:
+            print(f"Error warming up, retrying in {delay:.0f}s: {e}", flush=True)
+            startup["status"] = "error"
+            startup["error"] = str(e)
+        time.sleep(delay)
+        delay = min(delay * 2, WARM_UP_RETRY_MAX_DELAY)
+    startup["status"] = "ready"
+    startup["error"] = None
+    startup["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"Warm-up {startup['status']} in {startup['seconds']}s", flush=True)
+    threading.Thread(target=sheet_sync_loop, name="sheet-sync", daemon=True).start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 security = HTTPBasic()
 
 app.add_middleware(
@@ -37,11 +115,36 @@ AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 SHARED_FILES_URL = os.getenv("SHARED_FILES_URL")
 
-client = Client(ACCOUNT_SID, AUTH_TOKEN)
+client = None
+
+
+def get_client():
+    """The Twilio client, created on first use."""
+    global client
+    if client is None:
+        from twilio.rest import Client
+
+        client = Client(ACCOUNT_SID, AUTH_TOKEN)
+    return client
+
+
+def queue_reply(background_tasks: BackgroundTasks, function, *args):
+    """Schedule a Twilio reply, counted in the outbound queue until it's sent."""
+    outbound_queue.inc()
+
+    def send():
+        try:
+            function(*args)
+        finally:
+            outbound_queue.dec()
+
+    background_tasks.add_task(send)
 
 
 def send_delayed_response(user_number: str, user_message: str):
     """Process user input and send delayed bot response."""
+    from message_processor import get_response_to_message
+
     try:
 
         response_text, files_to_send = get_response_to_message(
@@ -67,14 +170,14 @@ def send_delayed_response(user_number: str, user_message: str):
 
 
 def send_message(user_number, message):
-    client.messages.create(from_=TWILIO_PHONE_NUMBER, to=user_number, body=message)
+    get_client().messages.create(from_=TWILIO_PHONE_NUMBER, to=user_number, body=message)
     print(f"Sent message: {message} to {user_number}", flush=True)
 
 
 def send_file(user_number, file_path, body="Requested document"):
     public_url = f"{SHARED_FILES_URL}/{file_path}"
 
-    client.messages.create(
+    get_client().messages.create(
         from_=TWILIO_PHONE_NUMBER,
         to=user_number,
         media_url=[public_url],
@@ -90,10 +193,10 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
     sender_number = form_data.get("From", "")
 
     if get_user(sender_number) is None:
-            background_tasks.add_task(send_message, sender_number, "No autorizado")
+            queue_reply(background_tasks, send_message, sender_number, "No autorizado")
     else:
-        background_tasks.add_task(
-            send_delayed_response, sender_number, incoming_message
+        queue_reply(
+            background_tasks, send_delayed_response, sender_number, incoming_message
         )
 
     return Response(status_code=200)
@@ -117,6 +220,8 @@ def answer_question(item: Item, credentials: HTTPBasicCredentials = Depends(secu
         if item.message.lower().strip() == "test":
             bot_response = 'Los autos asociados a clientes con el apellido "Pepito" son:  \n\n1. *PEPITO, WALTER Y PEPITA, SUSANA*:  \n   - FORD NEW 208 ALLURE 1.2 EXTRA FULL (2017, NAFTA, SCH8879)  \n   - FORD (1980, DIESEL, YUI6855)  \n   - TOYOTA RAV4 2.5 LIMITED PLUS HYBRID 4X4 (2034, NAFTA, TTT8998)  \n   - TOYOTA HILUX 3.0 SRV 4X2 (2013, DIESEL, QWE6545)  \n\n2. *TEST PEPITO, GUSTAVO ADOLFO*:  \n   - TRAILER TRANSPORTADOR DE ANIMALES (2015, sin combustible, OBO587)  \n   - CHEVROLET S 10 CTDI LT 4X4 2.8 AUT. (2023, DIESEL, OAE6054)  \n\n3. *TEST PEPITO, GIANELLA*:  \n   - MASERATI GHIBLI 3.0 (2017, NAFTA, DJK5583)  \n\n4. *SHACK PEPITO, MARIA VICTORIA*:  \n   - TOYOTA PRIUS C 1.5 HIBRIDO EXTRA FULL AUT. (2018, ELECTRONICOS, SCN5281)  \n   - NISSAN KICKS EXCLUSIVE 1.6 CVT AUT. (2021, NAFTA, ERT4578)  \n\n5. *TEST PEPITO, MARTIN Fernando*:  \n   - TOYOTA COROLLA CROSS HYBRID 1.8 SE-G AUT. (2023, NAFTA, SDB4115)  \n   - TOYOTA COROLLA 1.8 DLX (1986, DIESEL, PRP7993)  \n\n6. *TEST PEPITO, FEDERICO BERNARDO*:  \n   - VOLKSWAGEN GOL GP POWER 1.6 A/A (2013, NAFTA, EWE7385)'
         else:
+            from message_processor import get_response_to_message
+
             try:
                 bot_response, _ = get_response_to_message(item.message, item.number)
             except ValueError as ve:
@@ -200,20 +305,58 @@ def send_files(
         else:
             if user_wants_soa:
                 bot_response = "Enviando: SOA"
-                background_tasks.add_task(
-                    send_file, sender_number, soa, "Certificado SOA"
+                queue_reply(
+                    background_tasks, send_file, sender_number, soa, "Certificado SOA"
                 )
             if user_wants_mcs:
                 bot_response += ", Mercosur"
-                background_tasks.add_task(
-                    send_file, sender_number, mcs, "Certificado Mercosur"
+                queue_reply(
+                    background_tasks, send_file, sender_number, mcs, "Certificado Mercosur"
                 )
         return {"response": bot_response}
 
+# The health probes run on their own thread, so they answer even when the
+# request threads are all busy
+health_limiter = anyio.CapacityLimiter(1)
+
+
+def health_report() -> dict:
+    policy_path, last_sync = None, None
+    if startup["status"] == "ready":
+        # Imported by the warm-up
+        import policy_data
+
+        policy_path = policy_data.df_source[0] if policy_data.df_source else None
+        last_sync = policy_data.sheet_sync.stats()
+    return {
+        "startup": dict(startup),
+        "dataset": dataset_status(policy_path, last_sync),
+        "sqlite": probe(lambda: get_user("")),
+        "llm": llm_latency.stats(),
+        "outbound_queue": outbound_queue.value,
+    }
+
+
 @app.get("/health")
-def health_check():
-    # Add critical checks here (e.g., DB, Redis, etc.)
-    return Response(status_code=200)
+async def health_check():
+    """
+    200 if the instance can take traffic, 503 while starting or degraded
+    (the reasons are listed in the response). Slow LLM calls and an old
+    dataset are only listed as warnings: they affect every instance.
+    """
+    # The sync endpoints and the background tasks share this thread pool
+    threads = anyio.to_thread.current_default_thread_limiter()
+    busy, size = threads.borrowed_tokens, threads.total_tokens
+    report = await anyio.to_thread.run_sync(health_report, limiter=health_limiter)
+    report["worker_pool"] = {
+        "busy": busy,
+        "size": size,
+        "saturation": round(busy / size, 2),
+    }
+    report["degraded"] = degraded_reasons(report)
+    report["warnings"] = health_warnings(report)
+    status_code = 503 if report["degraded"] else 200
+    return JSONResponse(report, status_code=status_code)
 
 
 @app.get("/policy")
@@ -227,4 +370,63 @@ def get_policy(
         if not policy:
             message = f"Poliza {policy_number} inexistente en {company}"
             return {"message": message}
-        return {"policy": policy.to_dict()}
\ No newline at end of file
+        return {"policy": policy.to_dict()}
+
+
+class SheetOverrideItem(BaseModel):
+    kind: str
+    policy_number: str
+    company: str = ""
+    license_plate: str = ""
+    value: str = ""
+    obs: str = ""
+
+
+@app.get("/sheet-overrides")
+def sheet_overrides(credentials: HTTPBasicCredentials = Depends(security)):
+    if verify_admin(credentials):
+        return {"overrides": [o.to_dict() for o in get_sheet_overrides()]}
+
+
+@app.post("/sheet-override")
+def add_override(
+    item: SheetOverrideItem, credentials: HTTPBasicCredentials = Depends(security)
+):
+    if verify_admin(credentials):
+        if item.kind not in SHEET_OVERRIDE_KINDS:
+            return {"status": f"Error: kind debe ser uno de {', '.join(SHEET_OVERRIDE_KINDS)}"}
+        add_sheet_override(SheetOverride(**item.dict()))
+        return {"status": "OK. Se aplica en la próxima actualización de la planilla"}
+
+
+@app.post("/delete-sheet-override")
+def delete_override(
+    item: SheetOverrideItem, credentials: HTTPBasicCredentials = Depends(security)
+):
+    if verify_admin(credentials):
+        if delete_sheet_override(
+            item.kind, item.company, item.policy_number, item.license_plate
+        ):
+            return {"status": "OK"}
+        return {"status": "Error: No existe esa regla"}
+
+
+@app.get("/intent-router")
+def intent_router_stats(credentials: HTTPBasicCredentials = Depends(security)):
+    if verify_admin(credentials):
+        from intent_router import intent_router
+
+        return {"intent_router": intent_router.stats()}
+
+
+@app.get("/sheet-sync")
+def sheet_sync_stats(credentials: HTTPBasicCredentials = Depends(security)):
+    if verify_admin(credentials):
+        from gsheets import sheet_client
+        from policy_data import sheet_sync
+
+        last_fetch = sheet_client.last_timings
+        return {
+            "last_sync": sheet_sync.stats(),
+            "last_fetch": asdict(last_fetch) if last_fetch else None,
+        }
@@ -1,7 +1,11 @@
+import json
 import logging
-from policy_data import load_csv_data, apply_filter
+from policy_data import load_policy_data, apply_filter
 from ai_agents import generate_query, generate_response, get_file_list, get_parsed_list
 from filter_utils import remove_spanish_accents
+from download_plan import build_download_plan
+from intent_router import intent_router
+from chat_history_db import save_query
 
 logger = logging.getLogger(__name__)
 
@@ -50,8 +54,15 @@ def get_response_to_message(incoming_message: str, to_number: str):
     if len(incoming_message) < 3:
         return "Disculpa! No entendí. ¿En qué puedo ayudarte?", None
 
-    load_csv_data()
-    filter = generate_query(incoming_message, to_number)
+    load_policy_data()
+    # Plate and policy lookups don't need the LLM to build the filter
+    filter = intent_router.route(incoming_message)
+    if filter is not None:
+        logger.info(f"Routed locally:\n{filter['qs']}")
+        save_query(to_number, "user", incoming_message)
+        save_query(to_number, "assistant", json.dumps(filter, ensure_ascii=False))
+    else:
+        filter = generate_query(incoming_message, to_number)
     return process_incoming_message(filter, incoming_message, to_number)
 
 
@@ -71,7 +82,12 @@ def process_incoming_message(filter, incoming_message, to_number):
     if response != negative_response:
         file_list = None
         if filter.get("soa", False) or filter.get("mer", False):
-            parsed_list = get_parsed_list(response)
+            parsed_list = build_download_plan(
+                filtered_data, response, filter.get("soa", False), filter.get("mer", False)
+            )
+            if parsed_list is None:
+                logger.info("Download plan not found in the filtered rows, parsing the response")
+                parsed_list = get_parsed_list(response)
             file_list, tot_count, ok_count, error_count, error_msg = get_file_list(parsed_list)
             logger.info(f"FileList: {file_list}")
             if error_count > 0:
@@ -0,0 +1,449 @@
+"""
+Local mock of the SURA, BSE and SANCOR portals for offline runs of the downloaders.
+
+Serves the pages in MOCK_PORTAL_PAGES (login, search grid, endorsement tabs,
+vehicle detail) with the element ids and flows the downloaders rely on, plus
+the certificate PDFs, for a synthetic set of policies. Every response is
+delayed by a configurable latency so runs are reproducible. The pages are
+templates: saved portal pages can replace them as long as they keep the ids
+and the $-placeholders.
+
+Usage:
+    python mock_portal.py [--port 8765] [--policies 10] [--latency-ms 150]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+MOCK_PORTAL_PAGES = os.getenv(
+    "MOCK_PORTAL_PAGES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_portal_pages"),
+)
+MOCK_USER = "mock"
+MOCK_PASSWORD = "mock"
+COMPANIES = ("SURA", "BSE", "SANCOR")
+FIRST_POLICY_NUMBER = {"SURA": 3000000, "BSE": 9000000, "SANCOR": 5000000}
+BRANDS = [("FIAT", "CRONOS"), ("VOLKSWAGEN", "GOL"), ("TOYOTA", "HILUX"), ("RENAULT", "KWID")]
+
+
+@dataclass
+class MockVehicle:
+    plate: str
+    brand: str
+    model: str
+    year: int
+    state: str = "Incluido"
+
+
+@dataclass
+class MockPolicy:
+    company: str
+    number: str
+    expiration: date
+    vehicles: List[MockVehicle]
+    endorsements: int = 1
+    soa_only: bool = False
+    status: str = "VIGENTE"
+    cod_ramo: str = "11"
+
+    def endorsement_id(self, index: int) -> int:
+        return int(self.number) * 10 + index
+
+    def endorsement_vehicles(self, index: int) -> List[MockVehicle]:
+        """Older endorsements only list the first vehicle; the last one has the whole fleet."""
+        if index < self.endorsements - 1:
+            return self.vehicles[:1]
+        return self.vehicles
+
+    def certificates(self) -> List[str]:
+        return ["soa"] if self.soa_only else ["mercosur", "soa"]
+
+
+def build_fixtures(policies=10, vehicles=3, endorsements=1, seed=0) -> Dict[str, Dict[str, MockPolicy]]:
+    """
+    Synthetic policies per company. BSE and SANCOR policies have one vehicle,
+    as their downloaders expect.
+    """
+    rng = random.Random(seed)
+    fixtures = {}
+    for company in COMPANIES:
+        fixtures[company] = {}
+        for i in range(policies):
+            number = str(FIRST_POLICY_NUMBER[company] + i)
+            fleet_size = vehicles if company == "SURA" else 1
+            fleet = []
+            for v in range(fleet_size):
+                brand, model = rng.choice(BRANDS)
+                fleet.append(
+                    MockVehicle(
+                        plate=f"{company[0]}{chr(65 + i % 26)}{chr(65 + v % 26)}{rng.randint(1000, 9999)}",
+                        brand=brand,
+                        model=model,
+                        year=rng.randint(2012, 2024),
+                    )
+                )
+            fixtures[company][number] = MockPolicy(
+                company=company,
+                number=number,
+                expiration=date.today() + timedelta(days=rng.randint(30, 330)),
+                vehicles=fleet,
+                endorsements=endorsements if company == "SURA" else 1,
+                soa_only=company == "BSE" and i % 4 == 3,
+            )
+    return fixtures
+
+
+def downloader_policies(fixtures, company) -> List[Dict]:
+    """The fixtures of a company in the format of policy_data.get_grouped_policy_data."""
+    policies = []
+    for policy in fixtures[company].values():
+        policies.append(
+            {
+                "number": policy.number,
+                "year": str(policy.expiration.year),
+                "expiration_date": policy.expiration.strftime("%d/%m/%Y"),
+                "contains_cars": True,
+                "vehicles": [
+                    {
+                        "license_plate": v.plate,
+                        "brand": v.brand,
+                        "model": v.model,
+                        "year": v.year,
+                    }
+                    for v in policy.vehicles
+                ],
+                "soa_only": policy.soa_only,
+                "obs": "",
+                "coverage": "SOA" if policy.soa_only else "",
+                "cancelled": False,
+            }
+        )
+    return policies
+
+
+def certificate_pdf(title: str) -> bytes:
+    """A small one-page PDF that passes pdf_utils.is_valid_pdf in both modes."""
+    stream = f"BT /F1 18 Tf 72 720 Td ({title}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref_offset = len(body)
+    xref = b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        xref += b"%010d 00000 n \n" % offset
+    trailer = b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return body + xref + trailer
+
+
+class MockPortal:
+    """
+    HTTP server for the mock portals, run in a background thread.
+
+    latency_ms delays every page, ajax_latency_ms the AJAX/JSF partial
+    updates and pdf_latency_ms the certificate downloads.
+    """
+
+    def __init__(
+        self,
+        fixtures,
+        host="127.0.0.1",
+        port=0,
+        latency_ms=150,
+        ajax_latency_ms=80,
+        pdf_latency_ms=300,
+        pages_folder=MOCK_PORTAL_PAGES,
+    ):
+        self.fixtures = fixtures
+        self.latency_ms = latency_ms
+        self.ajax_latency_ms = ajax_latency_ms
+        self.pdf_latency_ms = pdf_latency_ms
+        self.pages_folder = pages_folder
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._sura_endorsements = {
+            policy.endorsement_id(i): (policy, i)
+            for policy in fixtures.get("SURA", {}).values()
+            for i in range(policy.endorsements)
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point the downloaders to this server."""
+        variables = {}
+        for company in COMPANIES:
+            prefix = f"{self.base_url}/{company.lower()}"
+            variables.update(
+                {
+                    f"{company}_LOGIN_URL": f"{prefix}/login",
+                    f"{company}_LOGOUT_URL": f"{prefix}/logout",
+                    f"{company}_SEARCH_URL": f"{prefix}/search",
+                    f"{company}_USER": MOCK_USER,
+                    f"{company}_PASSWORD": MOCK_PASSWORD,
+                    f"{company}_LOGIN_TIMEOUT": "60",
+                }
+            )
+        return variables
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock portal listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def summary(self) -> str:
+        return (
+            f"{sum(self.requests.values())} requests, "
+            f"{self.bytes_sent / 1024:.0f} KB served: {dict(self.requests)}"
+        )
+
+    def page(self, name: str, **values) -> bytes:
+        with open(os.path.join(self.pages_folder, name), "r", encoding="utf-8") as f:
+            template = Template(f.read())
+        values.setdefault("user", MOCK_USER)
+        values.setdefault("ajax_latency_ms", self.ajax_latency_ms)
+        return template.safe_substitute(values).encode("utf-8")
+
+    def route(self, method: str, path: str, query: Dict[str, str]):
+        """Return (latency_ms, status, content type, body, extra headers) for a request."""
+        if path == "/static/portal.js":
+            return 0, 200, "application/javascript", self.page("portal.js"), {}
+
+        parts = path.strip("/").split("/", 1)
+        company = parts[0].upper()
+        action = parts[1] if len(parts) > 1 else ""
+        folder = company.lower()
+        policies = self.fixtures.get(company, {})
+        if company not in COMPANIES:
+            return 0, 404, "text/plain", b"Not found", {}
+
+        if action == "login" and method == "POST":
+            return self.latency_ms, 302, "text/plain", b"", {"Location": f"/{folder}/home"}
+        if action == "logout":
+            return self.latency_ms, 302, "text/plain", b"", {"Location": f"/{folder}/login"}
+        if action in ("login", "home", "search"):
+            return self.latency_ms, 200, "text/html", self.page(f"{folder}/{action}.html"), {}
+        if action == "cert":
+            return self._certificate(company, policies, query)
+        if company == "SURA":
+            return self._sura(action, query)
+        if company == "BSE" and action == "api/policy":
+            policy = policies.get(query.get("policy", ""))
+            return self._json(self._bse_policy(policy) if policy else None)
+        if company == "SANCOR":
+            return self._sancor(action, policies.get(query.get("policy", "")))
+        return 0, 404, "text/plain", b"Not found", {}
+
+    def _json(self, data):
+        return self.ajax_latency_ms, 200, "application/json", json.dumps(data).encode("utf-8"), {}
+
+    def _sura(self, action, query):
+        if action == "api/endorsements":
+            policy = self.fixtures["SURA"].get(query.get("policy", ""))
+            rows = []
+            if policy:
+                rows = [
+                    {
+                        "id_pv": policy.endorsement_id(i),
+                        "cod_ramo": policy.cod_ramo,
+                        "vigencia": policy.expiration.strftime("%d/%m/%Y"),
+                    }
+                    for i in range(policy.endorsements)
+                ]
+            return self._json(rows)
+        if action == "api/items":
+            policy, index = self._sura_endorsements.get(int(query.get("id_pv", 0)), (None, 0))
+            vehicles = policy.endorsement_vehicles(index) if policy else []
+            return self._json(
+                [
+                    {"nro": nro, "plate": v.plate, "brand": v.brand, "model": v.model, "state": v.state}
+                    for nro, v in enumerate(vehicles, start=1)
+                ]
+            )
+        if action == "DetalleVehiculo.aspx":
+            policy, index = self._sura_endorsements.get(int(query.get("id_pv", 0)), (None, 0))
+            nro = int(query.get("nro", 0))
+            vehicles = policy.endorsement_vehicles(index) if policy else []
+            if not 0 < nro <= len(vehicles):
+                return self.latency_ms, 200, "text/html", self.page("error.html", message="Vehículo inexistente"), {}
+            body = self.page(
+                "sura/vehicle.html", plate=vehicles[nro - 1].plate, id_pv=query["id_pv"], nro=nro
+            )
+            return self.latency_ms, 200, "text/html", body, {}
+        return 0, 404, "text/plain", b"Not found", {}
+
+    def _bse_policy(self, policy):
+        vehicle = policy.vehicles[0]
+        return {
+            "number": policy.number,
+            "status": policy.status,
+            "certs": policy.certificates(),
+            "vehicle": {"plate": vehicle.plate, "brand": vehicle.brand, "model": vehicle.model},
+        }
+
+    def _sancor(self, action, policy):
+        if action == "api/policy":
+            if not policy:
+                return self._json(None)
+            return self._json(
+                {"number": policy.number, "movement_date": date.today().strftime("%d/%m/%Y")}
+            )
+        if action == "api/history" and policy:
+            start = policy.expiration - timedelta(days=365)
+            return self._json(
+                [
+                    ["1", "0", start.strftime("%d/%m/%Y"), "Emisión de póliza", "AUTOS", "UYU",
+                     "15000", start.strftime("%d/%m/%Y"), policy.expiration.strftime("%d/%m/%Y")],
+                    ["2", "1", start.strftime("%d/%m/%Y"), "Endoso de modificación", "AUTOS", "UYU",
+                     "0", start.strftime("%d/%m/%Y"), policy.expiration.strftime("%d/%m/%Y")],
+                ]
+            )
+        if action == "api/documents" and policy:
+            return self._json(
+                [
+                    {"id": "132Certificado de Cobertura SOA", "kind": "soa", "title": "Certificado de Cobertura SOA"},
+                    {"id": "88Mercosur", "kind": "mercosur", "title": "Mercosur"},
+                ]
+            )
+        return 0, 404, "text/plain", b"Not found", {}
+
+    def _certificate(self, company, policies, query):
+        kind = query.get("kind", "")
+        if company == "SURA":
+            policy, _ = self._sura_endorsements.get(int(query.get("id_pv", 0)), (None, 0))
+        else:
+            policy = policies.get(query.get("policy", ""))
+        if not policy or kind not in policy.certificates():
+            body = self.page("error.html", message="Certificado no disponible")
+            return self.pdf_latency_ms, 200, "text/html", body, {}
+        filename = f"{kind}_{policy.number}_{query.get('nro', '1')}.pdf"
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+        body = certificate_pdf(f"{company} {policy.number} {kind}")
+        return self.pdf_latency_ms, 200, "application/pdf", body, headers
+
+    def _handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self, method):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    self.rfile.read(length)
+                try:
+                    latency_ms, status, content_type, body, headers = portal.route(
+                        method, url.path, query
+                    )
+                except Exception as e:
+                    logger.exception(f"Mock portal error on {self.path}")
+                    latency_ms, status, content_type, body, headers = (
+                        0, 500, "text/plain", str(e).encode("utf-8"), {}
+                    )
+                time.sleep(latency_ms / 1000)
+                self.send_response(status)
+                if content_type.startswith("text/") or content_type.endswith(("json", "javascript")):
+                    content_type = f"{content_type}; charset=utf-8"
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with portal._lock:
+                    portal.requests[url.path.rsplit("/", 1)[-1] or "/"] += 1
+                    portal.bytes_sent += len(body)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+    parser = argparse.ArgumentParser(description="Serve the mock insurer portals")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--policies", type=int, default=10)
+    parser.add_argument("--vehicles", type=int, default=3)
+    parser.add_argument("--endorsements", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--ajax-latency-ms", type=float, default=80)
+    parser.add_argument("--pdf-latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    fixtures = build_fixtures(args.policies, args.vehicles, args.endorsements)
+    portal = MockPortal(
+        fixtures,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        ajax_latency_ms=args.ajax_latency_ms,
+        pdf_latency_ms=args.pdf_latency_ms,
+    )
+    portal.start()
+    for name, value in portal.env().items():
+        print(f"{name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+// Helpers shared by the mock portal pages. No framework: the pages only need
+// to reproduce the DOM and timing the downloaders rely on.
+
+function getJSON(url, callback) {
+    fetch(url, {credentials: "same-origin"})
+        .then(function (response) { return response.json(); })
+        .then(callback);
+}
+
+function el(tag, attrs, children) {
+    var node = document.createElement(tag);
+    Object.keys(attrs || {}).forEach(function (name) {
+        if (name === "text") {
+            node.textContent = attrs[name];
+        } else {
+            node.setAttribute(name, attrs[name]);
+        }
+    });
+    (children || []).forEach(function (child) { node.appendChild(child); });
+    return node;
+}
+
+// blockUI-style overlay shown while an AJAX request is in flight
+function showOverlay() {
+    if (!document.querySelector("div.blockUI.blockOverlay")) {
+        document.body.appendChild(el("div", {"class": "blockUI blockOverlay"}));
+    }
+}
+
+function hideOverlay() {
+    var overlay = document.querySelector("div.blockUI.blockOverlay");
+    if (overlay) {
+        overlay.remove();
+    }
+}
+
+function download(url) {
+    window.location.href = url;
+}
@@ -71,4 +71,37 @@ class Car:
                 result[field_name] = field_value.isoformat()
             else:
                 result[field_name] = field_value
-        return result
\ No newline at end of file
+        return result
+
+# Kinds of sheet overrides
+SET_LICENSE_PLATE = "license_plate"  # Plate of a vehicle missing in the sheet and the db
+SET_EXPIRATION = "expiration"  # Expiration date of a renewed policy
+REMOVE_VEHICLE = "remove"  # Row left out of the CSV
+CANCELLED_POLICY = "cancelled"  # Policy not downloaded anymore
+SHEET_OVERRIDE_KINDS = (SET_LICENSE_PLATE, SET_EXPIRATION, REMOVE_VEHICLE, CANCELLED_POLICY)
+
+
+@dataclass
+class SheetOverride:
+    """
+    Fix applied to the policy sheet rows. An empty company or license_plate
+    matches any.
+    """
+
+    kind: str
+    policy_number: str
+    company: str = ""
+    license_plate: str = ""
+    value: str = ""
+    obs: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        """Convert instance to dictionary with proper serialization."""
+        result = {}
+        for field_name, field_value in self.__dict__.items():
+            if isinstance(field_value, (datetime, date)):
+                result[field_name] = field_value.isoformat()
+            else:
+                result[field_name] = field_value
+        return result
@@ -0,0 +1,123 @@
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+from pdf_utils import FULL, is_valid_pdf
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_FILE = os.getenv("PDF_CACHE_FILE") or os.getenv("DATABASE_FILE")
+
+
+@dataclass
+class PdfCacheStats:
+    hits: int = 0
+    misses: int = 0
+    seconds_saved: float = 0.0
+    seconds_parsing: float = 0.0
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        ratio = self.hits / total if total else 0.0
+        return (
+            f"{self.hits}/{total} PDF validations served from cache ({ratio:.0%}), "
+            f"{self.seconds_saved:.1f}s of parsing skipped, "
+            f"{self.seconds_parsing:.1f}s spent parsing"
+        )
+
+
+class PdfValidationCache:
+    """
+    Persistent cache of is_valid_pdf results keyed by (path, size, mtime)
+    and validation mode.
+
+    A file is parsed again only when it is new or its size or modification
+    time changed since the cached validation.
+    """
+
+    def __init__(self, db_path: str = PDF_CACHE_FILE):
+        self.db_path = db_path or ":memory:"
+        self.stats = PdfCacheStats()
+        self.conn = sqlite3.connect(self.db_path)
+        columns = [
+            row[1] for row in self.conn.execute("PRAGMA table_info(pdf_validation)")
+        ]
+        if columns and "mode" not in columns:
+            # Created before validation modes existed, it is only a cache
+            self.conn.execute("DROP TABLE pdf_validation")
+        self.conn.execute(
+            """
+        CREATE TABLE IF NOT EXISTS pdf_validation (
+            path TEXT,
+            mode TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            valid BOOLEAN,
+            message TEXT,
+            seconds REAL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (path, mode)
+        )
+        """
+        )
+        self.conn.commit()
+
+    def lookup(self, file_path: str, stat: os.stat_result, mode: str = FULL) -> Optional[Tuple[bool, str]]:
+        """Return the cached (valid, message) if the file is unchanged, else None."""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, valid, message, seconds FROM pdf_validation WHERE path = ? AND mode = ?",
+            (file_path, mode),
+        ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            self.stats.hits += 1
+            self.stats.seconds_saved += row[4] or 0.0
+            return bool(row[2]), row[3]
+        return None
+
+    def store(
+        self,
+        file_path: str,
+        stat: os.stat_result,
+        mode: str,
+        valid: bool,
+        message: str,
+        seconds: float,
+        commit: bool = True,
+    ):
+        self.stats.misses += 1
+        self.stats.seconds_parsing += seconds
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO pdf_validation (path, mode, size, mtime_ns, valid, message, seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (file_path, mode, stat.st_size, stat.st_mtime_ns, valid, message, seconds),
+        )
+        if commit:
+            self.conn.commit()
+
+    def is_valid_pdf(self, folder: str, filename: str, mode: str = FULL) -> Tuple[bool, str]:
+        """Same contract as pdf_utils.is_valid_pdf, answered from cache when possible."""
+        file_path = os.path.join(folder, filename)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Missing files are cheap to detect, nothing worth caching
+            return is_valid_pdf(folder, filename, mode)
+
+        cached = self.lookup(file_path, stat, mode)
+        if cached is not None:
+            return cached
+
+        start = time.monotonic()
+        valid, message = is_valid_pdf(folder, filename, mode)
+        self.store(file_path, stat, mode, valid, message, time.monotonic() - start)
+        return valid, message
+
+    def close(self):
+        self.conn.close()
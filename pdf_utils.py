@@ -1,15 +1,74 @@
+import mmap
 import os
+import re
 import magic  # python-magic library
 from PyPDF2 import PdfReader
 from PyPDF2.errors import PdfReadError
 
+# Validation modes accepted by is_valid_pdf
+FULL = "full"
+FAST = "fast"
 
-def is_valid_pdf(file_path, filename):
+HEADER_SCAN_BYTES = 1024
+TAIL_SCAN_BYTES = 2048
+
+_startxref_re = re.compile(rb"startxref\s+(\d+)")
+_xref_stream_re = re.compile(rb"\s*\d+\s+\d+\s+obj")
+
+
+def quick_check_pdf(file_path):
+    """
+    Cheap structural check that only reads the header and the tail of the file.
+
+    Looks for the %PDF- header, the final %%EOF marker and a startxref offset
+    that points to an xref table or xref stream.
+
+    Returns:
+        tuple: (True, msg) if the structure looks valid, (False, msg) if the file
+        is empty or not a PDF, (None, msg) if the check is inconclusive. Trailing
+        bytes or a wrong offset don't make a PDF unreadable, so a missing
+        marker or a bad offset is left to the full parse.
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return False, "File is empty"
+
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf.find(b"%PDF-", 0, HEADER_SCAN_BYTES) == -1:
+                return False, "File does not start with a PDF header"
+
+            tail_start = max(0, size - TAIL_SCAN_BYTES)
+            eof = buf.rfind(b"%%EOF", tail_start)
+            if eof == -1:
+                return None, "%%EOF marker not found near the end of the file"
+
+            startxref = buf.rfind(b"startxref", tail_start, eof)
+            if startxref == -1:
+                return None, "startxref not found near the end of the file"
+            match = _startxref_re.match(buf[startxref:eof])
+            if not match:
+                return None, "startxref offset is not readable"
+
+            offset = int(match.group(1))
+            if offset >= size:
+                return None, "startxref offset beyond end of file"
+            chunk = buf[offset : offset + 64]
+            if chunk.lstrip().startswith(b"xref") or _xref_stream_re.match(chunk):
+                return True, "PDF is valid"
+
+    return None, "startxref does not point to a cross-reference section"
+
+
+def is_valid_pdf(file_path, filename, mode=FULL):
     """
     Check if a file is a valid PDF by:
     1. Verifying the extension is .pdf
     2. Checking the file header/magic number
     3. Attempting to parse the PDF content
+
+    With mode=FAST steps 2 and 3 are replaced by quick_check_pdf, and the full
+    parse only runs when the quick check is inconclusive.
     """
     if not os.path.exists(file_path):
         return False, "Folder does not exist"
@@ -23,6 +82,14 @@ def is_valid_pdf(file_path, filename):
     if not os.path.exists(file_path):
         return False, "File does not exist"
 
+    if mode == FAST:
+        try:
+            is_valid, message = quick_check_pdf(file_path)
+        except (OSError, ValueError) as e:
+            return False, f"Error validating PDF: {str(e)}"
+        if is_valid is not None:
+            return is_valid, message
+
     try:
         # Check 2: Verify file is actually a PDF by magic number
         file_type = magic.from_file(file_path, mime=True)
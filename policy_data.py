@@ -1,10 +1,17 @@
+import fcntl
 import logging
-import csv, os
+import os
 import re
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from chat_history_db import get_policy_with_cars
+from chat_history_db import get_policies_with_cars
 from gsheets import get_sheet_data
+from models import CANCELLED_POLICY, REMOVE_VEHICLE, SET_EXPIRATION, SET_LICENSE_PLATE
+from sheet_overrides import load_sheet_overrides
+from sheet_sync import SheetSync
+from policy_snapshot import read_snapshot, snapshot_version, write_snapshot
 from filter_utils import (
     relax_cliente_filter_level1,
     relax_cliente_filter_level2,
@@ -20,9 +27,32 @@ UPDATE_INTERVAL = int(os.getenv("UPDATE_INTERVAL"))
 GOOGLE_SHEET_URL = os.getenv("GOOGLE_SHEET_URL")
 GOOGLE_SHEET_NAME = os.getenv("GOOGLE_SHEET_NAME")
 CSV_FILE_PATH = os.getenv("CSV_FILE_PATH")
+# Sheet columns used by the filters, the prompts and the downloads
+SHEET_COLUMNS = os.getenv(
+    "SHEET_COLUMNS",
+    "Matricula,Poliza,Compañia,Cobertura,Deducible,Vencimiento,Cliente,Marca,"
+    "Modelo,Combustible,Año,Asignado,Tel1,Mail",
+).split(",")
+# Typed snapshot published by the sheet sync, a symlink to the current
+# version. The CSV is only read if there is no snapshot yet
+POLICY_SNAPSHOT_FILE = os.getenv(
+    "POLICY_SNAPSHOT_FILE",
+    f"{os.path.splitext(CSV_FILE_PATH)[0]}.arrow" if CSV_FILE_PATH else None,
+)
+SHEET_SYNC_STATE_FILE = os.getenv(
+    "SHEET_SYNC_STATE_FILE", f"{CSV_FILE_PATH}.sync.json" if CSV_FILE_PATH else None
+)
+
+# Held by the process that syncs the sheet, the other workers skip the sync
+SHEET_SYNC_LOCK_FILE = f"{POLICY_SNAPSHOT_FILE}.lock" if POLICY_SNAPSHOT_FILE else None
 
 df = None
+# (file, modification time, parsed dates) of the data loaded in df
+df_source = None
 last_update = None
+# Modification time of UPDATE_INTERVAL_FILE when last_update was read
+last_update_mtime = None
+sheet_sync = SheetSync(SHEET_SYNC_STATE_FILE)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -32,31 +62,65 @@ logging.basicConfig(
 )
 
 
-def sheet_data_to_csv(spreadsheet_url, sheet_name, csv_file_path):
+def sheet_data_to_snapshot(spreadsheet_url, sheet_name, snapshot_path):
+    """
+    Sync the sheet to the policy snapshot, patching only the rows that
+    changed since the previous sync. Returns True if the snapshot was written.
+
+    Only the patch stage is incremental: when any row changed the whole
+    snapshot is written again as a new version, and every process loads it
+    entirely on its next load_policy_data.
+    """
+
+    logger.info(f"Inicia sheet_data_to_snapshot. Sheet: {sheet_name}")
+    timings = {}
+    stage_start = time.perf_counter()
+
+    def end_stage(name):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[name] = now - stage_start
+        stage_start = now
 
-    logger.info(f"Inicia sheet_data_to_csv. Sheet: {sheet_name}")
     try:
-        data = get_sheet_data(spreadsheet_url, sheet_name)
+        data = get_sheet_data(spreadsheet_url, sheet_name, SHEET_COLUMNS)
         if data is None:
             logger.info("Failed to obtain the data from sheet")
-            return
-
-        policy_index = data[0].index("Poliza")
-        lic_plate_index = data[0].index("Matricula")
-        company_index = data[0].index("Compañia")
-        brand_index = data[0].index("Marca")
-        expiration_index = data[0].index("Vencimiento")
-        for row in data[1:]:
-
+            return False
+        end_stage("fetch")
+
+        header, rows = data[0], data[1:]
+        policy_index = header.index("Poliza")
+        lic_plate_index = header.index("Matricula")
+        company_index = header.index("Compañia")
+        brand_index = header.index("Marca")
+        expiration_index = header.index("Vencimiento")
+
+        overrides = load_sheet_overrides()
+        # Rows still without plate are patched again: the db may know the car now
+        diff = sheet_sync.diff(
+            header, rows, overrides.version, repatch=lambda row: not row[lic_plate_index]
+        )
+        pending_rows = [row for _, row in diff.pending]
+        end_stage("diff")
+
+        # Policies of the rows without license plate, in one database round
+        missing_plate_keys = {
+            (row[company_index], row[policy_index])
+            for row in pending_rows
+            if not row[lic_plate_index] and row[policy_index] != "pend"
+        }
+        policies_db = get_policies_with_cars(missing_plate_keys)
+        end_stage("load")
+
+        for row in pending_rows:
             policy_value = row[policy_index]
             if policy_value and policy_value == "pend":
                 row[policy_index] = "Pendiente"
                 continue
-            lic_plate_value = row[lic_plate_index]
-            if not lic_plate_value:
-                company_value = row[company_index]
-
-                policy_db = get_policy_with_cars(company_value, policy_value)
+            company_value = row[company_index]
+            if not row[lic_plate_index]:
+                policy_db = policies_db.get((company_value, policy_value))
                 if policy_db:
                     if policy_db.contains_cars and len(policy_db.cars) == 1:
                         brand_value = row[brand_index]
@@ -73,54 +137,47 @@ def sheet_data_to_csv(spreadsheet_url, sheet_name, csv_file_path):
                             )
                             row[lic_plate_index] = car.license_plate
                 else:
-                    if policy_value == "1968422":
-                        row[lic_plate_index] = "SDG1586"
-                    elif policy_value == "2107841":
-                        row[lic_plate_index] = "SDH5834"
-                    elif policy_value == "1957105":
-                        row[lic_plate_index] = "SDF6464"
-                    elif policy_value == "1968824":
-                        row[lic_plate_index] = "SDH3532"
-                    elif policy_value == "1972525":
-                        row[lic_plate_index] = "BED4626"
+                    override = overrides.match(SET_LICENSE_PLATE, company_value, policy_value)
+                    if override:
+                        row[lic_plate_index] = override.value
             # Fix renewed policies
-            if policy_value == "6498386":
-                row[expiration_index] = "05/09/2026"
-
-        to_remove = [
-            {"policy": "8170039", "license_plate": "SCJ3994"},
-            {"policy": "8466824", "license_plate": "SDE5032"},
-            {"policy": "9235631", "license_plate": "AAY1121"},
-            {"policy": "9250984", "license_plate": "SCV6690"}, 
-            {"policy": "9250985", "license_plate": "SBL1616"}, 
-            {"policy": "9586003", "license_plate": "B580319"}, 
-            {"policy": "9220158", "license_plate": "SAC9491"}
+            override = overrides.match(
+                SET_EXPIRATION, company_value, policy_value, row[lic_plate_index]
+            )
+            if override:
+                row[expiration_index] = override.value
+        patched_rows = sheet_sync.apply(diff, pending_rows)
+        end_stage("patch")
+
+        kept_rows = [
+            row
+            for row in patched_rows
+            if not overrides.match(
+                REMOVE_VEHICLE, row[company_index], row[policy_index], row[lic_plate_index]
+            )
         ]
-        
-        # Create a list to store indices of rows to remove
-        rows_to_remove = []
-        
-        for i, row in enumerate(data[1:], start=1):  # start=1 to skip header
-            policy_value = row[policy_index]
-            lic_plate_value = row[lic_plate_index]
-            
-            for removal in to_remove:
-                if (policy_value == removal["policy"] and 
-                    lic_plate_value == removal["license_plate"]):
-                    rows_to_remove.append(i)
-                    break
-        
-        # Remove rows in reverse order to avoid index issues
-        for index in sorted(rows_to_remove, reverse=True):
-            data.pop(index)
-
-        with open(csv_file_path, mode="w", newline="", encoding="utf-8") as csv_file:
-            writer = csv.writer(csv_file)
-            writer.writerows(data)
-
-        logger.info(f"OK. CSV saved: {csv_file_path}")
+        end_stage("remove")
+
+        written = sheet_sync.commit(
+            kept_rows, snapshot_path, lambda: write_snapshot(header, kept_rows, snapshot_path)
+        )
+        if written:
+            logger.info(f"OK. Snapshot saved: {snapshot_path}")
+        else:
+            logger.info(f"OK. Snapshot unchanged: {snapshot_path}")
+        end_stage("write")
+
+        stats = sheet_sync.record(diff, written, sum(timings.values()))
+        logger.info(
+            f"sheet_data_to_snapshot: {stats.summary()}, {len(rows) - len(kept_rows)} removed, "
+            f"{len(policies_db)}/{len(missing_plate_keys)} policies without plate in the db, "
+            f"{len(overrides)} overrides. "
+            + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
+        )
+        return written
     except Exception as e:
-        logger.info(f"Error saving data sheet to CSV: {str(e)}")
+        logger.info(f"Error saving data sheet to snapshot: {str(e)}")
+        return False
 
 
 def update_interval_has_passed():
@@ -129,12 +186,14 @@ def update_interval_has_passed():
         # Get current time rounded to minutes
         current_time = datetime.now().replace(second=0, microsecond=0)
 
-        # Read last update time from file
-        global last_update
-        if not last_update:
+        # Read last update time from file, again if another process updated it
+        global last_update, last_update_mtime
+        mtime = os.path.getmtime(UPDATE_INTERVAL_FILE)
+        if not last_update or mtime != last_update_mtime:
             with open(UPDATE_INTERVAL_FILE, "r") as f:
                 last_update_str = f.read().strip()
                 last_update = datetime.strptime(last_update_str, "%Y-%m-%d %H:%M:%S")
+            last_update_mtime = mtime
 
         # Calculate time difference
         time_diff = current_time - last_update
@@ -147,22 +206,65 @@ def update_interval_has_passed():
 
 def update_interval():
     """Update the timestamp file with current time (rounded to minutes)."""
-    global last_update
+    global last_update, last_update_mtime
     last_update = datetime.now().replace(second=0, microsecond=0)
     with open(UPDATE_INTERVAL_FILE, "w") as f:
         f.write(last_update.strftime("%Y-%m-%d %H:%M:%S"))
+    last_update_mtime = os.path.getmtime(UPDATE_INTERVAL_FILE)
 
 
-def load_csv_data():
-    global df
-    if update_interval_has_passed():
+def sync_if_due():
+    """
+    Sync the sheet if UPDATE_INTERVAL has passed. With several workers only
+    the one that gets the lock syncs; the others keep serving the published
+    version and load the new one once it's published.
+    """
+    if not update_interval_has_passed():
+        logger.debug("UPDATE_INTERVAL has not passed yet - skipping updates")
+        return
+    if not SHEET_SYNC_LOCK_FILE:
         logger.info("UPDATE_INTERVAL has passed - performing updates...")
-        sheet_data_to_csv(GOOGLE_SHEET_URL, GOOGLE_SHEET_NAME, CSV_FILE_PATH)
+        sheet_data_to_snapshot(GOOGLE_SHEET_URL, GOOGLE_SHEET_NAME, POLICY_SNAPSHOT_FILE)
         update_interval()
-    else:
-        logger.info("UPDATE_INTERVAL has not passed yet - skipping updates")
+        return
+    with open(SHEET_SYNC_LOCK_FILE, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info("UPDATE_INTERVAL has passed - another process is syncing")
+            return
+        try:
+            # The process that held the lock may have just synced
+            if update_interval_has_passed():
+                logger.info("UPDATE_INTERVAL has passed - performing updates...")
+                sheet_data_to_snapshot(GOOGLE_SHEET_URL, GOOGLE_SHEET_NAME, POLICY_SNAPSHOT_FILE)
+                update_interval()
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
 
-    df = pd.read_csv(CSV_FILE_PATH)
+
+def load_policy_data(parsed_dates=False):
+    """
+    Sync the sheet if UPDATE_INTERVAL has passed and load the policy data
+    in df. With parsed_dates Vencimiento holds dates instead of the text.
+    """
+    global df, df_source
+    sync_if_due()
+
+    # The published version: versions are never modified, so every process
+    # that loads it maps the same pages
+    path = snapshot_version(POLICY_SNAPSHOT_FILE) if POLICY_SNAPSHOT_FILE else None
+    if path is None:
+        path = CSV_FILE_PATH
+    # The data is read again only if the sync published a new version
+    source = (path, os.path.getmtime(path), parsed_dates)
+    if df is None or source != df_source:
+        if path == CSV_FILE_PATH:
+            df = pd.read_csv(path)
+        else:
+            df = read_snapshot(path, parsed_dates)
+            logger.info(f"Policy snapshot loaded: {os.path.basename(path)}")
+        df_source = source
 
 
 def remove_words(list, words):
@@ -326,7 +428,8 @@ def get_grouped_policy_data():
         if col not in df.columns:
             raise ValueError(f"Column '{col}' not found in DataFrame")
     string_columns = ["Matricula", "Marca", "Modelo"]
-    df[string_columns] = df[string_columns].fillna("")
+    # As object: "" is not one of the categories of the snapshot's Marca
+    df[string_columns] = df[string_columns].astype(object).fillna("")
     # Convert expiration date to datetime if it's not already
     if not pd.api.types.is_datetime64_any_dtype(df["Vencimiento"]):
         try:
@@ -345,34 +448,39 @@ def get_grouped_policy_data():
     # Group by company and policy
     result = {}
     bicycle_brands = ["OTRAS MARCAS", "RAVE", "GYROOR", "BIANCHI", "TREK"]
-    cancelled_policies = [
-        "1938091", # SURA
-        "1940520",
-        "1961256",
-        "2123126",
-        "2138316",
-        "2160105",
-        "2172904",
-        "9801834",
-        "9279761", # BSE
-        "9280934", # BSE
-    ]
-
-    # Iterate through each unique company
-    for company in df["Compañia"].unique():
-        company_df = df[df["Compañia"] == company]
-
-        # Group by policy within the company
+    overrides = load_sheet_overrides()
+
+    # Rows of each (company, policy) in order of first appearance: a stable
+    # sort of the group numbers, split where the number changes
+    group_codes = df.groupby(["Compañia", "Poliza"], sort=False).ngroup().to_numpy()
+    order = np.argsort(group_codes, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(group_codes[order])) + 1)
+
+    companies = df["Compañia"].to_numpy()
+    policy_nums = df["Poliza"].to_numpy()
+    expirations = df["Vencimiento"].tolist()
+    coverages = df["Cobertura"].tolist()
+    license_plates = df["Matricula"].tolist()
+    brands = df["Marca"].tolist()
+    models = df["Modelo"].tolist()
+    years = df["Año"].tolist()
+    fuels = df["Combustible"].tolist()
+
+    # Policies are built company by company, as a policy without expiration
+    # date takes the year of the previous policy
+    company_groups = {}
+    for positions in groups:
+        if len(positions):
+            company_groups.setdefault(companies[positions[0]], []).append(positions)
+
+    for company, policy_groups in company_groups.items():
         policies = []
-        for policy_num in company_df["Poliza"].unique():
-            cancelled = policy_num in cancelled_policies
-            policy_df = company_df[company_df["Poliza"] == policy_num]
+        for positions in policy_groups:
+            first = positions[0]
+            policy_num = policy_nums[first]
+            cancelled = bool(overrides.match(CANCELLED_POLICY, company, str(policy_num)))
 
-            # Skip if policy_df is empty (shouldn't happen after dropna)
-            if len(policy_df) == 0:
-                continue
-
-            policy_expiration = policy_df["Vencimiento"].iloc[0]
+            policy_expiration = expirations[first]
 
             expiration_str = None
             if not pd.isna(policy_expiration):
@@ -380,13 +488,11 @@ def get_grouped_policy_data():
                 expiration_str = policy_expiration.strftime("%d/%m/%Y")
                 policy_year = str(policy_expiration.year)
 
-            policy_coverage = policy_df["Cobertura"].iloc[0]
+            policy_coverage = coverages[first]
             soa_only = False
             if not pd.isna(policy_coverage):
                 policy_coverage = policy_coverage.strip()
-                soa_only = (
-                    policy_coverage in ["SOA", "RC BASICO", "BASICO"]
-                )
+                soa_only = policy_coverage in ["SOA", "RC BASICO", "BASICO"]
             else:
                 policy_coverage = ""
 
@@ -394,51 +500,43 @@ def get_grouped_policy_data():
             vehicles = []
             contains_cars = False
             empty_license_plate = 0
-            for _, row in policy_df.iterrows():
-                brand = row["Marca"]
-                license_plate = row["Matricula"]
+            for i in positions:
+                brand = brands[i]
+                license_plate = license_plates[i]
                 if pd.isna(license_plate):
                     license_plate = str(empty_license_plate)
                     empty_license_plate += 1
-                fuel = row["Combustible"]
+                fuel = fuels[i]
                 if pd.isna(fuel):
                     fuel = None
-                model = row["Modelo"]
+                model = models[i]
                 if pd.isna(model):
                     model = ""
 
-                is_car = not (
-                    "BIKE" in model or (fuel is None and brand in bicycle_brands)
-                )
+                is_car = not ("BIKE" in model or (fuel is None and brand in bicycle_brands))
                 contains_cars = contains_cars or is_car
-                vehicle = {
-                    "license_plate": license_plate,
-                    "brand": brand,
-                    "model": row["Modelo"],
-                    "year": row["Año"],
-                }
+                vehicles.append(
+                    {
+                        "license_plate": license_plate,
+                        "brand": brand,
+                        "model": models[i],
+                        "year": years[i],
+                    }
+                )
 
-                vehicles.append(vehicle)
-
-            # Create policy dictionary
-            policy = {
-                "number": policy_num,
-                "year": policy_year,
-                "expiration_date": expiration_str,
-                "contains_cars": contains_cars,
-                "vehicles": vehicles,
-                "soa_only": soa_only,
-                "obs": "",
-                "coverage": policy_coverage,
-                "cancelled": cancelled,
-            }
-            policies.append(policy)
-
-        # Add company to result only if it has policies
-        if policies:
-            result[company] = policies
+            policies.append(
+                {
+                    "number": policy_num,
+                    "year": policy_year,
+                    "expiration_date": expiration_str,
+                    "contains_cars": contains_cars,
+                    "vehicles": vehicles,
+                    "soa_only": soa_only,
+                    "obs": "",
+                    "coverage": policy_coverage,
+                    "cancelled": cancelled,
+                }
+            )
+        result[company] = policies
 
     return result
-
-
-load_csv_data()
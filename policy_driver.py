@@ -1,8 +1,12 @@
+import json
 import logging
 import os
 import time
 from enum import Enum, auto
 from dotenv import load_dotenv
+from blocking_profile import BLOCKING_MEASURE, PAGE_STATS_SCRIPT, PageStats, blocked_patterns
+from driver_metrics import DriverMetrics
+from wait_strategy import LEGACY_IMPLICIT_WAIT, WaitStrategy
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
@@ -21,6 +25,24 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Headed Chrome needs the compositor and a display; only useful when debugging
+HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
+
+# Starts a traversal to a session history entry; false if the entry no longer exists
+_TRAVERSE_SCRIPT = """
+const key = arguments[0];
+if (!window.navigation) { return false; }
+if (navigation.currentEntry.key === key) { return true; }
+if (!navigation.entries().some(e => e.key === key)) { return false; }
+navigation.traverseTo(key);
+return true;
+"""
+
+_HISTORY_ENTRY_LOADED_SCRIPT = """
+return window.navigation && navigation.currentEntry.key === arguments[0]
+    && document.readyState === 'complete';
+"""
+
 
 class DriverException(Exception):
     """Base exception for all driver-related errors."""
@@ -98,16 +120,20 @@ class PolicyDriver:
     Wrapper class for Selenium WebDriver that abstracts all Selenium-specific details.
     """
 
-    def __init__(self, driver_creator, headless=True):
+    def __init__(self, driver_creator, headless=HEADLESS):
         self.folder = os.getenv("TMP_DOWNLOAD_FOLDER")
         self.screenshot_folder = os.getenv("DEBUG_SCREENSHOT_FOLDER", self.folder)
         self.screenshot_counter = 0
         self.headless = headless
         self.driver_creator = driver_creator
+        self.driver = None
+        self.metrics = DriverMetrics()
+        self.waits = WaitStrategy()
+        self.page_stats = PageStats()
         if not os.path.exists(self.folder):
             os.makedirs(self.folder)
 
-    def init_driver(self):
+    def chrome_options(self):
         chrome_options = webdriver.ChromeOptions()
         if self.headless:
             chrome_options.add_argument("--headless=new")
@@ -132,9 +158,15 @@ class PolicyDriver:
             "profile.managed_default_content_settings.images": 2,
         }
         chrome_options.add_experimental_option("prefs", prefs)
+        return chrome_options
 
-        self.driver = self.driver_creator.create(chrome_options)
-        self.driver.implicitly_wait(10)
+    def init_driver(self):
+        self.driver = self.metrics.instrument(
+            self.driver_creator.create(self.chrome_options())
+        )
+        # Explicit waits only: an implicit wait makes every absence check and
+        # every WebDriverWait poll on a missing element block for its full value
+        self.driver.implicitly_wait(0)
         logger.info("WebDriver instance created")
 
     def navigate(self, url: str):
@@ -143,20 +175,79 @@ class PolicyDriver:
             self.driver.get(url)
         except WebDriverException as e:
             raise DriverException(f"Failed to navigate to {url}: {str(e)}")
+        if BLOCKING_MEASURE:
+            self.measure_page_load()
+
+    def execute_cdp(self, cmd: str, params: dict = None):
+        """Run a Chrome DevTools command, also through a remote Selenium grid."""
+        if hasattr(self.driver, "execute_cdp_cmd"):
+            return self.driver.execute_cdp_cmd(cmd, params or {})
+        # webdriver.Remote does not register the chromium CDP endpoint
+        self.driver.command_executor._commands["executeCdpCommand"] = (
+            "POST",
+            "/session/$sessionId/goog/cdp/execute",
+        )
+        response = self.driver.execute(
+            "executeCdpCommand", {"cmd": cmd, "params": params or {}}
+        )
+        return response["value"]
+
+    def apply_blocking_profile(self, company: str, profile: str = None):
+        """Block fonts, analytics and other resources the downloader does not need."""
+        patterns = blocked_patterns(company, profile)
+        if not patterns:
+            return
+        try:
+            self.execute_cdp("Network.enable")
+            self.execute_cdp("Network.setBlockedURLs", {"urls": patterns})
+            logger.info(f"Blocking {len(patterns)} URL patterns for {company}")
+        except WebDriverException as e:
+            # Loading everything is slower but still correct
+            logger.warning(f"Could not apply blocking profile for {company}: {str(e)}")
+
+    def measure_page_load(self):
+        """Record load time and bytes transferred of the current page."""
+        try:
+            stats = self.driver.execute_script(PAGE_STATS_SCRIPT)
+        except WebDriverException as e:
+            logger.debug(f"Could not read page stats: {str(e)}")
+            return None
+        if stats:
+            self.page_stats.add(stats)
+        return stats
+
+    def has_live_session(self) -> bool:
+        """Return True if the remote WebDriver session is still usable."""
+        if self.driver is None or self.driver.session_id is None:
+            return False
+        try:
+            _ = self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
 
     def close(self):
         """Close the browser and clean up resources."""
         if self.driver:
-            self.driver.close()
-            self.driver.quit()
+            try:
+                self.driver.close()
+            except WebDriverException:
+                pass
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                # A dead session: the grid frees it when it times out
+                logger.warning(f"Error quitting the WebDriver: {str(e)}")
+            self.driver = None
             logger.info("WebDriver instance closed completely")
 
-    def find_element(self, locator: Locator, context=None):
+    def find_element(self, locator: Locator, context=None, timeout=LEGACY_IMPLICIT_WAIT):
         """Find a single element, optionally within a context element.
 
         Args:
             locator: The locator for the element to find
             context: Optional parent WebElement to search within
+            timeout: Max seconds to wait for the element to appear (0 fails fast)
 
         Returns:
             WebElement: The found element
@@ -165,21 +256,36 @@ class PolicyDriver:
             ElementNotFoundException: If element not found
             ElementNotInteractableError: If element exists but can't be interacted with
         """
+        searcher = context or self.driver
+        start = time.monotonic()
         try:
-            if context:
-                return context.find_element(*locator.to_selenium())
-            return self.driver.find_element(*locator.to_selenium())
+            try:
+                element = searcher.find_element(*locator.to_selenium())
+            except NoSuchElementException:
+                if not timeout:
+                    raise
+                wait = WebDriverWait(searcher, self.waits.timeout_for(locator, timeout))
+                element = wait.until(lambda s: s.find_element(*locator.to_selenium()))
+                # Only waits are samples: immediate hits would pull the
+                # learned timeout towards zero
+                self.waits.observe(locator, time.monotonic() - start)
+            return element
         except NoSuchElementException:
+            self.waits.record_absent(time.monotonic() - start)
+            raise ElementNotFoundException(locator.value)
+        except TimeoutException:
+            self.waits.record_timeout(time.monotonic() - start, timeout, locator)
             raise ElementNotFoundException(locator.value)
         except ElementNotInteractableException:
             raise ElementNotInteractableError(locator.value)
 
-    def find_elements(self, locator: Locator, context=None):
+    def find_elements(self, locator: Locator, context=None, timeout=0):
         """Find multiple elements, optionally within a context element.
 
         Args:
             locator: The locator for the elements to find
             context: Optional parent WebElement to search within
+            timeout: Max seconds to wait for at least one element (0 fails fast)
 
         Returns:
             list[WebElement]: List of found elements (empty list if none found)
@@ -187,11 +293,20 @@ class PolicyDriver:
         Raises:
             DriverException: For WebDriver errors other than "not found"
         """
+        searcher = context or self.driver
+        start = time.monotonic()
         try:
-            if context:
-                return context.find_elements(*locator.to_selenium())
-            return self.driver.find_elements(*locator.to_selenium())
-        except NoSuchElementException:
+            elements = searcher.find_elements(*locator.to_selenium())
+            if elements or not timeout:
+                if not elements:
+                    self.waits.record_absent(time.monotonic() - start)
+                return elements
+            wait = WebDriverWait(searcher, self.waits.timeout_for(locator, timeout))
+            elements = wait.until(lambda s: s.find_elements(*locator.to_selenium()))
+            self.waits.observe(locator, time.monotonic() - start)
+            return elements
+        except (NoSuchElementException, TimeoutException):
+            self.waits.record_timeout(time.monotonic() - start, timeout, locator)
             return (
                 []
             )  # Differently from find_element, returns empty list rather than raise
@@ -202,15 +317,22 @@ class PolicyDriver:
         except Exception as e:
             raise DriverException(f"Error finding elements: {str(e)}")
 
+    def probe(self, locator: Locator, context=None) -> bool:
+        """Fast-fail presence check: a single lookup, no waiting."""
+        return bool(self.find_elements(locator, context=context))
+
     def wait_for_element(self, locator: Locator, timeout=20):
         """Wait for an element to be present and visible."""
+        start = time.monotonic()
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = WebDriverWait(self.driver, self.waits.timeout_for(locator, timeout))
             logger.debug(f"Waiting for element {locator}.")
             el = wait.until(EC.visibility_of_element_located(locator.to_selenium()))
+            self.waits.observe(locator, time.monotonic() - start)
             logger.debug(f"Element found {locator}.")
             return el
         except TimeoutException:
+            self.waits.record_timeout(time.monotonic() - start, timeout, locator)
             self._take_debug_screenshot(f"timeout_waiting_for_{locator.value}")
             raise TimeoutError(
                 f"Waiting for element {locator}. Screenshot saved."
@@ -237,6 +359,8 @@ class PolicyDriver:
             DriverException: For other WebDriver errors
         """
         try:
+            if not self.probe(locator):
+                return True
             wait = WebDriverWait(
                 self.driver, timeout=timeout, poll_frequency=poll_frequency
             )
@@ -250,10 +374,14 @@ class PolicyDriver:
 
     def wait_for_clickable(self, locator: Locator, timeout=20):
         """Wait for an element to be clickable."""
+        start = time.monotonic()
         try:
-            wait = WebDriverWait(self.driver, timeout)
-            return wait.until(EC.element_to_be_clickable(locator.to_selenium()))
+            wait = WebDriverWait(self.driver, self.waits.timeout_for(locator, timeout))
+            el = wait.until(EC.element_to_be_clickable(locator.to_selenium()))
+            self.waits.observe(locator, time.monotonic() - start)
+            return el
         except TimeoutException:
+            self.waits.record_timeout(time.monotonic() - start, timeout, locator)
             raise TimeoutError(f"Waiting for clickable element {str(locator)}")
         except NoSuchElementException:
             raise ElementNotFoundException(str(locator))
@@ -346,12 +474,9 @@ cert_value.select_by_value('1')
 
     def is_element_present(self, locator: Locator, timeout=5):
         """Check if an element is present without waiting the full timeout."""
-        try:
-            wait = WebDriverWait(self.driver, timeout)
-            wait.until(EC.presence_of_element_located(locator.to_selenium()))
-            return True
-        except (TimeoutException, NoSuchElementException):
-            return False
+        if not timeout:
+            return self.probe(locator)
+        return bool(self.find_elements(locator, timeout=timeout))
 
     def get_current_url(self) -> str:
         """Get the current URL of the browser."""
@@ -397,7 +522,7 @@ cert_value.select_by_value('1')
             logger.error(f"Failed to take debug screenshot: {str(e)}")
             logger.error(f"Failed to take debug screenshot: {str(e)}")
 
-    def get_table_row_count(self, locator: Locator) -> int:
+    def get_table_row_count(self, locator: Locator, timeout=0) -> int:
         """
         Returns the number of rows in a table matching the locator.
 
@@ -412,7 +537,7 @@ cert_value.select_by_value('1')
             DriverException: For other WebDriver errors
         """
         try:
-            rows = self.find_elements(locator)
+            rows = self.find_elements(locator, timeout=timeout)
             if not rows:
                 logger.warning(f"No rows found matching locator: {str(locator)}")
             return len(rows)
@@ -422,10 +547,10 @@ cert_value.select_by_value('1')
         except Exception as e:
             raise DriverException(f"Error getting row count: {str(e)} - locator: {str(locator)}")
 
-    def execute_script(self, script: str):
-        """Execute the specified script."""
+    def execute_script(self, script: str, *args):
+        """Execute the specified script and return its result."""
         try:
-            self.driver.execute_script(script)
+            return self.driver.execute_script(script, *args)
         except WebDriverException as e:
             raise DriverException(f"Failed to execute script {script}: {str(e)}")
 
@@ -456,12 +581,13 @@ cert_value.select_by_value('1')
             table_locator = Locator(LocatorType.ID, table_id)
             table = self.wait_for_element(table_locator)
 
-            # Get column headers
-            header_locator = Locator(LocatorType.CSS, "thead tr th")
-            headers = [
-                h.text.strip()
-                for h in self.find_elements(header_locator, context=table)
-            ]
+            try:
+                headers, rows = self._read_table_with_script(table)
+            except (WebDriverException, ValueError, TypeError) as e:
+                logger.warning(
+                    f"Script table extraction failed, reading cells one by one: {str(e)}"
+                )
+                headers, rows = self._read_table_with_elements(table, columns_needed)
 
             # Validate requested columns exist
             missing_columns = [col for col in columns_needed if col not in headers]
@@ -473,15 +599,9 @@ cert_value.select_by_value('1')
 
             # Extract rows
             rows_data = []
-            row_locator = Locator(LocatorType.CSS, "tbody tr")
-            rows = self.find_elements(row_locator, context=table)
-
-            for row in rows:
-                cell_locator = Locator(LocatorType.CSS, "td")
-                cells = self.find_elements(cell_locator, context=row)
-
+            for cells in rows:
                 row_data = {
-                    col: cells[idx].text.strip()
+                    col: cells[idx]
                     for col, idx in column_indices.items()
                     if idx < len(cells)  # Handle rows with fewer cells
                 }
@@ -494,6 +614,41 @@ cert_value.select_by_value('1')
         except Exception as e:
             raise DriverException(f"Failed to extract table data: {str(e)}")
 
+    # Serializes headers and cell texts in a single round-trip. Cells that are
+    # not rendered read as "" to match WebElement.text.
+    _TABLE_TO_JSON_SCRIPT = """
+        const table = arguments[0];
+        const text = (el) => el.getClientRects().length ? el.innerText.trim() : "";
+        const headers = Array.from(table.querySelectorAll("thead tr th"), text);
+        const rows = Array.from(table.querySelectorAll("tbody tr"),
+            (row) => Array.from(row.querySelectorAll("td"), text));
+        return JSON.stringify({headers: headers, rows: rows});
+    """
+
+    def _read_table_with_script(self, table):
+        """Return (headers, rows of cell texts) using one execute_script call."""
+        data = json.loads(self.driver.execute_script(self._TABLE_TO_JSON_SCRIPT, table))
+        return data["headers"], data["rows"]
+
+    def _read_table_with_elements(self, table, columns_needed):
+        """Return (headers, rows of cell texts) reading each cell through WebDriver."""
+        header_locator = Locator(LocatorType.CSS, "thead tr th")
+        headers = [
+            h.text.strip()
+            for h in self.find_elements(header_locator, context=table)
+        ]
+        needed = {headers.index(col) for col in columns_needed if col in headers}
+
+        rows = []
+        row_locator = Locator(LocatorType.CSS, "tbody tr")
+        cell_locator = Locator(LocatorType.CSS, "td")
+        for row in self.find_elements(row_locator, context=table):
+            cells = self.find_elements(cell_locator, context=row)
+            rows.append(
+                [cell.text.strip() if i in needed else "" for i, cell in enumerate(cells)]
+            )
+        return headers, rows
+
     def back(self):
         """Navigate back in browser history."""
         try:
@@ -501,6 +656,32 @@ cert_value.select_by_value('1')
         except WebDriverException as e:
             raise DriverException(f"Failed to navigate back: {str(e)}")
 
+    def history_key(self):
+        """Key of the current session history entry (Navigation API), or None."""
+        try:
+            return self.driver.execute_script(
+                "return window.navigation ? navigation.currentEntry.key : null"
+            )
+        except WebDriverException:
+            return None
+
+    def traverse_to(self, key, timeout=10) -> bool:
+        """Go back to a history entry captured with history_key() and wait for it to load.
+
+        Returns False if the entry is gone or did not load within the timeout.
+        """
+        try:
+            started = self.driver.execute_script(_TRAVERSE_SCRIPT, key)
+            if not started:
+                return False
+            WebDriverWait(
+                self.driver, timeout, ignored_exceptions=(WebDriverException,)
+            ).until(lambda d: d.execute_script(_HISTORY_ENTRY_LOADED_SCRIPT, key))
+            return True
+        except WebDriverException as e:
+            logger.debug(f"Could not traverse to history entry {key}: {str(e)}")
+            return False
+
 
     def set_checkbox_state(self, locator, desired_state):
         """
@@ -535,8 +716,9 @@ cert_value.select_by_value('1')
         try:
             list_element = self.find_element(locator)
             rows = self.find_elements(
-                Locator(LocatorType.TAG, "li"), 
-                list_element
+                Locator(LocatorType.TAG, "li"),
+                list_element,
+                timeout=LEGACY_IMPLICIT_WAIT,
             )
             if not rows:
                 logger.warning(f"No rows found matching locator: {str(locator)}")
@@ -0,0 +1,137 @@
+import logging
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+logger = logging.getLogger(__name__)
+
+# Few distinct values, stored once each
+CATEGORICAL_COLUMNS = ("Compañia", "Marca")
+INTEGER_COLUMNS = ("Año",)
+# The text is kept as the sheet has it (the query prompts describe it as
+# DD/MM/YYYY text) and the parsed date is stored in DATE_SUFFIX column
+DATE_COLUMNS = ("Vencimiento",)
+DATE_FORMAT = "%d/%m/%Y"
+DATE_SUFFIX = "__date"
+# Published versions left on disk
+KEEP_VERSIONS = 2
+
+
+def _parse_int(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (ValueError, OverflowError):
+        return None
+
+
+def _parse_date(value: str) -> Optional[date]:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def build_table(header: List[str], rows: List[List[str]]) -> pa.Table:
+    """Typed table of the sheet rows. Empty cells are nulls."""
+    arrays, names = [], []
+    for index, name in enumerate(header):
+        values = [row[index] if index < len(row) and row[index] != "" else None for row in rows]
+        if name in CATEGORICAL_COLUMNS:
+            array = pa.array(values, pa.string()).dictionary_encode()
+        elif name in INTEGER_COLUMNS:
+            parsed = {v: _parse_int(v) for v in set(values) if v is not None}
+            array = pa.array([parsed.get(v) for v in values], pa.int32())
+        else:
+            # The type pandas uses for its str columns: string would be cast
+            # (a private copy of the offsets in every process)
+            array = pa.array(values, pa.large_string())
+        arrays.append(array)
+        names.append(name)
+        if name in DATE_COLUMNS:
+            # Dates repeat a lot: each distinct one is parsed once
+            parsed = {v: _parse_date(v) for v in set(values) if v is not None}
+            arrays.append(pa.array([parsed.get(v) for v in values], pa.date32()))
+            names.append(name + DATE_SUFFIX)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _version_paths(path: str) -> List[str]:
+    """Published versions of the snapshot, oldest first."""
+    folder, name = os.path.split(os.path.abspath(path))
+    stem, ext = os.path.splitext(name)
+    pattern = re.compile(re.escape(stem) + r"\.(\d+)" + re.escape(ext) + "$")
+    versions = []
+    for entry in os.listdir(folder):
+        match = pattern.match(entry)
+        if match:
+            versions.append((int(match.group(1)), os.path.join(folder, entry)))
+    return [version_path for _, version_path in sorted(versions)]
+
+
+def write_snapshot(header: List[str], rows: List[List[str]], path: str, keep: int = KEEP_VERSIONS):
+    """
+    Publish the rows as a new version of the snapshot, an uncompressed Arrow
+    IPC file that readers memory-map. path is a symlink switched atomically
+    to the new version, so every process sees the same published version.
+
+    Versions are never modified: the last keep ones are left on disk and the
+    older ones are removed (processes that still have them mapped keep
+    reading them until they load the new version).
+    """
+    table = build_table(header, rows)
+    stem, ext = os.path.splitext(os.path.abspath(path))
+    version_path = f"{stem}.{time.time_ns()}{ext}"
+    tmp_path = f"{version_path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, version_path)
+
+    link_path = f"{path}.tmp"
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.basename(version_path), link_path)
+    os.replace(link_path, path)
+
+    for old_path in _version_paths(path)[:-keep]:
+        try:
+            os.remove(old_path)
+        except OSError as e:
+            logger.warning(f"Could not remove old snapshot {old_path}: {str(e)}")
+    return version_path
+
+
+def snapshot_version(path: str) -> Optional[str]:
+    """The file of the published version, None if nothing is published."""
+    try:
+        return os.path.realpath(path, strict=True)
+    except OSError:
+        return None
+
+
+def read_snapshot(path: str, parsed_dates: bool = False) -> pd.DataFrame:
+    """
+    Load the snapshot as a DataFrame. The Arrow buffers point into the
+    memory-mapped file, so the pages are shared through the OS cache by
+    every process that loads the same version. split_blocks keeps pandas
+    from copying the columns into consolidated blocks.
+
+    With parsed_dates the date columns hold the parsed dates (datetime64)
+    instead of the sheet text.
+    """
+    table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    for name in DATE_COLUMNS:
+        parsed_name = name + DATE_SUFFIX
+        if parsed_name not in table.column_names:
+            continue
+        if parsed_dates and name in table.column_names:
+            table = table.set_column(
+                table.column_names.index(name), name, table[parsed_name]
+            )
+        table = table.drop_columns([parsed_name])
+    return table.to_pandas(date_as_object=False, split_blocks=True)
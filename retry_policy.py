@@ -0,0 +1,188 @@
+import logging
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Type
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from policy_driver import ElementNotInteractableError, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+RETRY_JITTER = float(os.getenv("RETRY_JITTER", "0.5"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "300"))
+
+# Error classes
+PORTAL_ERROR = "portal_error"  # The portal answered with an error page (e.g. SURA <pre>)
+TIMEOUT = "timeout"  # The file did not arrive, or the page did not respond in time
+STALE = "stale"  # The page re-rendered under the click
+OTHER = "other"
+
+
+class DownloadTimeout(Exception):
+    """Raised when a started download does not show up in the download folder."""
+
+    pass
+
+
+@dataclass
+class ErrorRule:
+    """What to do when an attempt fails with an error class."""
+
+    retry: bool = True
+    base_delay: float = RETRY_BASE_DELAY
+    # Whether the failure counts towards opening the company circuit
+    trips_circuit: bool = True
+
+
+DEFAULT_RULES = {
+    # Asking again gets the same error page, and it says nothing about the portal health
+    PORTAL_ERROR: ErrorRule(retry=False, trips_circuit=False),
+    TIMEOUT: ErrorRule(retry=True),
+    STALE: ErrorRule(retry=True, base_delay=0.5, trips_circuit=False),
+    OTHER: ErrorRule(retry=False),
+}
+
+DEFAULT_ERROR_CLASSES: List[Tuple[Type[BaseException], str]] = [
+    (DownloadTimeout, TIMEOUT),
+    (TimeoutError, TIMEOUT),
+    (TimeoutException, TIMEOUT),
+    (StaleElementReferenceException, STALE),
+    (ElementClickInterceptedException, STALE),
+    (ElementNotInteractableException, STALE),
+    (ElementNotInteractableError, STALE),
+]
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed attempt is retried and how long to wait before.
+
+    Errors are mapped to a class by exception type (first match wins) and
+    each class has its own ErrorRule. Delays grow exponentially from the
+    rule's base delay, capped at max_delay, with random jitter.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        max_delay: float = RETRY_MAX_DELAY,
+        jitter: float = RETRY_JITTER,
+        rules: Dict[str, ErrorRule] = None,
+        error_classes: List[Tuple[Type[BaseException], str]] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.error_classes = list(error_classes or []) + DEFAULT_ERROR_CLASSES
+
+    def classify(self, error: BaseException) -> str:
+        for error_type, error_class in self.error_classes:
+            if isinstance(error, error_type):
+                return error_class
+        return OTHER
+
+    def rule(self, error_class: str) -> ErrorRule:
+        return self.rules.get(error_class, self.rules[OTHER])
+
+    def should_retry(self, error_class: str, attempt: int, max_attempts: int = None) -> bool:
+        return attempt < (max_attempts or self.max_attempts) and self.rule(error_class).retry
+
+    def delay(self, error_class: str, attempt: int) -> float:
+        delay = min(self.max_delay, self.rule(error_class).base_delay * 2 ** (attempt - 1))
+        return random.uniform(delay * (1 - self.jitter), delay)
+
+
+class CircuitBreaker:
+    """
+    Stops download attempts on a company portal after consecutive failures.
+
+    After reset_seconds one attempt is let through (half-open): a success
+    closes the circuit again, a failure keeps it open for another period.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = CIRCUIT_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            self.rejected += 1
+            return False
+        return True
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit closed")
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        half_open = self.state == "half-open"
+        if half_open or (
+            self.opened_at is None and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            logger.warning(
+                f"{self.name} circuit open after {self.consecutive_failures} consecutive "
+                f"failures, pausing downloads for {self.reset_seconds:.0f}s"
+            )
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(company: str) -> CircuitBreaker:
+    """The process-wide circuit breaker of a company portal."""
+    return _circuit_breakers.setdefault(company, CircuitBreaker(company))
+
+
+@dataclass
+class RetryStats:
+    """Attempts, failures by error class and time lost to retries."""
+
+    downloads: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: Counter = field(default_factory=Counter)
+    seconds_lost: float = 0.0
+    circuit_rejections: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.downloads} downloads in {self.attempts} attempts, "
+            f"{self.retries} retries, failures {dict(self.failures)}, "
+            f"{self.seconds_lost:.1f}s lost to failed attempts and backoff, "
+            f"{self.circuit_rejections} rejected by the circuit breaker"
+        )
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILE = os.getenv("DATABASE_FILE")
+# The journal is kept next to the database; an empty CHECKPOINT_FILE disables it
+CHECKPOINT_FILE = os.getenv(
+    "CHECKPOINT_FILE", f"{DATABASE_FILE}.checkpoint.jsonl" if DATABASE_FILE else None
+)
+CHECKPOINT_MAX_AGE_HOURS = int(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "20"))
+
+# Keys added to the policy dict that must not be written to the journal
+EXCLUDED_KEYS = ("db",)
+
+
+class RunCheckpoint:
+    """
+    Append-only JSONL journal with one record per completed policy.
+
+    A run that crashes midway leaves the journal behind; the next run restores
+    the recorded policies instead of going through the browser again.
+    """
+
+    def __init__(self, path: str = None, max_age_hours: int = CHECKPOINT_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age = timedelta(hours=max_age_hours)
+        self.completed: Dict[Tuple[str, str], dict] = {}
+        self.restored = 0
+        self.seconds_saved = 0.0
+        if self.path:
+            self.load()
+
+    def load(self):
+        """Read the journal, ignoring stale entries and a truncated last line."""
+        if not os.path.exists(self.path):
+            return
+        cutoff = datetime.now() - self.max_age
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    timestamp = datetime.fromisoformat(record["timestamp"])
+                    key = (record["company"], record["number"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Ignoring unreadable checkpoint line: {line[:80]}")
+                    continue
+                if timestamp < cutoff:
+                    continue
+                self.completed[key] = record
+        logger.info(f"Loaded {len(self.completed)} checkpoint records from {self.path}")
+
+    def record(self, company: str, policy: dict, seconds: float):
+        """Append the processed policy to the journal and flush it to disk."""
+        if not self.path:
+            return
+        record = {
+            "company": company,
+            "number": str(policy["number"]),
+            "expiration_date": policy.get("expiration_date"),
+            "seconds": round(seconds, 3),
+            "timestamp": datetime.now().isoformat(),
+            "policy": {k: v for k, v in policy.items() if k not in EXCLUDED_KEYS},
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed[(company, record["number"])] = record
+
+    def restore(self, company: str, policy: dict) -> bool:
+        """
+        Copy the checkpointed result into policy if it was already processed.
+
+        Returns:
+            bool: True if the policy was restored and can be skipped
+        """
+        record = self.completed.get((company, str(policy["number"])))
+        if not record or record.get("expiration_date") != policy.get("expiration_date"):
+            return False
+        policy.update(record["policy"])
+        self.restored += 1
+        self.seconds_saved += record.get("seconds", 0.0)
+        return True
+
+    def summary(self) -> str:
+        return (
+            f"{self.restored} policies restored from checkpoint, "
+            f"{self.seconds_saved:.1f}s of browser work saved"
+        )
+
+    def clear(self):
+        """Remove the journal once the run has been fully persisted."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.completed.clear()
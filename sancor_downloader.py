@@ -1,6 +1,7 @@
 import logging, time, re
 from datetime import datetime, timedelta
 from policy_driver import Locator, LocatorType, DriverException, PolicyDriver
+from wait_strategy import LEGACY_IMPLICIT_WAIT
 from base_downloader import (
     BaseDownloader,
     ClickDownloadStarter,
@@ -86,7 +87,7 @@ class SancorDownloader(BaseDownloader):
             except:
                 sancor_message = None
                 try:
-                    sancor_message = self.driver.find_element(Locator(LocatorType.CLASS, "dummyRow")).text
+                    sancor_message = self.driver.find_element(Locator(LocatorType.CLASS, "dummyRow"), timeout=0).text
                 except:
                     sancor_message = "No hay resultados"
                 error_message = f"SANCOR informa: {sancor_message}"
@@ -145,6 +146,9 @@ class SancorDownloader(BaseDownloader):
         logger.debug('fvr 1')
         table = self.driver.wait_for_element(Locator(LocatorType.ID, "historicalPolicy"))
         logger.debug('fvr 2')
+        # The rows are loaded after the table, wait for the first cells; the
+        # header rows have no cells, so they are read without waiting
+        self.driver.find_elements(Locator(LocatorType.CSS, "tr > td"), table, timeout=LEGACY_IMPLICIT_WAIT)
         filas = self.driver.find_elements(Locator(LocatorType.TAG, "tr"), table)
         logger.debug('fvr 3')
 
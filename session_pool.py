@@ -0,0 +1,80 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict
+from policy_driver import HEADLESS, PolicyDriver
+from shared_browser import SHARED_BROWSER, ContextDriver, SharedBrowser
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionTimings:
+    """Time spent per company on sessions, logins and downloads."""
+
+    sessions_created: int = 0
+    session_seconds: float = 0.0
+    logins: int = 0
+    login_seconds: float = 0.0
+    policies: int = 0
+    download_seconds: float = 0.0
+    searches: int = 0
+    searches_avoided: int = 0
+    grid_restore_failures: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"sessions created: {self.sessions_created} ({self.session_seconds:.1f}s), "
+            f"logins: {self.logins} ({self.login_seconds:.1f}s), "
+            f"policies: {self.policies} ({self.download_seconds:.1f}s downloading), "
+            f"searches: {self.searches} ({self.searches_avoided} avoided, "
+            f"{self.grid_restore_failures} grid restores failed)"
+        )
+
+
+class SessionPool:
+    """
+    Keeps one PolicyDriver per company alive between downloader runs so the
+    remote browser session and its login are reused instead of recreated.
+
+    With shared=True all companies run in isolated contexts of a single
+    browser process instead of one browser each.
+    """
+
+    def __init__(self, driver_creator, headless=HEADLESS, shared=SHARED_BROWSER):
+        self.driver_creator = driver_creator
+        self.headless = headless
+        self.browser = SharedBrowser(driver_creator, headless) if shared else None
+        self._drivers: Dict[str, PolicyDriver] = {}
+        self._timings: Dict[str, SessionTimings] = {}
+
+    def get_driver(self, company: str) -> PolicyDriver:
+        """Return the pooled driver for a company, creating the wrapper if needed.
+
+        The remote session itself is opened lazily by the downloader login.
+        """
+        driver = self._drivers.get(company)
+        if driver is None:
+            if self.browser:
+                driver = ContextDriver(self.browser, company)
+            else:
+                driver = PolicyDriver(self.driver_creator, headless=self.headless)
+            self._drivers[company] = driver
+        return driver
+
+    def timings(self, company: str) -> SessionTimings:
+        return self._timings.setdefault(company, SessionTimings())
+
+    def log_summary(self):
+        for company, timings in self._timings.items():
+            logger.info(f"{company} session timings: {timings.summary()}")
+
+    def close_all(self):
+        """Quit every pooled browser session."""
+        for company, driver in self._drivers.items():
+            try:
+                driver.close()
+            except Exception as e:
+                logger.warning(f"Error closing {company} session: {str(e)}")
+        self._drivers.clear()
+        if self.browser:
+            self.browser.quit()
@@ -0,0 +1,175 @@
+import copy
+import logging
+import os
+import threading
+import time
+from functools import partial
+from typing import Dict
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from policy_driver import HEADLESS, DriverException, PolicyDriver
+
+logger = logging.getLogger(__name__)
+
+SHARED_BROWSER = os.getenv("SHARED_BROWSER", "false").lower() == "true"
+
+
+class SharedBrowser:
+    """
+    One browser process shared by several ContextDrivers, each in its own
+    isolated browser context (separate cookies, storage and downloads).
+
+    All contexts go through the same WebDriver session, so every command
+    switches to the context's window first. Commands are serialized, and
+    waits and downloads of different contexts overlap.
+    """
+
+    def __init__(self, driver_creator, headless=HEADLESS):
+        self.driver_creator = driver_creator
+        self.headless = headless
+        # Builds the Chrome options and runs the DevTools commands for the browser
+        self._launcher = PolicyDriver(driver_creator, headless=headless)
+        self.webdriver = None
+        self._execute = None
+        self._default_handle = None
+        self._current_handle = None
+        self._lock = threading.RLock()
+        self.contexts: Dict[str, "ContextDriver"] = {}
+
+    def start(self):
+        """Start the browser, or start a new one if the running one crashed."""
+        with self._lock:
+            if self.webdriver is not None:
+                if self._is_alive():
+                    return
+                self._discard_crashed()
+            self.webdriver = self.driver_creator.create(self._launcher.chrome_options())
+            self.webdriver.implicitly_wait(0)
+            self._launcher.driver = self.webdriver
+            self._execute = self.webdriver.execute
+            self._default_handle = self._current_handle = self.webdriver.current_window_handle
+            logger.info("Shared browser started")
+
+    def _is_alive(self) -> bool:
+        try:
+            return self.webdriver.session_id is not None and bool(self.webdriver.window_handles)
+        except WebDriverException:
+            return False
+
+    def _discard_crashed(self):
+        """Forget the dead browser and its contexts; they are opened again on demand."""
+        logger.warning("Shared browser session lost, starting a new one")
+        try:
+            self.webdriver.quit()
+        except WebDriverException as e:
+            logger.warning(f"Error quitting the lost shared browser: {str(e)}")
+        for context in self.contexts.values():
+            context.context_id = None
+            context.handle = None
+        self.contexts.clear()
+        self.webdriver = None
+        self._current_handle = None
+
+    def _cdp(self, cmd: str, params: dict = None):
+        """Browser-level DevTools command, sent through the default window."""
+        self._switch(self._default_handle)
+        return self._launcher.execute_cdp(cmd, params)
+
+    def _switch(self, handle):
+        if self._current_handle != handle:
+            self._execute(Command.SWITCH_TO_WINDOW, {"handle": handle})
+            self._current_handle = handle
+
+    def _execute_in(self, handle, driver_command, params=None):
+        with self._lock:
+            self._switch(handle)
+            return self._execute(driver_command, params)
+
+    def open_context(self, context: "ContextDriver"):
+        """Create an isolated context with one window and return a WebDriver bound to it."""
+        with self._lock:
+            self.start()
+            try:
+                context_id = self._cdp(
+                    "Target.createBrowserContext", {"disposeOnDetach": False}
+                )["browserContextId"]
+                handle = self._cdp(
+                    "Target.createTarget",
+                    {"url": "about:blank", "browserContextId": context_id},
+                )["targetId"]
+                self._cdp(
+                    "Browser.setDownloadBehavior",
+                    {
+                        "behavior": "allow",
+                        "browserContextId": context_id,
+                        "downloadPath": context.folder,
+                    },
+                )
+            except (WebDriverException, KeyError) as e:
+                raise DriverException(f"Could not create browser context: {str(e)}")
+            # ChromeDriver uses the DevTools target id as window handle, but
+            # picks up new targets asynchronously
+            deadline = time.monotonic() + 10
+            while handle not in self.webdriver.window_handles:
+                if time.monotonic() > deadline:
+                    raise DriverException(f"Window of context {context.name} not found")
+                time.sleep(0.1)
+
+        context.context_id = context_id
+        context.handle = handle
+        self.contexts[context.name] = context
+        # Same session, but every command (including the ones sent by the
+        # WebElements it creates) runs in the context's window
+        view = copy.copy(self.webdriver)
+        view.execute = partial(self._execute_in, handle)
+        logger.info(f"Browser context {context.name} created")
+        return view
+
+    def close_context(self, context: "ContextDriver"):
+        with self._lock:
+            try:
+                self._cdp("Target.closeTarget", {"targetId": context.handle})
+                self._cdp(
+                    "Target.disposeBrowserContext",
+                    {"browserContextId": context.context_id},
+                )
+            except WebDriverException as e:
+                logger.warning(f"Error closing context {context.name}: {str(e)}")
+            if self._current_handle == context.handle:
+                self._current_handle = None
+        self.contexts.pop(context.name, None)
+
+    def quit(self):
+        for context in list(self.contexts.values()):
+            context.close()
+        if self.webdriver is not None:
+            self.webdriver.quit()
+            self.webdriver = None
+            logger.info("Shared browser closed")
+
+
+class ContextDriver(PolicyDriver):
+    """PolicyDriver that runs in its own browser context of a SharedBrowser."""
+
+    def __init__(self, browser: SharedBrowser, name: str):
+        super().__init__(browser.driver_creator, headless=browser.headless)
+        self.browser = browser
+        self.name = name
+        # Each context downloads to its own folder so parallel downloads don't mix
+        self.folder = os.path.join(self.folder, name)
+        os.makedirs(self.folder, exist_ok=True)
+        self.context_id = None
+        self.handle = None
+
+    def init_driver(self):
+        self.driver = self.metrics.instrument(self.browser.open_context(self))
+
+    def has_live_session(self) -> bool:
+        return self.handle is not None and super().has_live_session()
+
+    def close(self):
+        """Close the context; the shared browser keeps running."""
+        if self.handle is not None:
+            self.browser.close_context(self)
+            self.driver = None
+            self.handle = None
@@ -0,0 +1,66 @@
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+from chat_history_db import get_sheet_overrides
+from models import SHEET_OVERRIDE_KINDS, SheetOverride
+
+logger = logging.getLogger(__name__)
+
+
+class SheetOverrides:
+    """
+    Sheet overrides indexed by kind and (company, policy_number, license_plate).
+
+    A lookup tries the exact key first and then the rules with an empty
+    company and/or license plate, so it's a few dict lookups per row.
+    """
+
+    def __init__(self, overrides: Iterable[SheetOverride]):
+        self._rules: Dict[str, Dict[Tuple[str, str, str], SheetOverride]] = {
+            kind: {} for kind in SHEET_OVERRIDE_KINDS
+        }
+        version = hashlib.blake2b(digest_size=12)
+        for override in overrides:
+            version.update(
+                repr(
+                    (
+                        override.kind,
+                        override.company,
+                        override.policy_number,
+                        override.license_plate,
+                        override.value,
+                    )
+                ).encode("utf-8")
+            )
+            if override.kind not in self._rules:
+                logger.warning(f"Unknown sheet override kind '{override.kind}', ignored")
+                continue
+            key = (override.company, override.policy_number, override.license_plate)
+            self._rules[override.kind][key] = override
+        # Changes when a rule is added, changed or removed (the db returns them sorted)
+        self.version = version.hexdigest()
+
+    def match(
+        self, kind: str, company: str, policy_number: str, license_plate: str = ""
+    ) -> Optional[SheetOverride]:
+        rules = self._rules[kind]
+        if not rules:
+            return None
+        for key in (
+            (company, policy_number, license_plate),
+            ("", policy_number, license_plate),
+            (company, policy_number, ""),
+            ("", policy_number, ""),
+        ):
+            override = rules.get(key)
+            if override is not None:
+                return override
+        return None
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._rules.values())
+
+
+def load_sheet_overrides() -> SheetOverrides:
+    """The overrides currently in the database."""
+    return SheetOverrides(get_sheet_overrides())
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify a vehicle row: a deleted and an inserted row with the
+# same key are reported as an update
+KEY_COLUMNS = ("Compañia", "Poliza", "Matricula")
+
+
+def row_hash(row: Sequence[str]) -> str:
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=12).hexdigest()
+
+
+@dataclass
+class SheetDiff:
+    """Changes of the sheet rows since the previous sync."""
+
+    hashes: List[str]
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    # (hash, copy of the raw row) of the rows that go through the patch stage
+    pending: List[Tuple[str, List[str]]] = field(default_factory=list)
+    full_rebuild: bool = False
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated + self.deleted
+
+
+@dataclass
+class SyncStats:
+    """Result of one sheet sync."""
+
+    timestamp: str
+    rows: int
+    inserted: int
+    updated: int
+    deleted: int
+    patched: int
+    full_rebuild: bool
+    written: bool
+    seconds: float
+
+    def summary(self) -> str:
+        rebuild = " (full rebuild)" if self.full_rebuild else ""
+        return (
+            f"{self.rows} rows, {self.inserted} inserted, {self.updated} updated, "
+            f"{self.deleted} deleted, {self.patched} patched{rebuild}, "
+            f"snapshot {'written' if self.written else 'unchanged'}, {self.seconds:.2f}s"
+        )
+
+
+def _write_json(path: str, data):
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_file, path)
+
+
+class SheetSync:
+    """
+    Keeps the patched version of every sheet row, keyed by the hash of the
+    raw row, so a sync only patches the rows inserted or changed since the
+    previous one. The state is saved to state_file to survive restarts.
+
+    The cache is dropped when the header or the version of the patch rules
+    changes. The state is loaded again when another process saved it.
+    """
+
+    def __init__(self, state_file: Optional[str]):
+        self.state_file = state_file
+        self.header: Optional[List[str]] = None
+        self.rules_version: Optional[str] = None
+        self.patched: Dict[str, List[str]] = {}
+        self.hashes: List[str] = []
+        self.output_hash: Optional[str] = None
+        self.last: Optional[SyncStats] = None
+        self._loaded = False
+        self._dirty = False
+        # Modification time of the state file loaded or saved by this process
+        self._state_mtime = None
+
+    def _state_changed(self) -> bool:
+        if not self._loaded:
+            return True
+        if not self.state_file or not os.path.exists(self.state_file):
+            return False
+        return os.path.getmtime(self.state_file) != self._state_mtime
+
+    def _load(self):
+        self._loaded = True
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            self._state_mtime = os.path.getmtime(self.state_file)
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.header = state["header"]
+            self.rules_version = state["rules_version"]
+            self.patched = state["patched"]
+            self.hashes = state["hashes"]
+            self.output_hash = state["output_hash"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring sheet sync state {self.state_file}: {str(e)}")
+
+    def _save(self):
+        if not self.state_file:
+            return
+        state = {
+            "header": self.header,
+            "rules_version": self.rules_version,
+            "patched": self.patched,
+            "hashes": self.hashes,
+            "output_hash": self.output_hash,
+        }
+        _write_json(self.state_file, state)
+        self._state_mtime = os.path.getmtime(self.state_file)
+
+    def diff(
+        self,
+        header: List[str],
+        rows: List[List[str]],
+        rules_version: str,
+        repatch: Callable[[List[str]], bool] = None,
+    ) -> SheetDiff:
+        """
+        Compare the rows with the previous sync. repatch tells which already
+        patched rows are patched again anyway (e.g. still incomplete ones).
+        """
+        if self._state_changed():
+            self._load()
+        full_rebuild = header != self.header or rules_version != self.rules_version
+        if full_rebuild:
+            self.patched = {}
+            self.hashes = []
+        self.header = list(header)
+        self.rules_version = rules_version
+
+        hashes = [row_hash(row) for row in rows]
+        old, new = Counter(self.hashes), Counter(hashes)
+        inserted_hashes, deleted_hashes = new - old, old - new
+        result = SheetDiff(hashes=hashes, full_rebuild=full_rebuild)
+
+        key_indexes = [header.index(c) for c in KEY_COLUMNS if c in header]
+        inserted_keys = Counter()
+        pending = set()
+        for h, row in zip(hashes, rows):
+            if h in inserted_hashes:
+                inserted_keys[tuple(row[i] for i in key_indexes)] += 1
+            patched = self.patched.get(h)
+            if h not in pending and (patched is None or (repatch and repatch(patched))):
+                pending.add(h)
+                result.pending.append((h, list(row)))
+
+        inserted = sum(inserted_hashes.values())
+        deleted = sum(deleted_hashes.values())
+        if key_indexes and deleted:
+            # Deleted rows are only known patched: a row whose plate was filled
+            # in by the patch stage counts as a delete and an insert
+            deleted_keys = Counter(
+                tuple(self.patched[h][i] for i in key_indexes)
+                for h in deleted_hashes.elements()
+                if h in self.patched
+            )
+            result.updated = sum((inserted_keys & deleted_keys).values())
+        result.inserted = inserted - result.updated
+        result.deleted = deleted - result.updated
+        return result
+
+    def apply(self, diff: SheetDiff, patched_rows: List[List[str]]) -> List[List[str]]:
+        """
+        Store the patched pending rows (in diff.pending order) and return
+        every patched row in sheet order.
+        """
+        for (h, _), row in zip(diff.pending, patched_rows):
+            if self.patched.get(h) != row:
+                self.patched[h] = row
+                self._dirty = True
+        current = set(diff.hashes)
+        for h in [h for h in self.patched if h not in current]:
+            del self.patched[h]
+            self._dirty = True
+        self._dirty = self._dirty or diff.hashes != self.hashes
+        self.hashes = diff.hashes
+        return [self.patched[h] for h in diff.hashes]
+
+    def commit(
+        self, output_rows: List[List[str]], output_path: str, write: Callable[[], None]
+    ) -> bool:
+        """
+        Call write if the output changed (or output_path is missing) and then
+        save the state. Returns True if the output was written.
+
+        If write raises, the new output is not recorded, so the next sync
+        writes it again.
+        """
+        output_hash = hashlib.blake2b(digest_size=16)
+        for row in output_rows:
+            output_hash.update(row_hash(row).encode("ascii"))
+        output_hash = output_hash.hexdigest()
+        changed = output_hash != self.output_hash or not os.path.exists(output_path)
+        if changed:
+            write()
+        if changed or self._dirty:
+            self.output_hash = output_hash
+            self._save()
+            self._dirty = False
+        return changed
+
+    def record(self, diff: SheetDiff, written: bool, seconds: float) -> SyncStats:
+        self.last = SyncStats(
+            timestamp=datetime.now().isoformat(timespec="seconds"),
+            rows=len(diff.hashes),
+            inserted=diff.inserted,
+            updated=diff.updated,
+            deleted=diff.deleted,
+            patched=len(diff.pending),
+            full_rebuild=diff.full_rebuild,
+            written=written,
+            seconds=seconds,
+        )
+        if self.state_file:
+            _write_json(f"{self.state_file}.last", asdict(self.last))
+        return self.last
+
+    def stats(self) -> Optional[dict]:
+        """The last sync, by any of the processes that share the state file."""
+        if self.state_file and os.path.exists(f"{self.state_file}.last"):
+            try:
+                with open(f"{self.state_file}.last", "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring last sheet sync stats: {str(e)}")
+        return asdict(self.last) if self.last else None
@@ -1,7 +1,10 @@
 import logging
 from typing import Dict, Any
+from selenium.common.exceptions import WebDriverException
 from policy_driver import Locator, LocatorType, DriverException
+from wait_strategy import LEGACY_IMPLICIT_WAIT
 from base_downloader import (
+    RESULT_GRID_RESTORE_TIMEOUT,
     BaseDownloader,
     ClickDownloadStarter,
     CompanyPolicyException,
@@ -56,11 +59,12 @@ class SuraDownloader(BaseDownloader):
         logger.warning("SURA does not require a custom logout implementation.")
         raise NotImplementedError()
 
-    def wait_overlay_invisibility(self):
+    def wait_overlay_invisibility(self, timeout=10):
         """Wait for any blocking overlays to disappear."""
         try:
             self.driver.wait_for_invisibility(
                 locator=Locator(LocatorType.CSS, "div.blockUI.blockOverlay"),
+                timeout=timeout,
                 poll_frequency=0.1,
             )
             logger.debug("Overlay is not blocking the search operation")
@@ -97,10 +101,24 @@ class SuraDownloader(BaseDownloader):
                 company=self.name(), reason=f"Policy search failed: {str(e)}"
             )
 
-    def get_endorsements_count(self) -> int:
+    def get_endorsements_count(self, timeout=LEGACY_IMPLICIT_WAIT) -> int:
         """Get the number of rows in the fleet table."""
         specific_locator = Locator(LocatorType.CSS, "table#grilla > tbody > tr.jqgrow")
-        return self.driver.get_table_row_count(specific_locator)
+        return self.driver.get_table_row_count(specific_locator, timeout=timeout)
+
+    def is_result_grid_ready(self, policy) -> bool:
+        """The grid is only valid if it still holds the results for this policy."""
+        try:
+            self.wait_overlay_invisibility(timeout=RESULT_GRID_RESTORE_TIMEOUT)
+            policy_input = self.driver.find_element(
+                Locator(LocatorType.ID, "TxtNroPoliza"), timeout=0
+            )
+            if policy_input.get_attribute("value").strip() != str(policy["number"]):
+                return False
+            return self.get_endorsements_count(timeout=RESULT_GRID_RESTORE_TIMEOUT) > 0
+        except (CompanyPolicyException, DriverException, WebDriverException):
+            # The page may still be changing after the traversal (stale input)
+            return False
 
     def get_vehicles_count(self) -> int:
         """Get the number of rows in the endorsement."""
@@ -119,6 +137,11 @@ class SuraDownloader(BaseDownloader):
         table_id = "GrdItems"
         try:
             self.driver.wait_for_element(Locator(LocatorType.ID, table_id))
+            # The rows are loaded after the grid, the table is read in one go
+            self.driver.find_elements(
+                Locator(LocatorType.CSS, f"table#{table_id} > tbody > tr"),
+                timeout=LEGACY_IMPLICIT_WAIT,
+            )
             vehicle_data = self.driver.extract_table_data(
                 table_id, ["Matrícula", "Estado", "Nro."]
             )
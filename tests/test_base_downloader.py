@@ -0,0 +1,212 @@
+import os
+import sys
+from datetime import timedelta
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from base_downloader import RESULT_GRID_RESTORE_TIMEOUT, BaseDownloader, CompanyPolicyException
+from driver_metrics import DriverMetrics
+from policy_driver import DriverException
+
+
+class FakeSession:
+    def __init__(self, accepts_login):
+        self.accepts_login = accepts_login
+
+
+class FakeDriver:
+    """PolicyDriver stand-in: each init_driver opens a new browser session."""
+
+    def __init__(self, new_sessions_accept_login=True):
+        self.new_sessions_accept_login = new_sessions_accept_login
+        self.driver = None
+        self.sessions = []
+        self.metrics = DriverMetrics()
+        self.history = []
+        self.traversals = []
+        self.history_entry_loads = True
+
+    def has_live_session(self):
+        return self.driver is not None
+
+    def init_driver(self):
+        self.driver = FakeSession(self.new_sessions_accept_login)
+        self.sessions.append(self.driver)
+
+    def apply_blocking_profile(self, company):
+        pass
+
+    def close(self):
+        self.driver = None
+
+    def navigate(self, url):
+        pass
+
+    def wait_for_element(self, locator, timeout=20):
+        pass
+
+    def send_keys(self, locator, text):
+        pass
+
+    def click(self, locator):
+        pass
+
+    def history_key(self):
+        return f"entry-{len(self.history)}"
+
+    def traverse_to(self, key, timeout=10):
+        self.traversals.append((key, timeout))
+        return self.history_entry_loads
+
+
+class FakeInput:
+    def clear(self):
+        pass
+
+    def send_keys(self, text):
+        pass
+
+
+class FakeDownloader(BaseDownloader):
+    def __init__(self, driver, expire_login_after=()):
+        super().__init__(driver=driver)
+        self.expire_login_after = expire_login_after
+        self.processed = []
+        self.grid_ready = True
+        self.grid_checks = 0
+
+    def name(self):
+        return "FAKE"
+
+    def get_login_username_locator(self):
+        return None
+
+    def get_login_pass_locator(self):
+        return None
+
+    def get_login_btn_locator(self):
+        return None
+
+    def wait_login_confirmation(self):
+        if not self.driver.driver.accepts_login:
+            raise DriverException("Login page shown again")
+
+    def do_logout(self):
+        pass
+
+    def download_policy(self, policy):
+        self.processed.append(policy["number"])
+        policy["downloaded"] = True
+        if policy["number"] in self.expire_login_after:
+            # The login ages out and the portal won't log in this session again
+            self.login_time -= timedelta(minutes=self.login_timeout)
+            self.driver.driver.accepts_login = False
+        return True
+
+    def get_endorsements_count(self):
+        raise NotImplementedError()
+
+    def find_policy_input(self):
+        return FakeInput()
+
+    def search_policy(self):
+        self.driver.history.append("search")
+
+    def is_result_grid_ready(self, policy):
+        self.grid_checks += 1
+        return self.grid_ready
+
+    def get_soa_download_starter(self, policy=None):
+        raise NotImplementedError()
+
+    def get_mercosur_download_starter(self, policy=None):
+        raise NotImplementedError()
+
+    def validate_policy(self, policy, endorsement_line):
+        raise NotImplementedError()
+
+    def prepare_next_vehicle_search(self):
+        raise NotImplementedError()
+
+    def reconcile_vehicles(self, page_data, policy_data):
+        raise NotImplementedError()
+
+
+@pytest.fixture(autouse=True)
+def company_config(monkeypatch):
+    monkeypatch.setenv("FAKE_LOGIN_TIMEOUT", "30")
+
+
+def make_policies(count):
+    return [
+        {
+            "number": str(number),
+            "year": "2999",
+            "expired": False,
+            "contains_cars": True,
+            "downloaded": False,
+            "cancelled": False,
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def test_failed_relogin_continues_in_a_new_session():
+    driver = FakeDriver()
+    downloader = FakeDownloader(driver, expire_login_after=("2",))
+    policies = make_policies(4)
+    downloader.login()
+    downloader.download_policies(policies)
+
+    assert downloader.processed == ["1", "2", "3", "4"]
+    assert all(p["downloaded"] for p in policies)
+    assert len(driver.sessions) == 2
+    assert downloader.logged_in and not downloader.login_session_expired()
+    assert downloader.timings.sessions_created == 2
+
+
+def test_gives_up_when_the_new_session_cant_log_in_either():
+    driver = FakeDriver()
+    downloader = FakeDownloader(driver, expire_login_after=("2",))
+    downloader.login()
+    driver.new_sessions_accept_login = False
+
+    with pytest.raises(CompanyPolicyException):
+        downloader.download_policies(make_policies(4))
+    assert downloader.processed == ["1", "2"]
+    assert len(driver.sessions) == 2
+
+
+def test_result_grid_is_restored_from_history():
+    driver = FakeDriver()
+    downloader = FakeDownloader(driver)
+    policy = make_policies(1)[0]
+    downloader._search_for_policy(policy)
+
+    downloader._return_to_result_grid(policy)
+    downloader._return_to_result_grid(policy)
+    assert driver.history == ["search"]
+    assert driver.traversals == [("entry-1", RESULT_GRID_RESTORE_TIMEOUT)] * 2
+    assert (downloader.timings.searches, downloader.timings.searches_avoided) == (1, 2)
+
+
+def test_searches_again_when_the_grid_is_not_restored():
+    driver = FakeDriver()
+    downloader = FakeDownloader(driver)
+    policy = make_policies(1)[0]
+    downloader._search_for_policy(policy)
+
+    # The grid came back, but not with the results of the policy
+    downloader.grid_ready = False
+    downloader._return_to_result_grid(policy)
+    # The history entry is gone: the grid is not checked
+    driver.history_entry_loads = False
+    downloader._return_to_result_grid(policy)
+
+    assert driver.history == ["search"] * 3
+    assert driver.traversals == [("entry-1", RESULT_GRID_RESTORE_TIMEOUT), ("entry-2", RESULT_GRID_RESTORE_TIMEOUT)]
+    assert downloader.grid_checks == 1
+    assert downloader.timings.searches == 3
+    assert downloader.timings.grid_restore_failures == 2
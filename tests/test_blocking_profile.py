@@ -0,0 +1,20 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from blocking_profile import CSS_PATTERNS, DEFAULT, OFF, STRICT, blocked_patterns
+
+
+def test_css_is_only_blocked_by_strict_profile():
+    assert not set(CSS_PATTERNS) & set(blocked_patterns("SURA", DEFAULT))
+    assert set(CSS_PATTERNS) <= set(blocked_patterns("SURA", STRICT))
+    assert blocked_patterns("SURA", OFF) == []
+
+
+def test_company_allowlist(monkeypatch):
+    monkeypatch.setenv("BLOCKING_ALLOWLIST_BSE", "*.woff, *.woff2")
+    patterns = blocked_patterns("BSE", DEFAULT)
+    assert "*.woff" not in patterns and "*.woff2" not in patterns
+    assert "*.woff" in blocked_patterns("SURA", DEFAULT)
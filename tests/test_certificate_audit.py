@@ -0,0 +1,60 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from certificate_audit import CertificateManifest, audit_store
+from mock_portal import certificate_pdf
+from pdf_cache import PdfValidationCache
+
+
+@pytest.fixture
+def store(tmp_path):
+    folder = tmp_path / "certificados"
+    vehicle = folder / "SURA" / "1968422" / "2026" / "SDG1586"
+    vehicle.mkdir(parents=True)
+    (vehicle / "soa.pdf").write_bytes(certificate_pdf("SOA SDG1586"))
+    data = certificate_pdf("Mercosur SDG1586")
+    (vehicle / "mercosur.pdf").write_bytes(data[: len(data) // 2])
+    policy = folder / "BSE" / "8585536" / "2026"
+    policy.mkdir(parents=True)
+    (policy / "soa.pdf").write_bytes(certificate_pdf("SOA 8585536"))
+    return str(folder)
+
+
+def audit(store, tmp_path):
+    cache = PdfValidationCache(str(tmp_path / "cache.db"))
+    return audit_store(store, workers=1, cache=cache)
+
+
+def test_valid_and_truncated_certificates(store, tmp_path):
+    manifest = audit(store, tmp_path)
+    assert manifest.is_valid("SURA", "1968422", "2026", "SDG1586", "soa.pdf")
+    assert not manifest.is_valid("SURA", "1968422", "2026", "SDG1586", "mercosur.pdf")
+    # A policy without plates is stored without the plate folder
+    assert manifest.is_valid("BSE", 8585536, 2026, None, "soa.pdf")
+    assert manifest.counts() == {"vehicles": 2, "valid": 2, "invalid": 1}
+
+    # The second audit answers from the cache
+    assert audit(store, tmp_path).entries == manifest.entries
+
+
+def test_files_missing_from_the_manifest_are_not_valid(store, tmp_path):
+    manifest = audit(store, tmp_path)
+    assert not manifest.is_valid("BSE", "8585536", "2026", None, "mercosur.pdf")
+    assert not manifest.is_valid("SURA", "1968422", "2026", "SDD6542", "soa.pdf")
+    assert not manifest.is_valid("SURA", "9176866", "2026", "SDG1586", "soa.pdf")
+
+
+def test_save_and_load(store, tmp_path):
+    manifest = audit(store, tmp_path)
+    path = str(tmp_path / "manifest.json")
+    manifest.save(path)
+
+    loaded = CertificateManifest.load(path)
+    assert loaded.entries == manifest.entries
+    assert loaded.generated_at == manifest.generated_at
+    assert loaded.is_valid("BSE", "8585536", "2026", "", "soa.pdf")
+    assert CertificateManifest.load(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,68 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from download_plan import build_download_plan
+
+FILTERED_DATA = (
+    "Cliente,Compañia,Poliza,Matricula,Marca,Modelo,Año\n"
+    'TRANSBIANCO SA,BSE,8585536,SDB4050,SUZUKI,ALTO 800 GL,2017\n'
+    'TRANSBIANCO SA,BSE,8585536,AEW4763,FORD,F-100,2002.0\n'
+    '"PEREZ, JUAN",SURA,9176866,SDD6542,,,\n'
+    '"PEREZ, JUAN",SURA,19176866,SDD6543,,,\n'
+)
+
+
+def test_plan_from_the_rows_in_the_response():
+    response = (
+        "1. Matrícula: SDB-4050 - Póliza: 8585536 - Compañía: BSE\n"
+        "2. Matrícula: SDD6542 - Póliza: 9176866 - Compañía: SURA"
+    )
+    assert build_download_plan(FILTERED_DATA, response, True, False) == {
+        "BSE": [
+            {
+                "policy_number": "8585536",
+                "download_soa": True,
+                "download_mer": False,
+                "vehicles": [{"license_plate": "SDB4050", "desc": "SUZUKI ALTO 800 GL (2017)"}],
+                "client": "TRANSBIANCO SA",
+            }
+        ],
+        "SURA": [
+            {
+                "policy_number": "9176866",
+                "download_soa": True,
+                "download_mer": False,
+                "vehicles": [{"license_plate": "SDD6542"}],
+                "client": "PEREZ, JUAN",
+            }
+        ],
+    }
+
+
+def test_every_vehicle_of_a_policy_without_plates_in_the_response():
+    plan = build_download_plan(FILTERED_DATA, "Todos los de la póliza 8585536 de BSE", False, True)
+    assert [v["license_plate"] for v in plan["BSE"][0]["vehicles"]] == ["SDB4050", "AEW4763"]
+    assert plan["BSE"][0]["download_mer"] and not plan["BSE"][0]["download_soa"]
+
+
+def test_rows_that_cant_be_used():
+    assert build_download_plan("", "Póliza 8585536", True, False) is None
+    assert build_download_plan("Cliente,Matricula\nA,SDB4050\n", "SDB4050", True, False) is None
+    assert build_download_plan(FILTERED_DATA, "No encontré esa póliza", True, False) is None
+
+
+def test_a_plate_is_not_matched_inside_a_longer_one():
+    filtered_data = (
+        "Cliente,Compañia,Poliza,Matricula\n"
+        "ACME SA,SURA,1968422,OBO587\n"
+        "ACME SA,SURA,1968422,OBO5870\n"
+        "ACME SA,SURA,1968422,SDB4050\n"
+    )
+    plan = build_download_plan(filtered_data, "Póliza 1968422, matrícula OBO-5870", True, False)
+    assert [v["license_plate"] for v in plan["SURA"][0]["vehicles"]] == ["OBO5870"]
+
+    plan = build_download_plan(filtered_data, "Póliza 1968422: obo 587 y SDB4050.", True, False)
+    assert [v["license_plate"] for v in plan["SURA"][0]["vehicles"]] == ["OBO587", "SDB4050"]
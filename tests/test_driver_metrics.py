@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import driver_metrics
+from driver_metrics import DriverMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class StubWebDriver:
+    """Each command takes a fixed time on the fake clock; "error" fails."""
+
+    SECONDS = {"get": 1.0, "findElement": 0.25, "error": 0.5}
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def execute(self, driver_command, params=None):
+        self.clock.now += self.SECONDS[driver_command]
+        if driver_command == "error":
+            raise RuntimeError("no such window")
+        return {"value": None}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(driver_metrics.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_commands_are_counted_and_timed_per_nested_step(clock):
+    metrics = DriverMetrics()
+    webdriver = metrics.instrument(StubWebDriver(clock))
+
+    metrics.start_policy(1968422)
+    with metrics.step("search"):
+        webdriver.execute("get")
+        with metrics.step("endorsement"):
+            webdriver.execute("findElement")
+            webdriver.execute("findElement")
+            with pytest.raises(RuntimeError):
+                webdriver.execute("error")
+    webdriver.execute("get")
+    clock.now += 0.5  # Work that isn't a remote command
+    metrics.end_policy()
+
+    assert sorted(metrics.folded_stacks(1968422)) == [
+        "1968422;other;get 1000",
+        "1968422;search;endorsement;error 500",
+        "1968422;search;endorsement;findElement 500",
+        "1968422;search;get 1000",
+    ]
+    assert metrics.policy_breakdown(1968422).splitlines() == [
+        "  search;get: 1 cmds, 1.00s (33%)",
+        "  other;get: 1 cmds, 1.00s (33%)",
+        "  search;endorsement;findElement: 2 cmds, 0.50s (17%)",
+        "  search;endorsement;error: 1 cmds, 0.50s (17%)",
+    ]
+    summary = metrics.summary().splitlines()
+    assert summary[0] == "Remote commands: 5"
+    assert summary[1].startswith("  step endorsement: n=1 total=1.0s")
+    assert summary[2].startswith("  step search: n=1 total=2.0s")
+    assert summary[3].startswith("  command get: n=2 total=2.0s p50=1.000s")
+    assert summary[-1].startswith("  policy: n=1 total=3.5s")
+
+
+def test_commands_outside_a_policy_and_reset(clock):
+    metrics = DriverMetrics()
+    webdriver = metrics.instrument(StubWebDriver(clock))
+    with metrics.step("login"):
+        webdriver.execute("get")
+    assert metrics.folded_stacks() == ["-;login;get 1000"]
+
+    metrics.reset()
+    assert metrics.folded_stacks() == []
+    assert metrics.summary() == "Remote commands: 0"
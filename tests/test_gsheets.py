@@ -0,0 +1,105 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import gsheets
+
+
+class FakeCredentials:
+    def __init__(self):
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = "token"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+class FakeClient:
+    def __init__(self):
+        self.opened = 0
+
+    def open_by_url(self, url):
+        self.opened += 1
+        return self
+
+    def worksheet(self, name):
+        return self
+
+    def get_all_values(self):
+        return [["Poliza"], ["1"]]
+
+
+def test_client_and_worksheet_are_reused(monkeypatch):
+    credentials, client = FakeCredentials(), FakeClient()
+    monkeypatch.setattr(
+        gsheets.service_account.Credentials,
+        "from_service_account_file",
+        lambda path, scopes: credentials,
+    )
+    monkeypatch.setattr(gsheets.gspread, "authorize", lambda c: client)
+    sheet_client = gsheets.SheetClient("credentials.json")
+
+    assert sheet_client.get_all_values("url", "Sheet1") == [["Poliza"], ["1"]]
+    assert sheet_client.get_all_values("url", "Sheet1") == [["Poliza"], ["1"]]
+    assert (client.opened, credentials.refreshes) == (1, 1)
+    assert sheet_client.last_timings.rows == 2
+
+    # Refreshed ahead of expiry
+    credentials.expiry = datetime.utcnow() + timedelta(seconds=30)
+    sheet_client.get_all_values("url", "Sheet1")
+    assert credentials.refreshes == 2
+
+
+class FakeColumnSheet:
+    """Worksheet returning columns the way the API does, without trailing empties."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.ranges = None
+
+    def row_values(self, row):
+        return [column[0] for column in self.columns]
+
+    def batch_get(self, ranges, major_dimension=None):
+        self.ranges = ranges
+        result = []
+        for a1_range in ranges:
+            first, last = (ord(letter) - ord("A") for letter in a1_range.split(":"))
+            columns = [list(c) for c in self.columns[first : last + 1]]
+            for column in columns:
+                while column and column[-1] == "":
+                    column.pop()
+            while columns and not columns[-1]:
+                columns.pop()
+            result.append(columns)
+        return result
+
+
+def test_projected_fetch(monkeypatch):
+    sheet = FakeColumnSheet(
+        [
+            ["Poliza", "1", "2", "3"],
+            ["Plantilla HTML", "<p>", "<p>", "<p>"],
+            ["Matricula", "AAA1111", "", ""],
+            ["Marca", "", "", ""],
+            ["Cliente", "PEREZ, ANA", "GOMEZ, LUIS", ""],
+        ]
+    )
+    sheet_client = gsheets.SheetClient("credentials.json")
+    monkeypatch.setattr(sheet_client, "_authorize", lambda: None)
+    monkeypatch.setattr(sheet_client, "_worksheet", lambda url, name: sheet)
+
+    data = sheet_client.get_columns("url", "Sheet1", ["Cliente", "Poliza", "Matricula", "Marca"])
+    assert sheet.ranges == ["A:A", "C:E"]
+    assert data == [
+        ["Poliza", "Matricula", "Marca", "Cliente"],
+        ["1", "AAA1111", "", "PEREZ, ANA"],
+        ["2", "", "", "GOMEZ, LUIS"],
+        ["3", "", "", ""],
+    ]
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from health import LatencyWindow, dataset_status, degraded_reasons, health_warnings
+
+
+def healthy_report(**changes):
+    report = {
+        "startup": {"status": "ready"},
+        "dataset": {"version": "policies.1.arrow", "age_minutes": 12.0},
+        "sqlite": {"ms": 0.4, "error": None},
+        "llm": {"calls": 0, "errors": 0, "p50": None, "p95": None},
+        "outbound_queue": 0,
+        "worker_pool": {"busy": 2, "size": 40, "saturation": 0.05},
+    }
+    report.update(changes)
+    return report
+
+
+def test_latency_percentiles_of_recent_calls():
+    window = LatencyWindow(size=20)
+    for seconds in range(1, 31):
+        window.record(float(seconds), ok=seconds != 30)
+    # Only the last 20 calls (11..30) are kept
+    assert window.stats() == {"calls": 20, "errors": 1, "p50": 20.0, "p95": 29.0}
+
+    with pytest.raises(ValueError):
+        window.timed(int, "not a number")
+    assert window.stats()["errors"] == 2
+
+
+def test_degraded_reasons():
+    assert degraded_reasons(healthy_report()) == []
+    report = healthy_report(
+        startup={"status": "starting"},
+        sqlite={"ms": None, "error": "database is locked"},
+        llm={"calls": 10, "errors": 0, "p50": 3.0, "p95": 45.0},
+        worker_pool={"busy": 40, "size": 40, "saturation": 1.0},
+    )
+    assert degraded_reasons(report) == [
+        "startup starting",
+        "sqlite database is locked",
+        "worker pool 40/40",
+    ]
+
+
+def test_shared_problems_are_warnings():
+    report = healthy_report(
+        dataset={"version": "policies.1.arrow", "age_minutes": 5000.0},
+        llm={"calls": 10, "errors": 0, "p50": 3.0, "p95": 45.0},
+    )
+    assert degraded_reasons(report) == []
+    assert health_warnings(report) == ["dataset age 5000.0 minutes", "llm p95 45.0s"]
+
+
+def test_slow_calls_age_out_of_the_window():
+    now = [0.0]
+    window = LatencyWindow(size=20, max_age=15, clock=lambda: now[0])
+    for _ in range(10):
+        window.record(45.0)
+    assert health_warnings(healthy_report(llm=window.stats())) == ["llm p95 45.0s"]
+
+    # No calls for 16 minutes: the slow ones are dropped
+    now[0] += 16 * 60
+    stats = window.stats()
+    assert stats == {"calls": 0, "errors": 0, "p50": None, "p95": None}
+    report = healthy_report(llm=stats)
+    assert degraded_reasons(report) == [] and health_warnings(report) == []
+
+
+def test_dataset_age_counts_syncs_without_changes(tmp_path):
+    path = tmp_path / "policies.1.arrow"
+    path.write_bytes(b"")
+    published = time.time() - 3600
+    os.utime(path, (published, published))
+    assert dataset_status(str(path), None)["age_minutes"] == pytest.approx(60, abs=1)
+
+    last_sync = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    assert dataset_status(str(path), last_sync)["age_minutes"] < 1
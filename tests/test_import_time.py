@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Imported by the warm-up after startup, never by `import main`
+DEFERRED_MODULES = ("pandas", "pyarrow", "numpy", "openai", "twilio", "thefuzz", "gspread")
+# Cumulative import time of main, mostly FastAPI and pydantic
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+
+def import_times(module):
+    """{module: cumulative microseconds} from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_main_defers_heavy_imports():
+    times = import_times("main")
+    imported = {name.split(".")[0] for name in times}
+    assert not imported & set(DEFERRED_MODULES)
+    assert times["main"] / 1000 < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,61 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+from intent_router import IntentRouter
+
+df = pd.DataFrame(
+    {
+        "Matricula": ["SDB4050", None, "OBO587"],
+        "Poliza": ["1968422", "Pendiente", "19684220"],
+    }
+)
+
+
+def test_plate_and_policy_lookups_are_routed():
+    router = IntentRouter()
+    soa = router.route("pasame el soa de sdb-4050")
+    assert (soa["lp"], soa["soa"], soa["mer"]) == ("SDB4050", True, False)
+    assert df.query(soa["qs"], engine="python")["Matricula"].tolist() == ["SDB4050"]
+
+    mer = router.route("carta verde de obo 587 y la poliza 1968422")
+    assert (mer["soa"], mer["mer"], "lp" in mer) == (False, True, True)
+    assert df.query(mer["qs"], engine="python")["Matricula"].tolist() == ["SDB4050", "OBO587"]
+
+    policy = router.route("poliza 1968422")
+    assert not policy["soa"] and not policy["mer"] and "lp" not in policy
+    assert df.query(policy["qs"], engine="python")["Poliza"].tolist() == ["1968422"]
+    assert policy["r"] == "Datos de la póliza 1968422"
+
+    # Data read from the CSV, before the first snapshot
+    for polizas in ([1968422, 19684220], [1968422.0, None]):
+        csv_df = pd.DataFrame({"Poliza": polizas})
+        assert csv_df.query(policy["qs"], engine="python")["Poliza"].tolist() == [1968422]
+
+
+def test_other_messages_go_to_the_llm():
+    router = IntentRouter()
+    messages = (
+        "soa de perez sdb4050",
+        "soa del primero",
+        "soa 1234",
+        "soa",
+        "auto ano 2017",
+        "soa con 1234",
+        # Phone and cédula numbers: the LLM filters by Tel1 or the client
+        "099123456",
+        "poliza del 099123456",
+        "datos de 41234567",
+    )
+    for message in messages:
+        assert router.route(message) is None
+    router.route("soa sdb4050")
+    assert router.stats() == {
+        "messages": 10,
+        "routed": {"plate": 1},
+        "llm": 9,
+        "hit_rate": 0.1,
+    }
@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+from urllib.request import urlopen
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mock_portal import MockPortal, build_fixtures, downloader_policies
+from pdf_utils import FAST, is_valid_pdf
+
+
+def test_fixtures_match_downloader_policies():
+    fixtures = build_fixtures(policies=3, vehicles=2)
+    sura = downloader_policies(fixtures, "SURA")
+    assert [p["number"] for p in sura] == list(fixtures["SURA"])
+    assert all(len(p["vehicles"]) == 2 for p in sura)
+    assert all(len(p["vehicles"]) == 1 for p in downloader_policies(fixtures, "BSE"))
+
+
+def test_portal_serves_grid_and_certificates(tmp_path):
+    fixtures = build_fixtures(policies=1, vehicles=2, endorsements=2)
+    with MockPortal(fixtures, latency_ms=0, ajax_latency_ms=0, pdf_latency_ms=0) as portal:
+        policy = next(iter(fixtures["SURA"].values()))
+        rows = json.loads(
+            urlopen(f"{portal.base_url}/sura/api/endorsements?policy={policy.number}").read()
+        )
+        assert len(rows) == 2
+        items = json.loads(
+            urlopen(f"{portal.base_url}/sura/api/items?id_pv={rows[-1]['id_pv']}").read()
+        )
+        assert [i["plate"] for i in items] == [v.plate for v in policy.vehicles]
+
+        response = urlopen(f"{portal.base_url}/sura/cert?kind=soa&id_pv={rows[0]['id_pv']}&nro=1")
+        assert response.headers["Content-Type"] == "application/pdf"
+        (tmp_path / "soa.pdf").write_bytes(response.read())
+        assert is_valid_pdf(str(tmp_path), "soa.pdf", FAST)[0]
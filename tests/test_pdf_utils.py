@@ -0,0 +1,79 @@
+import os
+import re
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pdf_utils import FAST, is_valid_pdf, quick_check_pdf
+
+
+def minimal_pdf() -> bytes:
+    objects = [
+        b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n",
+        b"2 0 obj\n<< /Type /Pages /Kids [] /Count 0 >>\nendobj\n",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for obj in objects:
+        offsets.append(len(body))
+        body += obj
+    xref_offset = len(body)
+    xref = b"xref\n0 3\n0000000000 65535 f \n"
+    for offset in offsets:
+        xref += b"%010d 00000 n \n" % offset
+    trailer = b"trailer\n<< /Size 3 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+    return body + xref + trailer
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_quick_check_accepts_well_formed_pdf(tmp_path):
+    path = write(tmp_path, "soa.pdf", minimal_pdf())
+    assert quick_check_pdf(path) == (True, "PDF is valid")
+
+
+def test_truncated_pdf_is_rejected_by_the_full_parse(tmp_path):
+    data = minimal_pdf()
+    path = write(tmp_path, "soa.pdf", data[: len(data) // 2])
+    assert quick_check_pdf(path)[0] is None
+    assert is_valid_pdf(str(tmp_path), "soa.pdf", FAST)[0] is False
+
+
+def test_readable_pdfs_are_not_rejected_by_the_quick_check(tmp_path):
+    # Bytes after %%EOF and a startxref beyond the end of the file
+    write(tmp_path, "soa.pdf", minimal_pdf() + b"\0" * 3072)
+    write(tmp_path, "mercosur.pdf", re.sub(rb"startxref\n\d+", b"startxref\n999999", minimal_pdf()))
+    for filename in ("soa.pdf", "mercosur.pdf"):
+        assert quick_check_pdf(str(tmp_path / filename))[0] is None
+        assert is_valid_pdf(str(tmp_path), filename, FAST) == is_valid_pdf(str(tmp_path), filename)
+        assert is_valid_pdf(str(tmp_path), filename, FAST)[0] is True
+
+
+def test_quick_check_rejects_non_pdf(tmp_path):
+    path = write(tmp_path, "soa.pdf", b"<html>Error</html>")
+    is_valid, _ = quick_check_pdf(path)
+    assert is_valid is False
+
+
+def test_quick_check_is_inconclusive_with_bad_xref_offset(tmp_path):
+    # Inside the file, but not at the xref table
+    data = re.sub(rb"startxref\n\d+", b"startxref\n20", minimal_pdf())
+    path = write(tmp_path, "soa.pdf", data)
+    assert quick_check_pdf(path)[0] is None
+
+
+def test_fast_mode_keeps_filename_checks(tmp_path):
+    write(tmp_path, "soa.txt", minimal_pdf())
+    assert is_valid_pdf(str(tmp_path), "soa.txt", FAST) == (
+        False,
+        "File does not have .pdf extension",
+    )
+    assert is_valid_pdf(str(tmp_path), "mercosur.pdf", FAST) == (
+        False,
+        "File does not exist",
+    )
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd
+from policy_snapshot import read_snapshot, snapshot_version, write_snapshot
+
+HEADER = ["Compañia", "Poliza", "Vencimiento", "Marca", "Año", "Cliente"]
+ROWS = [
+    ["SURA", "1968422", "05/09/2026", "FIAT", "2015", "PEREZ, ANA"],
+    ["SURA", "1968422", "31/02/2026", "FIAT", "", ""],
+    ["BSE", "Pendiente", "a confirmar", "", "s/d", "GOMEZ, LUIS"],
+]
+
+
+def test_typed_round_trip(tmp_path):
+    path = str(tmp_path / "policies.arrow")
+    write_snapshot(HEADER, ROWS, path)
+
+    df = read_snapshot(path)
+    assert list(df.columns) == HEADER
+    assert isinstance(df["Compañia"].dtype, pd.CategoricalDtype)
+    assert df["Vencimiento"].tolist() == ["05/09/2026", "31/02/2026", "a confirmar"]
+    assert df["Año"].iloc[0] == 2015 and df["Año"].isna().tolist() == [False, True, True]
+    assert df["Cliente"].isna().tolist() == [False, True, False]
+
+    dates = read_snapshot(path, parsed_dates=True)["Vencimiento"]
+    assert pd.api.types.is_datetime64_any_dtype(dates)
+    assert dates.iloc[0] == pd.Timestamp(2026, 9, 5)
+    assert dates.iloc[1:].isna().all()
+
+
+def test_versions_are_published_atomically(tmp_path):
+    path = str(tmp_path / "policies.arrow")
+    assert snapshot_version(path) is None
+
+    first = write_snapshot(HEADER, ROWS, path)
+    # A process that loaded the first version keeps reading it
+    loaded = read_snapshot(first)
+    second = write_snapshot(HEADER, ROWS[:1], path)
+    assert snapshot_version(path) == second != first
+    assert len(read_snapshot(path)) == 1 and len(loaded) == 3
+
+    third = write_snapshot(HEADER, ROWS[:2], path)
+    assert not os.path.exists(first) and os.path.exists(second)
+    assert snapshot_version(path) == third
+    assert loaded["Cliente"].iloc[0] == "PEREZ, ANA"
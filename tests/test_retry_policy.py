@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from selenium.common.exceptions import StaleElementReferenceException
+from retry_policy import (
+    OTHER,
+    PORTAL_ERROR,
+    STALE,
+    TIMEOUT,
+    CircuitBreaker,
+    DownloadTimeout,
+    RetryPolicy,
+)
+
+
+class PortalError(Exception):
+    pass
+
+
+def test_classify_and_retry_rules():
+    policy = RetryPolicy(max_attempts=3, error_classes=[(PortalError, PORTAL_ERROR)])
+    assert policy.classify(DownloadTimeout()) == TIMEOUT
+    assert policy.classify(StaleElementReferenceException()) == STALE
+    assert policy.classify(PortalError()) == PORTAL_ERROR
+    assert policy.classify(ValueError()) == OTHER
+    assert policy.should_retry(TIMEOUT, 2)
+    assert not policy.should_retry(TIMEOUT, 3)
+    assert not policy.should_retry(PORTAL_ERROR, 1)
+
+
+def test_delay_grows_and_is_capped():
+    policy = RetryPolicy(max_delay=5, jitter=0)
+    assert policy.delay(TIMEOUT, 1) == 2
+    assert policy.delay(TIMEOUT, 2) == 4
+    assert policy.delay(TIMEOUT, 5) == 5
+
+
+def test_circuit_opens_and_half_opens():
+    circuit = CircuitBreaker("TEST", failure_threshold=2, reset_seconds=0.05)
+    circuit.record_failure()
+    assert circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == "open" and not circuit.allow()
+    time.sleep(0.06)
+    assert circuit.state == "half-open" and circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == "open"
+    time.sleep(0.06)
+    circuit.record_success()
+    assert circuit.state == "closed"
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from run_checkpoint import RunCheckpoint
+
+
+def make_policy(number="1968422", expiration_date="05/09/2026"):
+    return {
+        "number": number,
+        "year": "2026",
+        "expiration_date": expiration_date,
+        "vehicles": [{"license_plate": "SDG1586"}],
+        "db": object(),
+    }
+
+
+def test_restart_restores_completed_policies(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    first_run = RunCheckpoint(path)
+    processed = make_policy()
+    processed["downloaded"] = True
+    first_run.record("SURA", processed, seconds=42.0)
+
+    second_run = RunCheckpoint(path)
+    policy = make_policy()
+    assert second_run.restore("SURA", policy)
+    assert policy["downloaded"] is True
+    assert second_run.restored == 1
+    assert second_run.seconds_saved == 42.0
+    assert not second_run.restore("BSE", make_policy())
+
+
+def test_changed_expiration_date_is_processed_again(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    RunCheckpoint(path).record("SURA", make_policy(), seconds=1.0)
+
+    checkpoint = RunCheckpoint(path)
+    assert not checkpoint.restore("SURA", make_policy(expiration_date="05/09/2027"))
+
+
+def test_stale_malformed_and_truncated_lines_are_ignored(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    old = {
+        "company": "SURA",
+        "number": "1",
+        "expiration_date": "05/09/2026",
+        "timestamp": (datetime.now() - timedelta(days=3)).isoformat(),
+        "policy": {},
+    }
+    no_number = dict(old, timestamp=datetime.now().isoformat())
+    del no_number["number"]
+    path.write_text(
+        json.dumps(old) + "\n" + json.dumps(no_number) + "\n" + '{"company": "SURA", "num'
+    )
+
+    checkpoint = RunCheckpoint(str(path))
+    assert checkpoint.completed == {}
+
+
+def test_clear_removes_journal(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = RunCheckpoint(path)
+    checkpoint.record("SURA", make_policy(), seconds=1.0)
+    checkpoint.clear()
+    assert not os.path.exists(path)
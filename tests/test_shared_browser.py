@@ -0,0 +1,161 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.command import Command
+from shared_browser import ContextDriver, SharedBrowser
+
+
+class FakeWebDriver:
+    """Records the commands and the window they ran in; DevTools targets are windows."""
+
+    def __init__(self):
+        self.session_id = "session"
+        self.current_window_handle = "default"
+        self.handles = ["default"]
+        self.commands = []
+        self.crashed = False
+        self.quit_called = False
+
+    def _check(self):
+        if self.crashed:
+            raise WebDriverException("chrome not reachable")
+
+    # Like selenium, the properties run a command (in the window of the view)
+    @property
+    def window_handles(self):
+        self.execute(Command.W3C_GET_WINDOW_HANDLES)
+        return list(self.handles)
+
+    @property
+    def current_url(self):
+        self.execute(Command.GET_CURRENT_URL)
+        return "about:blank"
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def execute(self, driver_command, params=None):
+        self._check()
+        if driver_command == Command.SWITCH_TO_WINDOW:
+            self.current_window_handle = params["handle"]
+        self.commands.append((self.current_window_handle, driver_command))
+        return {"value": None}
+
+    def execute_cdp_cmd(self, cmd, params):
+        self._check()
+        self.commands.append(("cdp", cmd, params))
+        if cmd == "Target.createBrowserContext":
+            return {"browserContextId": f"context-{len(self.handles)}"}
+        if cmd == "Target.createTarget":
+            handle = f"window-{len(self.handles)}"
+            self.handles.append(handle)
+            return {"targetId": handle}
+        if cmd == "Target.closeTarget":
+            self.handles.remove(params["targetId"])
+        return {}
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverCreator:
+    def __init__(self):
+        self.created = []
+
+    def create(self, options):
+        self.created.append(FakeWebDriver())
+        return self.created[-1]
+
+
+@pytest.fixture
+def browser(tmp_path, monkeypatch):
+    monkeypatch.setenv("TMP_DOWNLOAD_FOLDER", str(tmp_path))
+    return SharedBrowser(FakeDriverCreator(), headless=True)
+
+
+def open_context(browser, name):
+    context = ContextDriver(browser, name)
+    context.init_driver()
+    return context
+
+
+def test_contexts_are_isolated_with_their_own_downloads(browser, tmp_path):
+    first = open_context(browser, "first")
+    second = open_context(browser, "second")
+    webdriver = browser.driver_creator.created[0]
+    assert len(browser.driver_creator.created) == 1
+    assert set(browser.contexts) == {"first", "second"}
+    assert first.handle != second.handle
+    assert first.context_id != second.context_id
+
+    downloads = [c[2] for c in webdriver.commands if c[:2] == ("cdp", "Browser.setDownloadBehavior")]
+    assert [d["downloadPath"] for d in downloads] == [
+        str(tmp_path / "first"),
+        str(tmp_path / "second"),
+    ]
+    assert all(os.path.isdir(d["downloadPath"]) for d in downloads)
+    assert first.has_live_session() and second.has_live_session()
+
+
+def test_commands_run_in_the_window_of_their_context(browser):
+    first = open_context(browser, "first")
+    second = open_context(browser, "second")
+    webdriver = browser.driver_creator.created[0]
+    webdriver.commands.clear()
+
+    first.driver.execute(Command.GET_TITLE)
+    first.driver.execute(Command.GET_TITLE)
+    second.driver.execute(Command.GET_TITLE)
+    first.driver.execute(Command.GET_TITLE)
+    assert webdriver.commands == [
+        (first.handle, Command.SWITCH_TO_WINDOW),
+        (first.handle, Command.GET_TITLE),
+        (first.handle, Command.GET_TITLE),
+        (second.handle, Command.SWITCH_TO_WINDOW),
+        (second.handle, Command.GET_TITLE),
+        (first.handle, Command.SWITCH_TO_WINDOW),
+        (first.handle, Command.GET_TITLE),
+    ]
+    # The commands go through the metrics of each context
+    assert "other;getTitle: 3 cmds" in first.metrics.policy_breakdown("-")
+    assert "other;getTitle: 1 cmds" in second.metrics.policy_breakdown("-")
+
+
+def test_close_context_keeps_the_browser(browser):
+    first = open_context(browser, "first")
+    second = open_context(browser, "second")
+    webdriver = browser.driver_creator.created[0]
+    handle, context_id = first.handle, first.context_id
+
+    first.close()
+    assert ("cdp", "Target.closeTarget", {"targetId": handle}) in webdriver.commands
+    assert ("cdp", "Target.disposeBrowserContext", {"browserContextId": context_id}) in webdriver.commands
+    assert handle not in webdriver.handles
+    assert list(browser.contexts) == ["second"]
+    assert first.driver is None and not first.has_live_session()
+    assert second.has_live_session() and not webdriver.quit_called
+
+
+def test_a_crashed_browser_is_started_again(browser):
+    first = open_context(browser, "first")
+    second = open_context(browser, "second")
+    crashed = browser.driver_creator.created[0]
+    crashed.crashed = True
+    assert not first.has_live_session()
+
+    # What BaseDownloader.open_session does with a dead session
+    first.close()
+    first.init_driver()
+    assert len(browser.driver_creator.created) == 2
+    assert crashed.quit_called
+    assert first.has_live_session()
+    # The other contexts lived in the crashed browser and are opened again
+    assert not second.has_live_session()
+    second.init_driver()
+    assert second.has_live_session()
+    assert set(browser.contexts) == {"first", "second"}
@@ -0,0 +1,42 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import chat_history_db
+from models import CANCELLED_POLICY, REMOVE_VEHICLE, SET_LICENSE_PLATE, SheetOverride
+from sheet_overrides import SheetOverrides, load_sheet_overrides
+
+
+def test_match_falls_back_to_any_company_and_plate():
+    overrides = SheetOverrides(
+        [
+            SheetOverride(REMOVE_VEHICLE, "100", license_plate="AAA1111"),
+            SheetOverride(REMOVE_VEHICLE, "200", company="BSE"),
+            SheetOverride(SET_LICENSE_PLATE, "300", company="SURA", value="BBB2222"),
+            SheetOverride(SET_LICENSE_PLATE, "300", value="CCC3333"),
+        ]
+    )
+    assert overrides.match(REMOVE_VEHICLE, "SURA", "100", "AAA1111")
+    assert not overrides.match(REMOVE_VEHICLE, "SURA", "100", "DDD4444")
+    assert overrides.match(REMOVE_VEHICLE, "BSE", "200", "DDD4444")
+    assert not overrides.match(REMOVE_VEHICLE, "SURA", "200", "DDD4444")
+    assert overrides.match(SET_LICENSE_PLATE, "SURA", "300").value == "BBB2222"
+    assert overrides.match(SET_LICENSE_PLATE, "BSE", "300").value == "CCC3333"
+    assert not overrides.match(CANCELLED_POLICY, "SURA", "300")
+
+
+@pytest.fixture
+def new_database(tmp_path, monkeypatch):
+    # DATABASE_NAME is read when chat_history_db is first imported
+    monkeypatch.setattr(chat_history_db, "DATABASE_NAME", str(tmp_path / "test.db"))
+    chat_history_db.init_db()
+
+
+def test_defaults_are_loaded_in_a_new_database(new_database):
+    overrides = load_sheet_overrides()
+    assert overrides.match(SET_LICENSE_PLATE, "SURA", "1968422").value == "SDG1586"
+    assert overrides.match(REMOVE_VEHICLE, "SURA", "8170039", "SCJ3994")
+    assert overrides.match(CANCELLED_POLICY, "BSE", "9279761")
@@ -0,0 +1,79 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from sheet_sync import SheetSync
+
+HEADER = ["Compañia", "Poliza", "Matricula", "Marca"]
+
+
+def write_file(path):
+    open(path, "w").close()
+
+
+def sync(sheet_sync, rows, output_path, version="v1", write=write_file):
+    diff = sheet_sync.diff(HEADER, rows, version, repatch=lambda row: not row[2])
+    patched = [row[:3] + [row[3].upper()] for _, row in diff.pending]
+    output = sheet_sync.apply(diff, patched)
+    return diff, output, sheet_sync.commit(output, output_path, lambda: write(output_path))
+
+
+def test_only_changed_rows_are_patched(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    output_file = str(tmp_path / "policies.arrow")
+    rows = [
+        ["SURA", "1", "AAA1111", "fiat"],
+        ["SURA", "2", "", "vw"],
+        ["BSE", "3", "BBB2222", "ford"],
+    ]
+    diff, output, changed = sync(SheetSync(state_file), rows, output_file)
+    assert diff.full_rebuild and diff.inserted == 3 and len(diff.pending) == 3
+    assert [row[3] for row in output] == ["FIAT", "VW", "FORD"]
+
+    # A new instance picks up the saved state
+    sheet_sync = SheetSync(state_file)
+    diff, _, changed = sync(sheet_sync, rows, output_file)
+    # The row without plate is patched on every sync
+    assert (diff.changed, [row for _, row in diff.pending], changed) == (
+        0,
+        [["SURA", "2", "", "vw"]],
+        False,
+    )
+
+    rows = [
+        ["SURA", "1", "AAA1111", "renault"],
+        ["SURA", "2", "", "vw"],
+        ["SURA", "4", "CCC3333", "kia"],
+    ]
+    diff, output, changed = sync(sheet_sync, rows, output_file)
+    assert (diff.inserted, diff.updated, diff.deleted) == (1, 1, 1)
+    assert [row[3] for row in output] == ["RENAULT", "VW", "KIA"]
+    assert changed
+
+
+def test_new_rules_version_patches_everything(tmp_path):
+    sheet_sync = SheetSync(None)
+    rows = [["SURA", "1", "AAA1111", "fiat"]]
+    sync(sheet_sync, rows, str(tmp_path / "policies.arrow"))
+    diff, _, _ = sync(sheet_sync, rows, str(tmp_path / "policies.arrow"), version="v2")
+    assert diff.full_rebuild and len(diff.pending) == 1
+
+
+def test_failed_write_is_retried(tmp_path):
+    state_file = str(tmp_path / "state.json")
+    output_file = str(tmp_path / "policies.arrow")
+    rows = [["SURA", "1", "AAA1111", "fiat"]]
+    sync(SheetSync(state_file), rows, output_file)
+
+    def fail(path):
+        raise OSError("disk full")
+
+    rows.append(["BSE", "3", "BBB2222", "ford"])
+    with pytest.raises(OSError):
+        sync(SheetSync(state_file), rows, output_file, write=fail)
+    # The previous output is still there, but the new one was never written
+    _, _, changed = sync(SheetSync(state_file), rows, output_file)
+    assert changed
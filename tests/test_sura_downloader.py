@@ -0,0 +1,73 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+from base_downloader import RESULT_GRID_RESTORE_TIMEOUT
+from driver_metrics import DriverMetrics
+from policy_driver import ElementNotFoundException
+from sura_downloader import SuraDownloader
+
+
+class FakeInput:
+    def __init__(self, value, stale=False):
+        self.value = value
+        self.stale = stale
+
+    def get_attribute(self, name):
+        if self.stale:
+            raise StaleElementReferenceException("stale element reference")
+        return self.value
+
+
+class FakeGridDriver:
+    """The SURA search page as left by the history traversal, recording the waits."""
+
+    def __init__(self, policy_input, rows):
+        self.policy_input = policy_input
+        self.rows = rows
+        self.timeouts = []
+        self.metrics = DriverMetrics()
+
+    def wait_for_invisibility(self, locator, timeout=10, poll_frequency=0.2):
+        self.timeouts.append(timeout)
+        return True
+
+    def find_element(self, locator, context=None, timeout=10):
+        self.timeouts.append(timeout)
+        return self.policy_input
+
+    def get_table_row_count(self, locator, timeout=0):
+        self.timeouts.append(timeout)
+        if not self.rows:
+            raise ElementNotFoundException(locator)
+        return self.rows
+
+
+@pytest.fixture(autouse=True)
+def sura_config(monkeypatch):
+    monkeypatch.setenv("SURA_LOGIN_TIMEOUT", "30")
+
+
+def grid_ready(policy_input, rows):
+    driver = FakeGridDriver(policy_input, rows)
+    ready = SuraDownloader(driver=driver).is_result_grid_ready({"number": "1968422"})
+    # A failed restore is common, the check must not wait long
+    assert max(driver.timeouts) <= RESULT_GRID_RESTORE_TIMEOUT
+    return ready
+
+
+def test_grid_with_the_results_of_the_policy_is_ready():
+    assert grid_ready(FakeInput(" 1968422 "), rows=2)
+
+
+def test_grid_is_searched_again_when_it_cant_be_used():
+    # Results of another policy
+    assert not grid_ready(FakeInput("9176866"), rows=2)
+    # No results
+    assert not grid_ready(FakeInput("1968422"), rows=0)
+    # The page changed after the traversal
+    assert not grid_ready(FakeInput("1968422", stale=True), rows=2)
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from selenium.common.exceptions import JavascriptException
+from policy_driver import PolicyDriver
+from wait_strategy import WaitStrategy
+
+COLUMNS_NEEDED = ["Matrícula", "Estado", "Nro."]
+
+
+class FakeElement:
+    """WebElement stand-in: like selenium, text is "" if it's not rendered."""
+
+    def __init__(self, text="", children=None, displayed=True):
+        self._text = text
+        self.children = children or {}
+        self.displayed = displayed
+
+    @property
+    def text(self):
+        return self._text if self.displayed else ""
+
+    def is_displayed(self):
+        return True
+
+    def find_elements(self, by, value):
+        return self.children.get(value, [])
+
+
+def cell_text(element):
+    # What the text() helper of the script returns
+    return element._text.strip() if element.displayed else ""
+
+
+class FakeTableDriver:
+    def __init__(self, table, script_works=True):
+        self.table = table
+        self.script_works = script_works
+        self.scripts = 0
+
+    def find_element(self, by, value):
+        return self.table
+
+    def execute_script(self, script, *args):
+        self.scripts += 1
+        assert script == PolicyDriver._TABLE_TO_JSON_SCRIPT and args == (self.table,)
+        if not self.script_works:
+            raise JavascriptException("javascript error: innerText of undefined")
+        headers = [cell_text(th) for th in self.table.find_elements(None, "thead tr th")]
+        rows = [
+            [cell_text(td) for td in tr.find_elements(None, "td")]
+            for tr in self.table.find_elements(None, "tbody tr")
+        ]
+        return json.dumps({"headers": headers, "rows": rows})
+
+
+def fleet_table():
+    headers = ["Matrícula", "Marca", "Estado", "Nro."]
+    rows = [
+        ["SDA1234 ", "FIAT", "Incluido", "1"],
+        ["SDB4050", "SUZUKI", " Excluido", "2"],
+        # Cell hidden by the grid, and a row with fewer cells
+        ["SDC0001", "FORD", "Incluido", "3"],
+        ["Total"],
+    ]
+    row_elements = [
+        FakeElement(children={"td": [FakeElement(text) for text in row]}) for row in rows
+    ]
+    row_elements[2].children["td"][2].displayed = False
+    return FakeElement(
+        children={
+            "thead tr th": [FakeElement(h) for h in headers],
+            "tbody tr": row_elements,
+        }
+    )
+
+
+def extract(driver):
+    policy_driver = PolicyDriver.__new__(PolicyDriver)
+    policy_driver.driver = driver
+    policy_driver.waits = WaitStrategy(stats_file=None)
+    return policy_driver.extract_table_data("GrdItems", COLUMNS_NEEDED)
+
+
+def test_script_and_element_extraction_return_the_same_rows():
+    table = fleet_table()
+    script_driver = FakeTableDriver(table)
+    element_driver = FakeTableDriver(table, script_works=False)
+
+    rows = extract(script_driver)
+    assert rows == extract(element_driver)
+    assert rows == [
+        {"Matrícula": "SDA1234", "Estado": "Incluido", "Nro.": "1"},
+        {"Matrícula": "SDB4050", "Estado": "Excluido", "Nro.": "2"},
+        {"Matrícula": "SDC0001", "Estado": "", "Nro.": "3"},
+        {"Matrícula": "Total"},
+    ]
+    assert script_driver.scripts == element_driver.scripts == 1
@@ -0,0 +1,59 @@
+import os
+import sys
+
+# Add project root to sys.path for module resolution
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from wait_strategy import MIN_TIMEOUT, WaitStrategy
+
+
+def test_uses_caller_timeout_until_enough_samples():
+    waits = WaitStrategy(stats_file=None)
+    waits.observe("grid", 0.5)
+    assert waits.timeout_for("grid", 20) == 20
+
+
+def test_learned_timeout_is_bounded():
+    waits = WaitStrategy(stats_file=None)
+    for _ in range(10):
+        waits.observe("grid", 1.0)
+        waits.observe("fast", 0.01)
+    assert waits.timeout_for("grid", 10) == 4.0
+    assert waits.timeout_for("grid", 3) == 3
+    assert waits.timeout_for("fast", 4) == MIN_TIMEOUT
+    # Never below a quarter of the caller's timeout
+    assert waits.timeout_for("fast", 20) == 5.0
+
+
+def test_expired_waits_raise_the_timeout(tmp_path):
+    stats_file = str(tmp_path / "waits.json")
+    waits = WaitStrategy(stats_file=stats_file)
+    for _ in range(20):
+        waits.observe("grid", 0.1)
+    assert waits.timeout_for("grid", 20) == 5.0
+
+    # A slow day: the learned timeout expires, the caller's is used again
+    waits.record_timeout(5.0, 20, "grid")
+    assert waits.timeout_for("grid", 20) == 20
+    waits.save()
+    assert WaitStrategy(stats_file=stats_file).timeout_for("grid", 20) == 20
+
+    # Back to normal once the expired wait is not among the recent samples
+    for _ in range(5):
+        waits.observe("grid", 0.1)
+    assert waits.timeout_for("grid", 20) == 5.0
+
+
+def test_stats_round_trip(tmp_path):
+    stats_file = str(tmp_path / "waits.json")
+    waits = WaitStrategy(stats_file=stats_file)
+    for _ in range(5):
+        waits.observe("grid", 1.0)
+    waits.save()
+    assert WaitStrategy(stats_file=stats_file).timeout_for("grid", 10) == 4.0
+
+
+def test_loads_stats_without_censored_flags(tmp_path):
+    stats_file = tmp_path / "waits.json"
+    stats_file.write_text('{"grid": [1.0, 1.0, 1.0, 1.0, 1.0]}')
+    assert WaitStrategy(stats_file=str(stats_file)).timeout_for("grid", 10) == 4.0
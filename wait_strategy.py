@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Deque, Dict, Tuple
+from driver_metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+WAIT_STATS_FILE = os.getenv("WAIT_STATS_FILE")
+
+# Implicit wait the driver used to have; every lookup of a missing element paid it
+LEGACY_IMPLICIT_WAIT = 10
+
+MIN_SAMPLES = 5
+MAX_SAMPLES = 50
+MIN_TIMEOUT = 2.0
+# The learned timeout is never below this fraction of the caller's timeout
+MIN_TIMEOUT_FRACTION = 0.25
+SAFETY_FACTOR = 3.0
+SAFETY_MARGIN = 1.0
+
+
+class WaitStrategy:
+    """
+    Explicit-wait timeouts learned from how long each locator took to appear.
+
+    Once a locator has enough observations its timeout becomes
+    p95 * SAFETY_FACTOR + SAFETY_MARGIN, never above the caller's timeout and
+    never below MIN_TIMEOUT or MIN_TIMEOUT_FRACTION of it.
+
+    An expired wait is a censored sample (the element takes at least that
+    long): it counts as the caller's timeout, and while one is among the
+    last MIN_SAMPLES the caller's timeout is used. So on a slow portal day
+    the timeouts go back up instead of failing at the learned value.
+
+    It also keeps track of the time saved compared to the old implicit wait
+    on absence checks and expired waits.
+    """
+
+    def __init__(self, stats_file: str = WAIT_STATS_FILE):
+        self.stats_file = stats_file
+        # (seconds, censored) of each locator
+        self._latencies: Dict[str, Deque[Tuple[float, bool]]] = defaultdict(
+            lambda: deque(maxlen=MAX_SAMPLES)
+        )
+        self.seconds_saved = 0.0
+        self.probes = 0
+        self.timeouts = 0
+        if self.stats_file and os.path.exists(self.stats_file):
+            self.load()
+
+    def timeout_for(self, locator, default: float) -> float:
+        samples = self._latencies.get(str(locator))
+        if not samples or len(samples) < MIN_SAMPLES:
+            return default
+        if any(censored for _, censored in list(samples)[-MIN_SAMPLES:]):
+            return default
+        learned = percentile([s for s, _ in samples], 95) * SAFETY_FACTOR + SAFETY_MARGIN
+        floor = max(MIN_TIMEOUT, default * MIN_TIMEOUT_FRACTION)
+        return max(min(floor, default), min(default, learned))
+
+    def observe(self, locator, seconds: float):
+        """Record how long the locator took to be found."""
+        self._latencies[str(locator)].append((seconds, False))
+
+    def record_absent(self, elapsed: float, legacy_cost: float = LEGACY_IMPLICIT_WAIT):
+        """Record a lookup that ended without the element, and what it used to cost."""
+        self.probes += 1
+        self.seconds_saved += max(0.0, legacy_cost - elapsed)
+
+    def record_timeout(self, elapsed: float, requested_timeout: float, locator=None):
+        """Record an expired wait, as a censored sample of the locator if given."""
+        if locator is not None and requested_timeout:
+            self._latencies[str(locator)].append((max(elapsed, requested_timeout), True))
+        self.timeouts += 1
+        legacy_cost = max(requested_timeout, LEGACY_IMPLICIT_WAIT)
+        self.seconds_saved += max(0.0, legacy_cost - elapsed)
+
+    def summary(self) -> str:
+        return (
+            f"{self.probes} absence checks, {self.timeouts} expired waits, "
+            f"{self.seconds_saved:.1f}s saved against the implicit wait, "
+            f"{len(self._latencies)} locators with learned latencies"
+        )
+
+    def load(self):
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for locator, samples in data.items():
+                # Files written before censored samples hold plain seconds
+                self._latencies[locator].extend(
+                    (s, False) if isinstance(s, (int, float)) else (s[0], bool(s[1]))
+                    for s in samples
+                )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load wait stats {self.stats_file}: {str(e)}")
+
+    def save(self):
+        if not self.stats_file:
+            return
+        with open(self.stats_file, "w", encoding="utf-8") as f:
+            json.dump({k: [list(s) for s in v] for k, v in self._latencies.items()}, f)